@@ -1,6 +1,13 @@
 import { Component } from "@angular/core"
-import { TupleDataObserverService, TupleSelector } from "@synerty/vortexjs"
-import { AdminStatusTuple } from "@peek/peek_core_search/_private"
+import {
+    TupleActionPushService,
+    TupleDataObserverService,
+    TupleSelector
+} from "@synerty/vortexjs"
+import {
+    AdminStatusTuple,
+    RebuildSearchChunksTupleAction
+} from "@peek/peek_core_search/_private"
 import { BalloonMsgService, NgLifeCycleEvents } from "@synerty/peek-plugin-base-js"
 
 @Component({
@@ -11,9 +18,13 @@ export class StatusComponent extends NgLifeCycleEvents {
     
     item: AdminStatusTuple = new AdminStatusTuple()
     
+    rekeyIndexBucketCount: number | null = null
+    rekeyObjectBucketCount: number | null = null
+    
     constructor(
         private balloonMsg: BalloonMsgService,
-        private tupleObserver: TupleDataObserverService
+        private tupleObserver: TupleDataObserverService,
+        private tupleAction: TupleActionPushService
     ) {
         super()
         
@@ -26,4 +37,20 @@ export class StatusComponent extends NgLifeCycleEvents {
         
     }
     
+    rebuildClicked() {
+        this.tupleAction.pushAction(new RebuildSearchChunksTupleAction())
+            .then(() => this.balloonMsg.showSuccess("Rebuild Started"))
+            .catch(e => this.balloonMsg.showError(e))
+    }
+    
+    rekeyClicked() {
+        const action = new RebuildSearchChunksTupleAction()
+        action.indexBucketCount = this.rekeyIndexBucketCount
+        action.objectBucketCount = this.rekeyObjectBucketCount
+        
+        this.tupleAction.pushAction(action)
+            .then(() => this.balloonMsg.showSuccess("Re-key Started"))
+            .catch(e => this.balloonMsg.showError(e))
+    }
+    
 }
@@ -0,0 +1,34 @@
+"""chunk source fingerprint
+
+Peek Plugin Database Migration Script
+
+Revision ID: a7d2e5c8f031
+Revises: f4a9c1d3e725
+Create Date: 2026-10-19 19:11:38.204716
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'a7d2e5c8f031'
+down_revision = 'f4a9c1d3e725'
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.add_column('EncodedSearchIndexChunk',
+                  sa.Column('sourceFingerprint', sa.String(), nullable=True),
+                  schema='core_search')
+    op.add_column('EncodedSearchObjectChunk',
+                  sa.Column('sourceFingerprint', sa.String(), nullable=True),
+                  schema='core_search')
+
+
+def downgrade():
+    op.drop_column('EncodedSearchObjectChunk', 'sourceFingerprint',
+                   schema='core_search')
+    op.drop_column('EncodedSearchIndexChunk', 'sourceFingerprint',
+                   schema='core_search')
@@ -0,0 +1,56 @@
+"""unique compiler queues
+
+Peek Plugin Database Migration Script
+
+Revision ID: b3e8c27d5f16
+Revises: e61f0b7d94a2
+Create Date: 2026-10-19 15:21:44.108372
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b3e8c27d5f16'
+down_revision = 'e61f0b7d94a2'
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def _dedupeQueue(tableName: str):
+    op.execute('''
+        DELETE FROM core_search."%(table)s" q
+        USING core_search."%(table)s" q2
+        WHERE q."chunkKey" = q2."chunkKey"
+            AND q.id > q2.id
+    ''' % {'table': tableName})
+
+
+def upgrade():
+    _dedupeQueue('SearchIndexCompilerQueue')
+    _dedupeQueue('SearchObjectCompilerQueue')
+
+    op.add_column('SearchIndexCompilerQueue',
+                  sa.Column('generation', sa.Integer(), server_default='0',
+                            nullable=False),
+                  schema='core_search')
+    op.add_column('SearchObjectCompilerQueue',
+                  sa.Column('generation', sa.Integer(), server_default='0',
+                            nullable=False),
+                  schema='core_search')
+
+    op.create_index('idx_SearchIndexCompQueue_chunkKey', 'SearchIndexCompilerQueue',
+                    ['chunkKey'], unique=True, schema='core_search')
+    op.create_index('idx_SearchObjectCompQueue_chunkKey', 'SearchObjectCompilerQueue',
+                    ['chunkKey'], unique=True, schema='core_search')
+
+
+def downgrade():
+    op.drop_index('idx_SearchObjectCompQueue_chunkKey',
+                  table_name='SearchObjectCompilerQueue', schema='core_search')
+    op.drop_index('idx_SearchIndexCompQueue_chunkKey',
+                  table_name='SearchIndexCompilerQueue', schema='core_search')
+
+    op.drop_column('SearchObjectCompilerQueue', 'generation', schema='core_search')
+    op.drop_column('SearchIndexCompilerQueue', 'generation', schema='core_search')
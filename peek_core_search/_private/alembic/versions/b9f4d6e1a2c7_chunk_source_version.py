@@ -0,0 +1,40 @@
+"""chunk source version
+
+Peek Plugin Database Migration Script
+
+Revision ID: b9f4d6e1a2c7
+Revises: c7e3f9a2b815
+Create Date: 2026-10-21 10:12:44.583102
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'b9f4d6e1a2c7'
+down_revision = 'c7e3f9a2b815'
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.create_table('SearchIndexChunkVersion',
+                    sa.Column('chunkKey', sa.Integer(), nullable=False),
+                    sa.Column('version', sa.BigInteger(), server_default='0',
+                              nullable=False),
+                    sa.PrimaryKeyConstraint('chunkKey'),
+                    schema='core_search'
+                    )
+    op.create_table('SearchObjectChunkVersion',
+                    sa.Column('chunkKey', sa.Integer(), nullable=False),
+                    sa.Column('version', sa.BigInteger(), server_default='0',
+                              nullable=False),
+                    sa.PrimaryKeyConstraint('chunkKey'),
+                    schema='core_search'
+                    )
+
+
+def downgrade():
+    op.drop_table('SearchObjectChunkVersion', schema='core_search')
+    op.drop_table('SearchIndexChunkVersion', schema='core_search')
@@ -0,0 +1,29 @@
+"""compiler queue rebuild
+
+Peek Plugin Database Migration Script
+
+Revision ID: c7e3f9a2b815
+Revises: d5c2a9e7b413
+Create Date: 2026-10-20 09:41:26.208733
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'c7e3f9a2b815'
+down_revision = 'd5c2a9e7b413'
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.add_column('SearchIndexCompilerQueue',
+                  sa.Column('rebuild', sa.Boolean(), server_default='false',
+                            nullable=False),
+                  schema='core_search')
+
+
+def downgrade():
+    op.drop_column('SearchIndexCompilerQueue', 'rebuild', schema='core_search')
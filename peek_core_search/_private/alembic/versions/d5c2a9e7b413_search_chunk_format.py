@@ -0,0 +1,59 @@
+"""search chunk format
+
+Peek Plugin Database Migration Script
+
+Revision ID: d5c2a9e7b413
+Revises: a7d2e5c8f031
+Create Date: 2026-10-19 20:24:51.730918
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'd5c2a9e7b413'
+down_revision = 'a7d2e5c8f031'
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.create_table('SearchChunkFormat',
+                    sa.Column('id', sa.Integer(), nullable=False),
+                    sa.Column('indexBucketCount', sa.Integer(),
+                              server_default='8192', nullable=False),
+                    sa.Column('objectBucketCount', sa.Integer(),
+                              server_default='8192', nullable=False),
+                    sa.PrimaryKeyConstraint('id'),
+                    schema='core_search'
+                    )
+
+    op.execute('INSERT INTO core_search."SearchChunkFormat"'
+               ' ("indexBucketCount", "objectBucketCount") VALUES (8192, 8192)')
+
+    # This MUST MATCH makeSearchIndexChunkKey in _CalcChunkKey.py
+    op.execute('''
+        CREATE OR REPLACE FUNCTION core_search.search_index_chunk_key(
+            keyword TEXT, bucket_count INTEGER)
+        RETURNS INTEGER
+        LANGUAGE plpgsql IMMUTABLE STRICT PARALLEL SAFE
+        AS $$
+        DECLARE
+            bucket BIGINT := 0;
+        BEGIN
+            -- Only the low bits are kept, these are the same as the low bits of
+            -- the javascript 32bit integer
+            FOR i IN 1..length(keyword) LOOP
+                bucket := (bucket * 31 + ascii(substr(keyword, i, 1)))
+                            & (bucket_count - 1);
+            END LOOP;
+            RETURN bucket;
+        END
+        $$;
+    ''')
+
+
+def downgrade():
+    op.execute('DROP FUNCTION core_search.search_index_chunk_key(TEXT, INTEGER)')
+    op.drop_table('SearchChunkFormat', schema='core_search')
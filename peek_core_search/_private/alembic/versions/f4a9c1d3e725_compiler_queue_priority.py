@@ -0,0 +1,44 @@
+"""compiler queue priority
+
+Peek Plugin Database Migration Script
+
+Revision ID: f4a9c1d3e725
+Revises: b3e8c27d5f16
+Create Date: 2026-10-19 17:02:13.517290
+
+"""
+
+# revision identifiers, used by Alembic.
+revision = 'f4a9c1d3e725'
+down_revision = 'b3e8c27d5f16'
+branch_labels = None
+depends_on = None
+
+import sqlalchemy as sa
+from alembic import op
+
+
+def upgrade():
+    op.add_column('SearchIndexCompilerQueue',
+                  sa.Column('priority', sa.Integer(), server_default='0',
+                            nullable=False),
+                  schema='core_search')
+    op.add_column('SearchObjectCompilerQueue',
+                  sa.Column('priority', sa.Integer(), server_default='0',
+                            nullable=False),
+                  schema='core_search')
+
+    op.create_index('idx_SearchIndexCompQueue_priority', 'SearchIndexCompilerQueue',
+                    ['priority', 'id'], unique=False, schema='core_search')
+    op.create_index('idx_SearchObjectCompQueue_priority', 'SearchObjectCompilerQueue',
+                    ['priority', 'id'], unique=False, schema='core_search')
+
+
+def downgrade():
+    op.drop_index('idx_SearchObjectCompQueue_priority',
+                  table_name='SearchObjectCompilerQueue', schema='core_search')
+    op.drop_index('idx_SearchIndexCompQueue_priority',
+                  table_name='SearchIndexCompilerQueue', schema='core_search')
+
+    op.drop_column('SearchObjectCompilerQueue', 'priority', schema='core_search')
+    op.drop_column('SearchIndexCompilerQueue', 'priority', schema='core_search')
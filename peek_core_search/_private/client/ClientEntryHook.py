@@ -6,6 +6,8 @@ from peek_core_search._private.client.DeviceTupleProcessorActionProxy import \
     makeTupleActionProcessorProxy
 from peek_core_search._private.client.controller.FastKeywordController import \
     FastKeywordController
+from peek_core_search._private.client.controller.SearchChunkFormatController import \
+    SearchChunkFormatController
 from peek_plugin_base.PeekVortexUtil import peekServerName
 from peek_plugin_base.client.PluginClientEntryHookABC import PluginClientEntryHookABC
 from peek_core_search._private.PluginNames import searchActionProcessorName
@@ -84,6 +86,12 @@ class ClientEntryHook(PluginClientEntryHookABC):
         )
         self._loadedObjects.append(serverTupleObserver)
 
+        # ----------------
+        # Search Chunk Format Controller
+
+        searchChunkFormatController = SearchChunkFormatController()
+        self._loadedObjects.append(searchChunkFormatController)
+
         # ----------------
         # Search Index Cache Controller
 
@@ -102,6 +110,9 @@ class ClientEntryHook(PluginClientEntryHookABC):
         searchIndexCacheController \
             .setCacheHandler(searchIndexCacheHandler)
 
+        searchIndexCacheController \
+            .setChunkFormatController(searchChunkFormatController)
+
         # ----------------
         # Search Object Cache Controller
 
@@ -121,6 +132,14 @@ class ClientEntryHook(PluginClientEntryHookABC):
             searchObjectCacheHandler
         )
 
+        searchObjectCacheController.setChunkFormatController(
+            searchChunkFormatController
+        )
+
+        searchChunkFormatController.setCacheControllers(
+            searchIndexCacheController, searchObjectCacheController
+        )
+
         # ----------------
         # Fast Keyword Controller
 
@@ -147,6 +166,7 @@ class ClientEntryHook(PluginClientEntryHookABC):
 
         # ----------------
         # Start the compiler controllers
+        yield searchChunkFormatController.start()
         yield searchIndexCacheController.start()
         yield searchObjectCacheController.start()
 
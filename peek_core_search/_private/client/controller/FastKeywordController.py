@@ -26,9 +26,14 @@ from peek_core_search._private.tuples.KeywordAutoCompleteTupleAction import \
     KeywordAutoCompleteTupleAction
 from peek_core_search._private.tuples.search_object.SearchResultObjectTuple import \
     SearchResultObjectTuple
+from peek_core_search._private.worker.tasks.ChunkEnvelope import unwrapChunk
 from peek_core_search._private.worker.tasks.KeywordSplitter import \
     splitPartialKeywords, splitFullKeywords, _splitFullTokens
-from peek_core_search._private.worker.tasks._CalcChunkKey import makeSearchIndexChunkKey
+from peek_core_search._private.worker.tasks.SearchIndexChunkCodec import \
+    isBinarySearchIndexChunk, iterSearchIndexChunk, \
+    searchIndexSplitChunkSubBucketCount
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    makeSearchIndexChunkKeys, makeSearchIndexSubBucket, makeSearchIndexSplitChunkKey
 
 logger = logging.getLogger(__name__)
 
@@ -41,10 +46,14 @@ class FastKeywordController(TupleActionProcessorDelegateABC):
         self._objectIdsByKeywordByPropertyKeyByChunkKey: Dict[
             str, Dict[str, Dict[str, List[int]]]] = {}
 
+        # The chunks that are split into sub bucket chunks
+        self._subBucketCountByChunkKey: Dict[int, int] = {}
+
     def shutdown(self):
         self._objectCacheController = None
         self._indexCacheController = None
         self._objectIdsByKeywordByPropertyKeyByChunkKey = {}
+        self._subBucketCountByChunkKey = {}
 
     @inlineCallbacks
     def processTupleAction(self, tupleAction: TupleActionABC) -> Deferred:
@@ -243,8 +252,17 @@ class FastKeywordController(TupleActionProcessorDelegateABC):
 
         # Figure out which keywords are in which chunk keys
         keywordsByChunkKey = defaultdict(list)
-        for kw in tokens:
-            keywordsByChunkKey[makeSearchIndexChunkKey(kw)].append(kw)
+        bucketCount = self._indexCacheController.bucketCount
+        chunkKeys = makeSearchIndexChunkKeys(results, bucketCount)
+        for kw, chunkKey in zip(results, chunkKeys):
+            # Oversized chunks are split, look in the keywords sub bucket chunk
+            subBucketCount = self._subBucketCountByChunkKey.get(chunkKey)
+            if subBucketCount:
+                chunkKey = makeSearchIndexSplitChunkKey(
+                    chunkKey, makeSearchIndexSubBucket(kw, subBucketCount), bucketCount
+                )
+
+            keywordsByChunkKey[chunkKey].append(kw)
 
         # Iterate through each of the chunks we need
         for chunkKey, keywordsInThisChunk in keywordsByChunkKey.items():
@@ -274,6 +292,15 @@ class FastKeywordController(TupleActionProcessorDelegateABC):
 
         return results
 
+    def clearCache(self) -> None:
+        """ Clear Cache
+
+        Drop the keywords unpacked from the chunks, the chunks are being reloaded.
+
+        """
+        self._objectIdsByKeywordByPropertyKeyByChunkKey = {}
+        self._subBucketCountByChunkKey = {}
+
     @inlineCallbacks
     def notifyOfUpdate(self, chunkKeys: List[str]):
         """ Notify of Segment Updates
@@ -284,20 +311,44 @@ class FastKeywordController(TupleActionProcessorDelegateABC):
         """
         for chunkKey in chunkKeys:
             encodedChunkTuple = self._indexCacheController.encodedChunk(chunkKey)
+
+            # The chunk was deleted, sub bucket chunks are deleted when a chunk
+            # is no longer split.
+            if not encodedChunkTuple:
+                self._objectIdsByKeywordByPropertyKeyByChunkKey.pop(chunkKey, None)
+                self._subBucketCountByChunkKey.pop(chunkKey, None)
+                continue
+
             yield self._unpackKeywordsFromChunk(encodedChunkTuple)
 
     @deferToThreadWrapWithLogger(logger)
     def _unpackKeywordsFromChunk(self, chunk: EncodedSearchIndexChunk) -> None:
 
-        chunkDataTuples = Payload().fromEncodedPayload(chunk.encodedData).tuples
-
         chunkData: Dict[str, Dict[str, List[int]]] = defaultdict(dict)
+        encodedData = unwrapChunk(chunk.encodedData)
+
+        subBucketCount = searchIndexSplitChunkSubBucketCount(encodedData)
+        if subBucketCount:
+            self._objectIdsByKeywordByPropertyKeyByChunkKey.pop(chunk.chunkKey, None)
+            self._subBucketCountByChunkKey[chunk.chunkKey] = subBucketCount
+            return
 
-        for data in chunkDataTuples:
-            keyword = data[EncodedSearchIndexChunk.ENCODED_DATA_KEYWORD_NUM]
-            propertyName = data[EncodedSearchIndexChunk.ENCODED_DATA_PROPERTY_MAME_NUM]
-            objectIdsJson = data[
-                EncodedSearchIndexChunk.ENCODED_DATA_OBJECT_IDS_JSON_INDEX]
-            chunkData[propertyName][keyword] = ujson.loads(objectIdsJson)
+        self._subBucketCountByChunkKey.pop(chunk.chunkKey, None)
+
+        if isBinarySearchIndexChunk(encodedData):
+            for keyword, propertyName, objectIds in iterSearchIndexChunk(encodedData):
+                chunkData[propertyName][keyword] = objectIds
+
+        else:
+            # Chunks compiled before the binary format are vortex payloads
+            chunkDataTuples = Payload().fromEncodedPayload(encodedData).tuples
+
+            for data in chunkDataTuples:
+                keyword = data[EncodedSearchIndexChunk.ENCODED_DATA_KEYWORD_NUM]
+                propertyName = data[
+                    EncodedSearchIndexChunk.ENCODED_DATA_PROPERTY_MAME_NUM]
+                objectIdsJson = data[
+                    EncodedSearchIndexChunk.ENCODED_DATA_OBJECT_IDS_JSON_INDEX]
+                chunkData[propertyName][keyword] = ujson.loads(objectIdsJson)
 
         self._objectIdsByKeywordByPropertyKeyByChunkKey[chunk.chunkKey] = chunkData
@@ -0,0 +1,88 @@
+import logging
+from typing import List
+
+from twisted.internet.defer import inlineCallbacks
+from vortex.Payload import Payload
+from vortex.PayloadEndpoint import PayloadEndpoint
+from vortex.PayloadEnvelope import PayloadEnvelope
+
+from peek_abstract_chunked_index.private.client.controller.ACICacheControllerABC import \
+    ACICacheControllerABC
+from peek_core_search._private.PluginNames import searchFilt
+from peek_core_search._private.server.client_handlers.ClientChunkLoadRpc import \
+    ClientChunkLoadRpc
+from peek_core_search._private.storage.SearchChunkFormatTuple import \
+    SearchChunkFormatTuple
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    INDEX_BUCKET_COUNT, OBJECT_BUCKET_COUNT
+
+logger = logging.getLogger(__name__)
+
+clientSearchChunkFormatUpdateFromServerFilt = dict(
+    key="clientSearchChunkFormatUpdateFromServer"
+)
+clientSearchChunkFormatUpdateFromServerFilt.update(searchFilt)
+
+
+class SearchChunkFormatController:
+    """ Search Chunk Format Controller
+
+    Keep the bucket counts the chunks are keyed with. They are loaded from the
+    server on start, and the server sends them again when a re-key switches them.
+
+    The chunk caches are keyed with the old counts when they change, so they are
+    reloaded.
+
+    """
+
+    def __init__(self):
+        self._chunkFormat = SearchChunkFormatTuple(
+            indexBucketCount=INDEX_BUCKET_COUNT,
+            objectBucketCount=OBJECT_BUCKET_COUNT
+        )
+        self._cacheControllers: List[ACICacheControllerABC] = []
+
+        self._endpoint = PayloadEndpoint(clientSearchChunkFormatUpdateFromServerFilt,
+                                         self._processChunkFormatPayload)
+
+    def setCacheControllers(self, *cacheControllers: ACICacheControllerABC):
+        self._cacheControllers = list(cacheControllers)
+
+    @property
+    def indexBucketCount(self) -> int:
+        return self._chunkFormat.indexBucketCount
+
+    @property
+    def objectBucketCount(self) -> int:
+        return self._chunkFormat.objectBucketCount
+
+    @inlineCallbacks
+    def start(self):
+        encodedPayload = yield ClientChunkLoadRpc.loadSearchChunkFormat()
+        payload = yield Payload().fromEncodedPayloadDefer(encodedPayload)
+        self._chunkFormat = payload.tuples[0]
+
+    def shutdown(self):
+        self._endpoint.shutdown()
+        self._endpoint = None
+
+        self._cacheControllers = []
+
+    @inlineCallbacks
+    def _processChunkFormatPayload(self, payloadEnvelope: PayloadEnvelope, **kwargs):
+        payload = yield payloadEnvelope.decodePayloadDefer()
+        chunkFormat: SearchChunkFormatTuple = payload.tuples[0]
+
+        if (chunkFormat.indexBucketCount == self.indexBucketCount
+                and chunkFormat.objectBucketCount == self.objectBucketCount):
+            return
+
+        logger.info("The search chunks were re-keyed, from %s index and %s object"
+                    " buckets to %s and %s, reloading the chunks",
+                    self.indexBucketCount, self.objectBucketCount,
+                    chunkFormat.indexBucketCount, chunkFormat.objectBucketCount)
+
+        self._chunkFormat = chunkFormat
+
+        for cacheController in self._cacheControllers:
+            yield cacheController.reloadCache()
@@ -1,6 +1,8 @@
 import logging
 from typing import List, Any
 
+from twisted.internet.defer import inlineCallbacks
+
 from peek_abstract_chunked_index.private.client.controller.ACICacheControllerABC import \
     ACICacheControllerABC
 from peek_core_search._private.PluginNames import searchFilt
@@ -8,6 +10,8 @@ from peek_core_search._private.server.client_handlers.ClientChunkLoadRpc import
     ClientChunkLoadRpc
 from peek_core_search._private.storage.EncodedSearchIndexChunk import \
     EncodedSearchIndexChunk
+from peek_core_search._private.worker.tasks.ChunkEnvelope import \
+    SUPPORTED_CHUNK_CODECS
 
 logger = logging.getLogger(__name__)
 
@@ -24,20 +28,41 @@ class SearchIndexCacheController(ACICacheControllerABC):
     """
 
     _ChunkedTuple = EncodedSearchIndexChunk
-    _chunkLoadRpcMethod = ClientChunkLoadRpc.loadSearchIndexChunks
     _updateFromServerFilt = clientSearchIndexUpdateFromServerFilt
     _logger = logger
 
+    @staticmethod
+    def _chunkLoadRpcMethod(offset: int, count: int):
+        # Tell the server which chunk envelope codecs we can read
+        return ClientChunkLoadRpc.loadSearchIndexChunks(
+            offset, count, acceptedCodecs=SUPPORTED_CHUNK_CODECS
+        )
+
     def __init__(self, clientId: str):
         ACICacheControllerABC.__init__(self, clientId)
         self._fastKeywordController = None
+        self._chunkFormatController = None
 
     def setFastKeywordController(self, fastKeywordController):
         self._fastKeywordController = fastKeywordController
 
+    def setChunkFormatController(self, chunkFormatController):
+        self._chunkFormatController = chunkFormatController
+
+    @property
+    def bucketCount(self) -> int:
+        return self._chunkFormatController.indexBucketCount
+
     def shutdown(self):
         ACICacheControllerABC.shutdown(self)
         self._fastKeywordController = None
+        self._chunkFormatController = None
+
+    @inlineCallbacks
+    def reloadCache(self):
+        # The keywords unpacked from the old chunks may be keyed differently
+        self._fastKeywordController.clearCache()
+        yield ACICacheControllerABC.reloadCache(self)
 
     def _notifyOfChunkKeysUpdated(self, chunkKeys: List[Any]):
         ACICacheControllerABC._notifyOfChunkKeysUpdated(self, chunkKeys)
@@ -1,6 +1,6 @@
 import logging
 from collections import defaultdict
-from typing import List, Optional
+from typing import Dict, List, Optional
 
 import ujson
 from vortex.DeferUtil import deferToThreadWrapWithLogger
@@ -18,6 +18,11 @@ from peek_core_search._private.tuples.search_object.SearchResultObjectRouteTuple
     SearchResultObjectRouteTuple
 from peek_core_search._private.tuples.search_object.SearchResultObjectTuple import \
     SearchResultObjectTuple
+from peek_core_search._private.worker.tasks.ChunkEnvelope import \
+    SUPPORTED_CHUNK_CODECS, unwrapChunk
+from peek_core_search._private.worker.tasks.SearchObjectChunkCodec import \
+    DecodedSearchObject, decodeSearchObjectChunk, isBinarySearchObjectChunk, \
+    unpackSearchObjectJson
 from peek_core_search._private.worker.tasks._CalcChunkKey import makeSearchObjectChunkKey
 
 logger = logging.getLogger(__name__)
@@ -35,10 +40,31 @@ class SearchObjectCacheController(ACICacheControllerABC):
     """
 
     _ChunkedTuple = EncodedSearchObjectChunk
-    _chunkLoadRpcMethod = ClientChunkLoadRpc.loadSearchObjectChunks
     _updateFromServerFilt = clientSearchObjectUpdateFromServerFilt
     _logger = logger
 
+    @staticmethod
+    def _chunkLoadRpcMethod(offset: int, count: int):
+        # Tell the server which chunk envelope codecs we can read
+        return ClientChunkLoadRpc.loadSearchObjectChunks(
+            offset, count, acceptedCodecs=SUPPORTED_CHUNK_CODECS
+        )
+
+    def __init__(self, clientId: str):
+        ACICacheControllerABC.__init__(self, clientId)
+        self._chunkFormatController = None
+
+    def setChunkFormatController(self, chunkFormatController):
+        self._chunkFormatController = chunkFormatController
+
+    @property
+    def bucketCount(self) -> int:
+        return self._chunkFormatController.objectBucketCount
+
+    def shutdown(self):
+        ACICacheControllerABC.shutdown(self)
+        self._chunkFormatController = None
+
     @deferToThreadWrapWithLogger(logger)
     def getObjects(self, objectTypeId: Optional[int],
                    objectIds: List[int]) -> List[SearchResultObjectTuple]:
@@ -48,8 +74,10 @@ class SearchObjectCacheController(ACICacheControllerABC):
                            objectIds: List[int]) -> List[SearchResultObjectTuple]:
 
         objectIdsByChunkKey = defaultdict(list)
+        bucketCount = self.bucketCount
         for objectId in objectIds:
-            objectIdsByChunkKey[makeSearchObjectChunkKey(objectId)].append(objectId)
+            objectIdsByChunkKey[makeSearchObjectChunkKey(objectId, bucketCount)] \
+                .append(objectId)
 
         foundObjects: List[SearchResultObjectTuple] = []
         for chunkKey, subObjectIds in objectIdsByChunkKey.items():
@@ -68,51 +96,58 @@ class SearchObjectCacheController(ACICacheControllerABC):
         if not chunk:
             return []
 
-        objectPropsByIdStr = Payload().fromEncodedPayload(chunk.encodedData).tuples[0]
-        objectPropsById = ujson.loads(objectPropsByIdStr)
+        encodedData = unwrapChunk(chunk.encodedData)
+
+        if isBinarySearchObjectChunk(encodedData):
+            objects = decodeSearchObjectChunk(encodedData, objectIds)
+        else:
+            objects = self._unpackLegacyChunk(encodedData, objectIds)
 
         foundObjects: List[SearchResultObjectTuple] = []
 
         for objectId in objectIds:
-            if str(objectId) not in objectPropsById:
+            if objectId not in objects:
                 logger.warning(
                     "Search object id %s is missing from index, chunkKey %s",
                     objectId, chunkKey
                 )
                 continue
 
-            # Reconstruct the data
-            objectProps: {} = ujson.loads(objectPropsById[str(objectId)])
-
-            # Get out the object type
-            thisObjectTypeId = objectProps['_otid_']
-            del objectProps['_otid_']
+            obj: DecodedSearchObject = objects[objectId]
 
             # If the property is set, then make sure it matches
-            if objectTypeId is not None and objectTypeId != thisObjectTypeId:
+            if objectTypeId is not None and objectTypeId != obj.objectTypeId:
                 continue
 
-            # Get out the routes
-            routes: List[List[str]] = objectProps['_r_']
-            del objectProps['_r_']
-
-            # Get the key
-            objectKey: str = objectProps['key']
-
             # Create the new object
             newObject = SearchResultObjectTuple()
             foundObjects.append(newObject)
 
             newObject.id = objectId
-            newObject.key = objectKey
-            newObject.objectType = SearchObjectTypeTuple(id=thisObjectTypeId)
-            newObject.properties = objectProps
+            newObject.key = obj.properties['key']
+            newObject.objectType = SearchObjectTypeTuple(id=obj.objectTypeId)
+            newObject.properties = obj.properties
 
-            for route in routes:
+            for title, path in obj.routes:
                 newRoute = SearchResultObjectRouteTuple()
                 newObject.routes.append(newRoute)
 
-                newRoute.title = route[0]
-                newRoute.path = route[1]
+                newRoute.title = title
+                newRoute.path = path
 
         return foundObjects
+
+    def _unpackLegacyChunk(self, encodedData: bytes,
+                           objectIds: List[int]) -> Dict[int, DecodedSearchObject]:
+        """ Unpack Legacy Chunk
+
+        Chunks compiled before the binary format are a vortex payload of
+        {id: packedJson} JSON.
+
+        """
+        objectPropsByIdStr = Payload().fromEncodedPayload(encodedData).tuples[0]
+        objectPropsById = ujson.loads(objectPropsByIdStr)
+
+        return {objectId: unpackSearchObjectJson(objectId, objectPropsById[str(objectId)])
+                for objectId in objectIds
+                if str(objectId) in objectPropsById}
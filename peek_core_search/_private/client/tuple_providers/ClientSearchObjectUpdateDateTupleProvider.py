@@ -22,6 +22,7 @@ class ClientSearchObjectUpdateDateTupleProvider(TuplesProviderABC):
     def makeVortexMsg(self, filt: dict,
                       tupleSelector: TupleSelector) -> Union[Deferred, bytes]:
         tuple_ = SearchObjectUpdateDateTuple()
+        tuple_.bucketCount = self._cacheHandler.bucketCount
         tuple_.updateDateByChunkKey = {
             key:self._cacheHandler.encodedChunk(key).lastUpdate
             for key in self._cacheHandler.encodedChunkKeys()
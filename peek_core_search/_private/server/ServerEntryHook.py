@@ -29,11 +29,14 @@ from .TupleDataObservable import makeTupleDataObservableHandler
 from .admin_backend import makeAdminBackendHandlers
 from .api.SearchApi import SearchApi
 from .client_handlers.ClientChunkLoadRpc import ClientChunkLoadRpc
+from .client_handlers.ClientSearchChunkFormatUpdateHandler import \
+    ClientSearchChunkFormatUpdateHandler
 from .client_handlers.ClientSearchIndexChunkUpdateHandler import \
     ClientSearchIndexChunkUpdateHandler
 from .client_handlers.ClientSearchObjectChunkUpdateHandler import \
     ClientSearchObjectChunkUpdateHandler
 from .controller.MainController import MainController
+from .controller.SearchChunkRebuildController import SearchChunkRebuildController
 from .controller.SearchIndexChunkCompilerQueueController import \
     SearchIndexChunkCompilerQueueController
 from .controller.SearchObjectChunkCompilerQueueController import \
@@ -148,6 +151,11 @@ class ServerEntryHook(PluginServerEntryHookABC,
         )
         self._loadedObjects.append(clientSearchObjectChunkUpdateHandler)
 
+        # ----------------
+        # Client Search Chunk Format update handler
+        clientSearchChunkFormatUpdateHandler = ClientSearchChunkFormatUpdateHandler()
+        self._loadedObjects.append(clientSearchChunkFormatUpdateHandler)
+
         # ----------------
         # Status Controller
         statusController = StatusController()
@@ -161,21 +169,39 @@ class ServerEntryHook(PluginServerEntryHookABC,
         )
         self._loadedObjects.append(tupleObservable)
 
+        # ----------------
+        # Import Controller
+        searchObjectImportController = SearchObjectImportController()
+        self._loadedObjects.append(searchObjectImportController)
+
         # ----------------
         # Admin Handler
         self._loadedObjects.extend(
-            makeAdminBackendHandlers(tupleObservable, self.dbSessionCreator)
+            makeAdminBackendHandlers(tupleObservable, self.dbSessionCreator,
+                                     searchObjectImportController)
         )
 
         # ----------------
         # Tell the status controller about the Tuple Observable
         statusController.setTupleObservable(tupleObservable)
 
+        # ----------------
+        # Search Chunk Rebuild Controller
+        searchChunkRebuildController = SearchChunkRebuildController(
+            dbSessionCreator=self.dbSessionCreator,
+            statusController=statusController,
+            clientSearchIndexUpdateHandler=clientSearchIndexChunkUpdateHandler,
+            clientSearchObjectUpdateHandler=clientSearchObjectChunkUpdateHandler,
+            clientChunkFormatUpdateHandler=clientSearchChunkFormatUpdateHandler
+        )
+        self._loadedObjects.append(searchChunkRebuildController)
+
         # ----------------
         # Main Controller
         mainController = MainController(
             dbSessionCreator=self.dbSessionCreator,
-            tupleObservable=tupleObservable)
+            tupleObservable=tupleObservable,
+            searchChunkRebuildController=searchChunkRebuildController)
 
         self._loadedObjects.append(mainController)
 
@@ -184,7 +210,8 @@ class ServerEntryHook(PluginServerEntryHookABC,
         objectChunkCompilerQueueController = SearchObjectChunkCompilerQueueController(
             dbSessionCreator=self.dbSessionCreator,
             statusController=statusController,
-            clientSearchObjectUpdateHandler=clientSearchObjectChunkUpdateHandler
+            clientSearchObjectUpdateHandler=clientSearchObjectChunkUpdateHandler,
+            isProcessorEnabledCallable=searchChunkRebuildController.isProcessorEnabled
         )
         self._loadedObjects.append(objectChunkCompilerQueueController)
 
@@ -194,14 +221,15 @@ class ServerEntryHook(PluginServerEntryHookABC,
             dbSessionCreator=self.dbSessionCreator,
             statusController=statusController,
             clientSearchIndexUpdateHandler=clientSearchIndexChunkUpdateHandler,
-            isProcessorEnabledCallable=objectChunkCompilerQueueController.isQueueEmpty
+            isProcessorEnabledCallable=searchChunkRebuildController.isProcessorEnabled
         )
         self._loadedObjects.append(indexChunkCompilerQueueController)
 
         # ----------------
-        # Import Controller
-        searchObjectImportController = SearchObjectImportController()
-        self._loadedObjects.append(searchObjectImportController)
+        # Tell the rebuild controller about the compiler queue controllers
+        searchChunkRebuildController.setQueueControllers(
+            objectChunkCompilerQueueController, indexChunkCompilerQueueController
+        )
 
         # ----------------
         # Setup the Action Processor
@@ -216,6 +244,8 @@ class ServerEntryHook(PluginServerEntryHookABC,
         # ----------------
         # Start the compiler controllers
 
+        yield searchChunkRebuildController.start()
+
         settings = yield self._loadSettings()
 
         if settings[KEYWORD_COMPILER_ENABLED]:
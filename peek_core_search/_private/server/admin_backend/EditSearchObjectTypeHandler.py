@@ -1,6 +1,8 @@
 import logging
 
 from peek_core_search._private.PluginNames import searchFilt
+from peek_core_search._private.server.controller.SearchObjectImportController import \
+    SearchObjectImportController
 from peek_core_search._private.storage.SearchObjectTypeTuple import \
     SearchObjectTypeTuple
 from vortex.TupleSelector import TupleSelector
@@ -27,13 +29,16 @@ class __ExtUpdateObservable(OrmCrudHandlerExtension):
 
     """
 
-    def __init__(self, tupleDataObserver: TupleDataObservableHandler):
+    def __init__(self, tupleDataObserver: TupleDataObservableHandler,
+                 importController: SearchObjectImportController):
         self._tupleDataObserver = tupleDataObserver
+        self._importController = importController
 
     def _tellObserver(self, tuple_, tuples, session, payloadFilt):
         self._tupleDataObserver.notifyOfTupleUpdate(
             TupleSelector(SearchObjectTypeTuple.tupleName(), {})
         )
+        self._importController.lookupsChanged()
         return True
 
     afterUpdateCommit = _tellObserver
@@ -41,10 +46,12 @@ class __ExtUpdateObservable(OrmCrudHandlerExtension):
 
 
 # This method creates an instance of the handler class.
-def makeSearchObjectTypeHandler(tupleObservable, dbSessionCreator):
+def makeSearchObjectTypeHandler(tupleObservable, dbSessionCreator,
+                                importController):
     handler = __CrudHandler(dbSessionCreator, SearchObjectTypeTuple,
                             filtKey, retreiveAll=True)
 
     logger.debug("Started")
-    handler.addExtension(SearchObjectTypeTuple, __ExtUpdateObservable(tupleObservable))
+    handler.addExtension(SearchObjectTypeTuple,
+                         __ExtUpdateObservable(tupleObservable, importController))
     return handler
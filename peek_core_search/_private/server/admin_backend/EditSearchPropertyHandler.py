@@ -1,6 +1,8 @@
 import logging
 
 from peek_core_search._private.PluginNames import searchFilt
+from peek_core_search._private.server.controller.SearchObjectImportController import \
+    SearchObjectImportController
 from peek_core_search._private.storage.SearchPropertyTuple import SearchPropertyTuple
 from vortex.TupleSelector import TupleSelector
 from vortex.handler.TupleDataObservableHandler import TupleDataObservableHandler
@@ -25,13 +27,16 @@ class __ExtUpdateObservable(OrmCrudHandlerExtension):
     it then notifies the observer.
 
     """
-    def __init__(self, tupleDataObserver: TupleDataObservableHandler):
+    def __init__(self, tupleDataObserver: TupleDataObservableHandler,
+                 importController: SearchObjectImportController):
         self._tupleDataObserver = tupleDataObserver
+        self._importController = importController
 
     def _tellObserver(self, tuple_, tuples, session, payloadFilt):
         self._tupleDataObserver.notifyOfTupleUpdate(
             TupleSelector(SearchPropertyTuple.tupleName(), {})
         )
+        self._importController.lookupsChanged()
         return True
 
     afterUpdateCommit = _tellObserver
@@ -39,10 +44,12 @@ class __ExtUpdateObservable(OrmCrudHandlerExtension):
 
 
 # This method creates an instance of the handler class.
-def makeSearchPropertyHandler(tupleObservable, dbSessionCreator):
+def makeSearchPropertyHandler(tupleObservable, dbSessionCreator,
+                              importController):
     handler = __CrudHandler(dbSessionCreator, SearchPropertyTuple,
                             filtKey, retreiveAll=True)
 
     logger.debug("Started")
-    handler.addExtension(SearchPropertyTuple, __ExtUpdateObservable(tupleObservable))
+    handler.addExtension(SearchPropertyTuple,
+                         __ExtUpdateObservable(tupleObservable, importController))
     return handler
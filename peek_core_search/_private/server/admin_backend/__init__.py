@@ -1,3 +1,5 @@
+from peek_core_search._private.server.controller.SearchObjectImportController import \
+    SearchObjectImportController
 from vortex.handler.TupleDataObservableHandler import TupleDataObservableHandler
 from .EditSearchObjectTypeHandler import makeSearchObjectTypeHandler
 from .EditSearchPropertyHandler import makeSearchPropertyHandler
@@ -5,8 +7,11 @@ from .SettingPropertyHandler import makeSettingPropertyHandler
 
 
 def makeAdminBackendHandlers(tupleObservable: TupleDataObservableHandler,
-                             dbSessionCreator):
-    yield makeSearchPropertyHandler(tupleObservable, dbSessionCreator)
-    yield makeSearchObjectTypeHandler(tupleObservable, dbSessionCreator)
+                             dbSessionCreator,
+                             importController: SearchObjectImportController):
+    yield makeSearchPropertyHandler(tupleObservable, dbSessionCreator,
+                                    importController)
+    yield makeSearchObjectTypeHandler(tupleObservable, dbSessionCreator,
+                                      importController)
 
     yield makeSettingPropertyHandler(dbSessionCreator)
@@ -1,4 +1,4 @@
-from typing import List
+from typing import Iterable, List, Union
 
 from twisted.internet.defer import Deferred
 
@@ -15,9 +15,17 @@ class SearchApi(SearchApiABC):
     def shutdown(self):
         pass
 
-    def importSearchObjects(self, searchObjectsEncodedPayload: bytes) -> Deferred:
+    def importSearchObjects(self, searchObjectsEncodedPayload: bytes,
+                            interactive: bool = False) -> Deferred:
         return self._importController.importSearchObjects(
-            searchObjectsEncodedPayload
+            searchObjectsEncodedPayload, interactive=interactive
+        )
+
+    def importSearchObjectsStream(self, searchObjectsEncodedPayloads: Iterable[
+        Union[bytes, Deferred]], bulkLoad: bool = False,
+                                  interactive: bool = False) -> Deferred:
+        return self._importController.importSearchObjectsStream(
+            searchObjectsEncodedPayloads, bulkLoad=bulkLoad, interactive=interactive
         )
 
     def removeSearchObjects(self, importGroupHashes: List[str]) -> Deferred:
@@ -1,6 +1,7 @@
 import logging
-from typing import Optional
+from typing import List, Optional
 
+from vortex.Payload import Payload
 from vortex.rpc.RPC import vortexRPC
 
 from peek_abstract_chunked_index.private.server.client_handlers.ACIChunkLoadRpcABC import \
@@ -10,6 +11,9 @@ from peek_core_search._private.storage.EncodedSearchIndexChunk import \
     EncodedSearchIndexChunk
 from peek_core_search._private.storage.EncodedSearchObjectChunk import \
     EncodedSearchObjectChunk
+from peek_core_search._private.storage.SearchChunkFormatTuple import \
+    SearchChunkFormatTuple
+from peek_core_search._private.worker.tasks.ChunkEnvelope import transcodeChunk
 from peek_plugin_base.PeekVortexUtil import peekServerName, peekClientName
 
 logger = logging.getLogger(__name__)
@@ -28,28 +32,73 @@ class ClientChunkLoadRpc(ACIChunkLoadRpcABC):
 
         yield self.loadSearchIndexChunks.start(funcSelf=self)
         yield self.loadSearchObjectChunks.start(funcSelf=self)
+        yield self.loadSearchChunkFormat.start(funcSelf=self)
         logger.debug("RPCs started")
 
     # -------------
     @vortexRPC(peekServerName, acceptOnlyFromVortex=peekClientName, timeoutSeconds=60,
                additionalFilt=searchFilt, deferToThread=True)
-    def loadSearchIndexChunks(self, offset: int, count: int) -> Optional[bytes]:
+    def loadSearchIndexChunks(self, offset: int, count: int,
+                              acceptedCodecs: Optional[List[int]] = None
+                              ) -> Optional[bytes]:
         """ Update Page Loader Status
 
         Tell the server of the latest status of the loader
 
+        :param acceptedCodecs: The ChunkEnvelope codecs the client can read,
+            None for clients that don't know about the chunk envelope.
+
         """
-        return self.ckiInitialLoadChunksPayloadBlocking(offset, count,
-                                                        EncodedSearchIndexChunk)
+        return self._loadChunksPayloadBlocking(offset, count,
+                                               EncodedSearchIndexChunk, acceptedCodecs)
 
     # -------------
     @vortexRPC(peekServerName, acceptOnlyFromVortex=peekClientName, timeoutSeconds=60,
                additionalFilt=searchFilt, deferToThread=True)
-    def loadSearchObjectChunks(self, offset: int, count: int) -> Optional[bytes]:
+    def loadSearchObjectChunks(self, offset: int, count: int,
+                               acceptedCodecs: Optional[List[int]] = None
+                               ) -> Optional[bytes]:
         """ Update Page Loader Status
 
         Tell the server of the latest status of the loader
 
+        :param acceptedCodecs: The ChunkEnvelope codecs the client can read,
+            None for clients that don't know about the chunk envelope.
+
+        """
+        return self._loadChunksPayloadBlocking(offset, count,
+                                               EncodedSearchObjectChunk, acceptedCodecs)
+
+    # -------------
+    @vortexRPC(peekServerName, acceptOnlyFromVortex=peekClientName, timeoutSeconds=60,
+               additionalFilt=searchFilt, deferToThread=True)
+    def loadSearchChunkFormat(self) -> bytes:
+        """ Load Search Chunk Format
+
+        Tell the client the bucket counts the chunks are keyed with
+
+        """
+        session = self._dbSessionCreator()
+        try:
+            chunkFormat = session.query(SearchChunkFormatTuple).one()
+            return Payload(tuples=[chunkFormat]).toEncodedPayload()
+
+        finally:
+            session.close()
+
+    def _loadChunksPayloadBlocking(self, offset: int, count: int, Declarative,
+                                   acceptedCodecs: Optional[List[int]]
+                                   ) -> Optional[bytes]:
+        """ Load Chunks Payload
+
+        Load the chunks, converting them into a codec the client can read.
+
         """
-        return self.ckiInitialLoadChunksPayloadBlocking(offset, count,
-                                                        EncodedSearchObjectChunk)
+        chunks = self.ckiInitialLoadChunksBlocking(offset, count, Declarative)
+        if not chunks:
+            return None
+
+        for chunk in chunks:
+            chunk.encodedData = transcodeChunk(chunk.encodedData, acceptedCodecs)
+
+        return Payload(tuples=chunks).toEncodedPayload()
@@ -0,0 +1,38 @@
+import logging
+
+from vortex.DeferUtil import vortexLogFailure
+from vortex.Payload import Payload
+from vortex.VortexFactory import VortexFactory
+
+from peek_core_search._private.client.controller.SearchChunkFormatController import \
+    clientSearchChunkFormatUpdateFromServerFilt
+from peek_core_search._private.storage.SearchChunkFormatTuple import \
+    SearchChunkFormatTuple
+from peek_plugin_base.PeekVortexUtil import peekClientName
+
+logger = logging.getLogger(__name__)
+
+
+class ClientSearchChunkFormatUpdateHandler:
+    """ Client Search Chunk Format Update Handler
+
+    Send the bucket counts to the clients when a re-key switches them, the clients
+    then reload their chunks.
+
+    """
+
+    def shutdown(self):
+        pass
+
+    def sendChunkFormat(self, chunkFormat: SearchChunkFormatTuple) -> None:
+        if peekClientName not in VortexFactory.getRemoteVortexName():
+            logger.debug("No clients are online to send the chunk format to")
+            return
+
+        payload = Payload(filt=clientSearchChunkFormatUpdateFromServerFilt,
+                          tuples=[chunkFormat])
+
+        d = payload.makePayloadEnvelopeDefer()
+        d.addCallback(lambda payloadEnvelope: payloadEnvelope.toVortexMsgDefer())
+        d.addCallback(VortexFactory.sendVortexMsg, destVortexName=peekClientName)
+        d.addErrback(vortexLogFailure, logger, consumeError=True)
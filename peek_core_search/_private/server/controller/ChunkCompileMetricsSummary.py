@@ -0,0 +1,106 @@
+from bisect import bisect_left
+from typing import Dict, List
+
+
+class _Histogram:
+    def __init__(self, upperBounds: List[float]):
+        self._upperBounds = upperBounds
+        self._counts = [0] * (len(upperBounds) + 1)
+
+    def add(self, value: float) -> None:
+        self._counts[bisect_left(self._upperBounds, value)] += 1
+
+    def toList(self) -> List[List]:
+        """ To List
+
+        :return: A list of [upper bound, count], the last upper bound is None
+        """
+        return [[bound, count]
+                for bound, count in zip(self._upperBounds + [None], self._counts)]
+
+
+class ChunkCompileMetricsSummary:
+    """ Chunk Compile Metrics Summary
+
+    Aggregate the per chunk metrics returned by a chunk compiler task, into
+    histograms, totals, and the largest and slowest chunks, for the admin status.
+
+    """
+
+    #: The number of chunks kept in the largest and slowest lists
+    TOP_COUNT = 10
+
+    BYTES_UPPER_BOUNDS = [4 * 1024, 16 * 1024, 64 * 1024, 256 * 1024,
+                          1024 * 1024, 4 * 1024 * 1024]
+
+    ROWS_UPPER_BOUNDS = [10, 100, 1000, 10000, 100000]
+
+    SECONDS_UPPER_BOUNDS = [0.01, 0.1, 1.0, 10.0]
+
+    def __init__(self):
+        self.bytesHistogram = _Histogram(self.BYTES_UPPER_BOUNDS)
+        self.rowsHistogram = _Histogram(self.ROWS_UPPER_BOUNDS)
+        self.secondsHistogram = _Histogram(self.SECONDS_UPPER_BOUNDS)
+
+        self.chunksCompiled = 0
+        self.chunksSkipped = 0
+        self.encodeSeconds = 0.0
+        self.dbReadSeconds = 0.0
+        self.dbWriteSeconds = 0.0
+
+        # [chunkKey, encodedBytes, rowsRead, seconds], by chunk key
+        self._largestByChunkKey: Dict[int, List] = {}
+        self._slowestByChunkKey: Dict[int, List] = {}
+
+    @property
+    def largestChunks(self) -> List[List]:
+        """ Largest Chunks
+
+        :return: A list of [chunkKey, encodedBytes, rowsRead, seconds], largest first
+        """
+        return sorted(self._largestByChunkKey.values(), key=lambda c: -c[1])
+
+    @property
+    def slowestChunks(self) -> List[List]:
+        """ Slowest Chunks
+
+        :return: A list of [chunkKey, encodedBytes, rowsRead, seconds], slowest first
+        """
+        return sorted(self._slowestByChunkKey.values(), key=lambda c: -c[3])
+
+    def add(self, chunkMetrics: List[List]) -> None:
+        """ Add
+
+        :param chunkMetrics: The ChunkCompileMetrics.toList() returned by the task
+        """
+        for (chunkKey, rowsRead, encodeSeconds, encodedBytes, hashMatched,
+             dbReadSeconds, dbWriteSeconds) in chunkMetrics:
+            seconds = encodeSeconds + dbReadSeconds + dbWriteSeconds
+
+            self.chunksCompiled += 1
+            self.chunksSkipped += 1 if hashMatched else 0
+            self.encodeSeconds += encodeSeconds
+            self.dbReadSeconds += dbReadSeconds
+            self.dbWriteSeconds += dbWriteSeconds
+
+            self.bytesHistogram.add(encodedBytes)
+            self.rowsHistogram.add(rowsRead)
+            self.secondsHistogram.add(seconds)
+
+            chunk = [chunkKey, encodedBytes, rowsRead, round(seconds, 3)]
+            self._addTop(self._largestByChunkKey, chunk, 1)
+            self._addTop(self._slowestByChunkKey, chunk, 3)
+
+    def _addTop(self, chunksByChunkKey: Dict[int, List], chunk: List,
+                index: int) -> None:
+        # A chunk that is compiled again replaces its last metrics
+        chunksByChunkKey.pop(chunk[0], None)
+
+        if len(chunksByChunkKey) < self.TOP_COUNT:
+            chunksByChunkKey[chunk[0]] = chunk
+            return
+
+        smallest = min(chunksByChunkKey.values(), key=lambda c: c[index])
+        if smallest[index] < chunk[index]:
+            del chunksByChunkKey[smallest[0]]
+            chunksByChunkKey[chunk[0]] = chunk
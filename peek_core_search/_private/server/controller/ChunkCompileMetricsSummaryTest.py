@@ -0,0 +1,45 @@
+from twisted.trial import unittest
+
+from peek_core_search._private.server.controller.ChunkCompileMetricsSummary import \
+    ChunkCompileMetricsSummary
+from peek_core_search._private.worker.tasks._ChunkCompileMetrics import \
+    ChunkCompileMetrics
+
+
+class ChunkCompileMetricsSummaryTest(unittest.TestCase):
+    def testMetrics(self):
+        metrics = ChunkCompileMetrics()
+        metrics.addRead({1: 30, 2: 10}, 0.4)
+        metrics.addEncode(1, 0.1, 3000)
+        metrics.addEncode(2, 0.2, 1000)
+        metrics.setHashMatched(2)
+        metrics.addWrite([1, 3], 1.0)
+
+        self.assertEqual([[1, 30, 0.1, 3000, False, 0.3, 1.0],
+                          [2, 10, 0.2, 1000, True, 0.1, 0.0],
+                          [3, 0, 0.0, 0, False, 0.0, 0.0]],
+                         metrics.toList())
+
+    def testSummary(self):
+        summary = ChunkCompileMetricsSummary()
+        summary.add([[chunkKey, chunkKey * 100, 0.0, chunkKey * 1000, chunkKey % 2 == 0,
+                      chunkKey * 0.01, 0.0]
+                     for chunkKey in range(1, 21)])
+
+        self.assertEqual(20, summary.chunksCompiled)
+        self.assertEqual(10, summary.chunksSkipped)
+
+        self.assertEqual([[4096, 4], [16384, 12], [65536, 4], [262144, 0],
+                          [1048576, 0], [4194304, 0], [None, 0]],
+                         summary.bytesHistogram.toList())
+        self.assertEqual(20, sum([c for _, c in summary.rowsHistogram.toList()]))
+
+        self.assertEqual(list(range(20, 10, -1)),
+                         [c[0] for c in summary.largestChunks])
+        self.assertEqual(list(range(20, 10, -1)),
+                         [c[0] for c in summary.slowestChunks])
+
+        # A chunk compiled again replaces its last metrics
+        summary.add([[20, 1, 0.0, 1, False, 0.0, 0.0]])
+        self.assertEqual(list(range(19, 10, -1)) + [20],
+                         [c[0] for c in summary.largestChunks])
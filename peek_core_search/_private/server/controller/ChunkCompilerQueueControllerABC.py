@@ -0,0 +1,239 @@
+from abc import abstractmethod
+from datetime import datetime
+from typing import List, Optional
+
+import pytz
+from sqlalchemy import select, asc, and_
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import ColumnElement
+from twisted.internet.defer import inlineCallbacks, Deferred
+from vortex.Payload import Payload
+
+from peek_abstract_chunked_index.private.server.controller.ACIProcessorQueueControllerABC import \
+    ACIProcessorQueueControllerABC, ACIProcessorQueueBlockItem
+from peek_core_search._private.server.controller.ChunkCompileMetricsSummary import \
+    ChunkCompileMetricsSummary
+from peek_core_search._private.server.controller.ChunkCompilerTuner import \
+    ChunkCompilerTuner
+from peek_core_search._private.worker.tasks._QueueChunks import \
+    QUEUE_PRIORITY_BULK
+from peek_plugin_base.storage.RunPyInPg import runPyInPg
+
+
+class ChunkCompilerQueueControllerABC(ACIProcessorQueueControllerABC):
+    """ Chunk Compiler Queue Controller ABC
+
+    The chunk compiler queue controllers tune their block size, blocks in flight and
+    poll period with a ChunkCompilerTuner, instead of using fixed class constants.
+
+    QUEUE_ITEMS_PER_TASK, QUEUE_BLOCKS_MAX and POLL_PERIOD_SECONDS are the upper
+    limits of the tuned values.
+
+    The chunks queued by interactive imports are fetched and sent to the workers
+    ahead of the bulk work.
+
+    The compiler tasks return the metrics of each chunk they compile, these are
+    summarised for the admin status.
+
+    """
+
+    MIN_QUEUE_ITEMS_PER_TASK = 1
+    MIN_QUEUE_BLOCKS = 2
+    MAX_POLL_PERIOD_SECONDS = 5.0
+
+    #: The tuner shrinks the blocks when the worker tasks take longer than this
+    TARGET_TASK_SECONDS = 5.0
+
+    #: When there are both, at least this share of each fetch is bulk work, so a
+    # steady stream of interactive imports doesn't stall it.
+    BULK_FETCH_SHARE = 0.25
+
+    def __init__(self, *args, **kwargs):
+        ACIProcessorQueueControllerABC.__init__(self, *args, **kwargs)
+
+        self._tuner = ChunkCompilerTuner(
+            minItemsPerTask=self.MIN_QUEUE_ITEMS_PER_TASK,
+            maxItemsPerTask=self.QUEUE_ITEMS_PER_TASK,
+            minBlocks=self.MIN_QUEUE_BLOCKS,
+            maxBlocks=self.QUEUE_BLOCKS_MAX,
+            minPollSeconds=self.POLL_PERIOD_SECONDS,
+            maxPollSeconds=self.MAX_POLL_PERIOD_SECONDS,
+            targetTaskSeconds=self.TARGET_TASK_SECONDS
+        )
+        self._applyTuning()
+
+        self._metricsSummary = ChunkCompileMetricsSummary()
+
+    @property
+    def tuner(self) -> ChunkCompilerTuner:
+        return self._tuner
+
+    def _applyTuning(self):
+        # The ACI reads these from self, so they shadow the class constants
+        self.QUEUE_BLOCKS_MAX = self._tuner.blocksMax
+        self.QUEUE_BLOCKS_MIN = self._tuner.blocksMin
+
+        if self._pollLoopingCall:
+            self._pollLoopingCall.interval = self._tuner.pollSeconds
+
+        self._processorStatusNotifier.setTuning(self._tuner)
+
+    def _recordChunkMetrics(self, chunkMetrics: List[List]) -> None:
+        self._metricsSummary.add(chunkMetrics)
+        self._processorStatusNotifier.setMetrics(self._metricsSummary)
+
+    def _sendToWorker(self, block: ACIProcessorQueueBlockItem) -> Deferred:
+        startTime = datetime.now(pytz.utc)
+
+        def taskCompleted(results):
+            self._tuner.taskCompleted(
+                (datetime.now(pytz.utc) - startTime).total_seconds()
+            )
+            return results
+
+        d = self._sendBlockToWorker(block)
+        d.addCallback(taskCompleted)
+        return d
+
+    @classmethod
+    def _fetchableWhere(cls, queueTable) -> Optional[ColumnElement]:
+        """ Fetchable Where
+
+        Override this to leave some of the queued chunks in the queue, they are
+        fetched once the where clause is true for them.
+
+        """
+        return None
+
+    @abstractmethod
+    def _sendBlockToWorker(self, block: ACIProcessorQueueBlockItem) -> Deferred:
+        """ Send Block To Worker
+
+        Call the compiler worker task, and return the deferred.
+
+        """
+
+    def _dedupeQueueSql(self, lastFetchedId: int, dedupeLimit: int):
+        # The queue has a unique index on the chunkKey, there is nothing to dedupe.
+        return None
+
+    @inlineCallbacks
+    def _fetchBlocks(self) -> List[ACIProcessorQueueBlockItem]:
+        if self._tuner.tune():
+            self._applyTuning()
+
+        toGrab = (self._tuner.blocksMax - self._queueCount) * self._tuner.itemsPerTask
+        if toGrab <= 0:
+            return []
+
+        startTime = datetime.now(pytz.utc)
+
+        queueSize, rawPriorityBlocks, rawBulkBlocks = yield runPyInPg(
+            self._logger,
+            self._dbSessionCreator,
+            self._fetchTunedBlocksInPg,
+            list(self._queueIdsInBuffer),
+            toGrab,
+            self._tuner.itemsPerTask
+        )
+
+        self._tuner.fetchCompleted((datetime.now(pytz.utc) - startTime).total_seconds(),
+                                   queueSize)
+
+        priorityBlocks = self._loadBlocks(rawPriorityBlocks)
+        bulkBlocks = self._loadBlocks(rawBulkBlocks)
+
+        # The buffer may still hold bulk blocks from the last fetch, the priority
+        # blocks go in front of them.
+        self._fetchedBlockBuffer.extendleft(reversed(priorityBlocks))
+
+        return bulkBlocks
+
+    def _loadBlocks(self, rawBlocks) -> List[ACIProcessorQueueBlockItem]:
+        blocks = []
+        for raw in rawBlocks:
+            block = ACIProcessorQueueBlockItem(raw[0], raw[1].encode(), set(raw[2]))
+            blocks.append(block)
+            self._queueIdsInBuffer.update(block.queueIds)
+
+        return blocks
+
+    @classmethod
+    def _fetchTunedBlocksInPg(cls, plpy, queueIdsInBuffer: List[int], toGrab: int,
+                              itemsPerTask: int):
+        """ Fetch Tuned Blocks In PG
+
+        Fetch the oldest queue items that aren't already in the buffer, in blocks of
+        itemsPerTask. The queue has one row per chunk, so there are no duplicates.
+
+        The items queued with a priority are fetched first, but at least
+        BULK_FETCH_SHARE of toGrab is left for the bulk items.
+
+        :return: A list of [the queue size, the priority blocks, the bulk blocks]
+        """
+        queueIdsInBuffer = set(queueIdsInBuffer)
+        queueTable = cls._QueueDeclarative.__table__
+
+        queueSize = plpy.execute('SELECT count(*) AS "count" FROM "%s"."%s"'
+                                 % (queueTable.schema, queueTable.name))[0]['count']
+
+        # Turn a row["val"] into a row.val
+        class Wrap:
+            row = None
+
+            def __getattr__(self, name):
+                return self.row[name]
+
+        wrap = Wrap()
+        fetchableWhere = cls._fetchableWhere(queueTable)
+
+        def fetchItems(whereClause):
+            if fetchableWhere is not None:
+                whereClause = and_(whereClause, fetchableWhere)
+
+            sql = select([queueTable]) \
+                .where(whereClause) \
+                .order_by(asc(queueTable.c.id)) \
+                .limit(toGrab + len(queueIdsInBuffer))
+
+            sqlQry = str(sql.compile(dialect=postgresql.dialect(),
+                                     compile_kwargs={"literal_binds": True}))
+
+            items = []
+            cursor = plpy.cursor(sqlQry)
+            while len(items) < toGrab:
+                rows = cursor.fetch(1000)
+                if not rows:
+                    break
+                for row in rows:
+                    wrap.row = row
+                    if wrap.id not in queueIdsInBuffer:
+                        items.append(cls._QueueDeclarative.sqlCoreLoad(wrap))
+
+            return items
+
+        priorityItems = fetchItems(queueTable.c.priority > QUEUE_PRIORITY_BULK)
+        bulkItems = fetchItems(queueTable.c.priority == QUEUE_PRIORITY_BULK)
+
+        bulkCount = max(int(toGrab * cls.BULK_FETCH_SHARE),
+                        toGrab - len(priorityItems))
+        bulkItems = bulkItems[:bulkCount]
+        priorityItems = priorityItems[:toGrab - len(bulkItems)]
+
+        def makeBlocks(queueItems):
+            queueBlocks = []
+            for start in range(0, len(queueItems), itemsPerTask):
+                items = queueItems[start: start + itemsPerTask]
+                queueIds = [item.id for item in items]
+
+                itemsEncodedPayload = Payload(tuples=[items, queueIds]) \
+                    .toEncodedPayload()
+
+                queueBlocks.append(
+                    (queueIds, itemsEncodedPayload.decode(),
+                     [item.ckiUniqueKey for item in items])
+                )
+
+            return queueBlocks
+
+        return [queueSize, makeBlocks(priorityItems), makeBlocks(bulkItems)]
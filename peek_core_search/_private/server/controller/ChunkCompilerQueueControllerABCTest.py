@@ -0,0 +1,119 @@
+import logging
+
+from twisted.internet import defer
+from twisted.trial import unittest
+
+from peek_core_search._private.server.controller import \
+    ChunkCompilerQueueControllerABC as controllerModule
+from peek_core_search._private.server.controller.ChunkCompilerQueueControllerABC import \
+    ChunkCompilerQueueControllerABC
+from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexCompilerQueue import \
+    SearchIndexCompilerQueue
+
+logger = logging.getLogger(__name__)
+
+
+class _Notifier:
+    def __getattr__(self, name):
+        return lambda *args: None
+
+
+class _Controller(ChunkCompilerQueueControllerABC):
+    QUEUE_ITEMS_PER_TASK = 10
+    POLL_PERIOD_SECONDS = 1.0
+    QUEUE_BLOCKS_MAX = 4
+    QUEUE_BLOCKS_MIN = 2
+    WORKER_TASK_TIMEOUT = 60.0
+
+    _logger = logger
+    _QueueDeclarative = SearchIndexCompilerQueue
+    _VacuumDeclaratives = (SearchIndex,)
+
+    fetchArgs = None
+    rawPriorityBlocks = []
+    rawBulkBlocks = []
+
+    @classmethod
+    def _fetchTunedBlocksInPg(cls, plpy, queueIdsInBuffer, toGrab, itemsPerTask):
+        cls.fetchArgs = (queueIdsInBuffer, toGrab, itemsPerTask)
+        return [7, cls.rawPriorityBlocks, cls.rawBulkBlocks]
+
+    def _sendBlockToWorker(self, block):
+        pass
+
+    def _processWorkerResults(self, results):
+        pass
+
+
+class _BlockingController(_Controller):
+    _fetchTunedBlocksInPg = \
+        ChunkCompilerQueueControllerABC.__dict__["_fetchTunedBlocksInPg"]
+
+    @classmethod
+    def _fetchableWhere(cls, queueTable):
+        return queueTable.c.chunkKey != 3
+
+
+def _runPyInPg(logger, dbSessionCreator, classMethodToRun, *args):
+    return defer.succeed(classMethodToRun(None, *args))
+
+
+class ChunkCompilerQueueControllerABCTest(unittest.TestCase):
+    def setUp(self):
+        self.patch(controllerModule, "runPyInPg", _runPyInPg)
+        self.controller = _Controller(None, _Notifier())
+
+    @defer.inlineCallbacks
+    def testFetchBlocksArgs(self):
+        self.controller._queueIdsInBuffer.update([3, 5])
+        tuner = self.controller.tuner
+
+        yield self.controller._fetchBlocks()
+
+        queueIdsInBuffer, toGrab, itemsPerTask = _Controller.fetchArgs
+        self.assertEqual([3, 5], sorted(queueIdsInBuffer))
+        self.assertEqual(tuner.itemsPerTask, itemsPerTask)
+        self.assertEqual(tuner.blocksMax * tuner.itemsPerTask, toGrab)
+
+    @defer.inlineCallbacks
+    def testPriorityBlocksGoFirst(self):
+        self.patch(_Controller, "rawPriorityBlocks",
+                   [([4], "p1", ["4"]), ([6], "p2", ["6"])])
+        self.patch(_Controller, "rawBulkBlocks", [([1], "b2", ["1"])])
+
+        # A bulk block left in the buffer from the last fetch
+        self.controller._fetchedBlockBuffer.append(
+            self.controller._loadBlocks([([2], "b1", ["2"])])[0]
+        )
+
+        bulkBlocks = yield self.controller._fetchBlocks()
+
+        self.assertEqual([b"p1", b"p2", b"b1"],
+                         [block.itemsEncodedPayload
+                          for block in self.controller._fetchedBlockBuffer])
+        self.assertEqual([b"b2"], [block.itemsEncodedPayload for block in bulkBlocks])
+        self.assertEqual({1, 2, 4, 6}, self.controller._queueIdsInBuffer)
+
+    def testFetchableWhere(self):
+        class Plpy:
+            def __init__(self):
+                self.cursorSql = []
+
+            def execute(self, sql):
+                return [dict(count=0)]
+
+            def cursor(self, sql):
+                self.cursorSql.append(sql)
+                return self
+
+            def fetch(self, count):
+                return []
+
+        plpy = Plpy()
+        _BlockingController._fetchTunedBlocksInPg(plpy, [], 10, 5)
+
+        # Both the priority and the bulk fetches leave the blocked chunks
+        self.assertEqual(2, len(plpy.cursorSql))
+        for sql in plpy.cursorSql:
+            self.assertIn('"chunkKey" != 3', sql)
@@ -0,0 +1,140 @@
+import logging
+from collections import deque
+from datetime import datetime
+from typing import List, Optional
+
+import pytz
+
+logger = logging.getLogger(__name__)
+
+
+class ChunkCompilerTuner:
+    """ Chunk Compiler Tuner
+
+    Tune the block size, the number of blocks in flight and the poll period of a
+    chunk compiler queue controller, from the measured worker task time, the fetch
+    time and the queue size.
+
+    When there is a backlog, the blocks grow while the tasks stay under
+    targetTaskSeconds, and more blocks are put in flight while the DB keeps up.
+
+    When the updates trickle in, each chunk is sent to the workers in its own block,
+    so it reaches the clients as soon as possible.
+
+    """
+
+    #: The number of samples kept for the admin status
+    HISTORY_SIZE = 30
+
+    #: The weight of a new measurement in the moving averages
+    SMOOTHING = 0.3
+
+    #: The fetch is slow, the DB is loaded, put less blocks in flight
+    SLOW_FETCH_SECONDS = 1.0
+
+    def __init__(self, minItemsPerTask: int, maxItemsPerTask: int,
+                 minBlocks: int, maxBlocks: int,
+                 minPollSeconds: float, maxPollSeconds: float,
+                 targetTaskSeconds: float):
+        self._minItemsPerTask = minItemsPerTask
+        self._maxItemsPerTask = maxItemsPerTask
+        self._minBlocks = minBlocks
+        self._maxBlocks = maxBlocks
+        self._minPollSeconds = minPollSeconds
+        self._maxPollSeconds = maxPollSeconds
+        self._targetTaskSeconds = targetTaskSeconds
+
+        self.itemsPerTask = minItemsPerTask
+        self.blocksMax = minBlocks
+        self.pollSeconds = minPollSeconds
+
+        self.queueSize = 0
+        self.taskSeconds: Optional[float] = None
+        self.fetchSeconds: Optional[float] = None
+
+        self._history = deque(maxlen=self.HISTORY_SIZE)
+
+    @property
+    def blocksMin(self) -> int:
+        """ Blocks Min
+
+        Fetch more blocks once the blocks in flight drop to this.
+
+        """
+        return self.blocksMax // 4
+
+    @property
+    def history(self) -> List[List]:
+        """ History
+
+        :return: A list of [date, items per task, blocks max, poll seconds,
+            task seconds, fetch seconds, queue size], the newest last.
+        """
+        return list(self._history)
+
+    def taskCompleted(self, seconds: float) -> None:
+        self.taskSeconds = self._smooth(self.taskSeconds, seconds)
+
+    def fetchCompleted(self, seconds: float, queueSize: int) -> None:
+        self.fetchSeconds = self._smooth(self.fetchSeconds, seconds)
+        self.queueSize = queueSize
+
+    def tune(self) -> bool:
+        """ Tune
+
+        :return: True if any of the tuned values changed
+        """
+        old = (self.itemsPerTask, self.blocksMax, self.pollSeconds)
+
+        self.pollSeconds = self._minPollSeconds if self.queueSize \
+            else self._maxPollSeconds
+
+        isBacklog = self.queueSize > self.itemsPerTask * self.blocksMax
+        isTaskSlow = (self.taskSeconds is not None
+                      and self.taskSeconds > self._targetTaskSeconds)
+        isDbLoaded = (self.fetchSeconds is not None
+                      and self.fetchSeconds > self.SLOW_FETCH_SECONDS)
+
+        # Items Per Task
+        if isTaskSlow:
+            self.itemsPerTask = int(self.itemsPerTask * 0.75)
+
+        elif isBacklog:
+            self.itemsPerTask = int(self.itemsPerTask * 1.5 + 1)
+
+        elif self.queueSize <= self.blocksMax:
+            self.itemsPerTask = self._minItemsPerTask
+
+        # Blocks Max
+        if isDbLoaded or (isTaskSlow and self.taskSeconds > 2 * self._targetTaskSeconds):
+            self.blocksMax = int(self.blocksMax * 0.75)
+
+        elif isBacklog:
+            self.blocksMax += 1
+
+        self.itemsPerTask = self._clamp(self.itemsPerTask,
+                                        self._minItemsPerTask, self._maxItemsPerTask)
+        self.blocksMax = self._clamp(self.blocksMax, self._minBlocks, self._maxBlocks)
+
+        changed = old != (self.itemsPerTask, self.blocksMax, self.pollSeconds)
+        if changed:
+            self._history.append([
+                datetime.now(pytz.utc).isoformat(), self.itemsPerTask, self.blocksMax,
+                self.pollSeconds, self._round(self.taskSeconds),
+                self._round(self.fetchSeconds), self.queueSize
+            ])
+
+        return changed
+
+    def _smooth(self, average: Optional[float], value: float) -> float:
+        if average is None:
+            return value
+        return average + self.SMOOTHING * (value - average)
+
+    @staticmethod
+    def _clamp(value: int, minValue: int, maxValue: int) -> int:
+        return max(minValue, min(maxValue, value))
+
+    @staticmethod
+    def _round(value: Optional[float]) -> Optional[float]:
+        return None if value is None else round(value, 3)
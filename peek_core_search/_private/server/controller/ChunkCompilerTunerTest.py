@@ -0,0 +1,64 @@
+from twisted.trial import unittest
+
+from peek_core_search._private.server.controller.ChunkCompilerTuner import \
+    ChunkCompilerTuner
+
+
+class ChunkCompilerTunerTest(unittest.TestCase):
+    def _tuner(self):
+        return ChunkCompilerTuner(minItemsPerTask=1, maxItemsPerTask=50,
+                                  minBlocks=2, maxBlocks=20,
+                                  minPollSeconds=1.0, maxPollSeconds=5.0,
+                                  targetTaskSeconds=5.0)
+
+    def testIdle(self):
+        tuner = self._tuner()
+        tuner.fetchCompleted(0.01, 0)
+
+        self.assertTrue(tuner.tune())
+        self.assertEqual(1, tuner.itemsPerTask)
+        self.assertEqual(2, tuner.blocksMax)
+        self.assertEqual(5.0, tuner.pollSeconds)
+
+        self.assertFalse(tuner.tune())
+        self.assertEqual(1, len(tuner.history))
+
+    def testBacklogGrowsToTheLimits(self):
+        tuner = self._tuner()
+        for _ in range(100):
+            tuner.fetchCompleted(0.01, 100000)
+            tuner.taskCompleted(1.0)
+            tuner.tune()
+
+        self.assertEqual(50, tuner.itemsPerTask)
+        self.assertEqual(20, tuner.blocksMax)
+        self.assertEqual(5, tuner.blocksMin)
+        self.assertEqual(1.0, tuner.pollSeconds)
+        self.assertEqual([50, 20, 1.0], tuner.history[-1][1:4])
+
+    def testSlowTasksAndLoadedDbShrink(self):
+        tuner = self._tuner()
+        for _ in range(20):
+            tuner.fetchCompleted(0.01, 100000)
+            tuner.tune()
+
+        itemsPerTask, blocksMax = tuner.itemsPerTask, tuner.blocksMax
+
+        tuner.taskCompleted(20.0)
+        tuner.fetchCompleted(3.0, 100000)
+        tuner.tune()
+
+        self.assertLess(tuner.itemsPerTask, itemsPerTask)
+        self.assertLess(tuner.blocksMax, blocksMax)
+
+    def testTrickleSendsOneChunkPerBlock(self):
+        tuner = self._tuner()
+        for _ in range(20):
+            tuner.fetchCompleted(0.01, 100000)
+            tuner.tune()
+
+        tuner.fetchCompleted(0.01, 1)
+        tuner.tune()
+
+        self.assertEqual(1, tuner.itemsPerTask)
+        self.assertEqual(1.0, tuner.pollSeconds)
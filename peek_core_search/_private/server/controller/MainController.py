@@ -1,7 +1,11 @@
 import logging
 
-from twisted.internet.defer import Deferred
+from twisted.internet.defer import Deferred, succeed
 
+from peek_core_search._private.server.controller.SearchChunkRebuildController import \
+    SearchChunkRebuildController
+from peek_core_search._private.tuples.RebuildSearchChunksTupleAction import \
+    RebuildSearchChunksTupleAction
 from vortex.TupleAction import TupleActionABC
 from vortex.handler.TupleActionProcessor import TupleActionProcessorDelegateABC
 from vortex.handler.TupleDataObservableHandler import TupleDataObservableHandler
@@ -10,14 +14,25 @@ logger = logging.getLogger(__name__)
 
 
 class MainController(TupleActionProcessorDelegateABC):
-    def __init__(self, dbSessionCreator, tupleObservable: TupleDataObservableHandler):
+    def __init__(self, dbSessionCreator, tupleObservable: TupleDataObservableHandler,
+                 searchChunkRebuildController: SearchChunkRebuildController):
         self._dbSessionCreator = dbSessionCreator
         self._tupleObservable = tupleObservable
+        self._searchChunkRebuildController = searchChunkRebuildController
 
     def shutdown(self):
         pass
 
     def processTupleAction(self, tupleAction: TupleActionABC) -> Deferred:
+        if isinstance(tupleAction, RebuildSearchChunksTupleAction):
+            # The rebuild reports its progress through the AdminStatusTuple,
+            # don't make the admin UI wait for it.
+            self._searchChunkRebuildController.rebuild(
+                indexBucketCount=tupleAction.indexBucketCount,
+                objectBucketCount=tupleAction.objectBucketCount
+            )
+            return succeed([])
+
         raise NotImplementedError(tupleAction.tupleName())
 
     def agentNotifiedOfUpdate(self, updateStr):
@@ -0,0 +1,242 @@
+import logging
+from datetime import datetime
+from typing import List, Optional
+
+import pytz
+from twisted.internet import reactor
+from twisted.internet.defer import inlineCallbacks, DeferredSemaphore, \
+    DeferredList, Deferred
+from twisted.internet.task import deferLater
+from vortex.DeferUtil import vortexLogFailure, deferToThreadWrapWithLogger
+
+from peek_abstract_chunked_index.private.server.controller.ACIProcessorQueueControllerABC import \
+    ACIProcessorQueueControllerABC
+from peek_core_search._private.server.client_handlers.ClientSearchIndexChunkUpdateHandler import \
+    ClientSearchIndexChunkUpdateHandler
+from peek_core_search._private.server.client_handlers.ClientSearchChunkFormatUpdateHandler import \
+    ClientSearchChunkFormatUpdateHandler
+from peek_core_search._private.server.client_handlers.ClientSearchObjectChunkUpdateHandler import \
+    ClientSearchObjectChunkUpdateHandler
+from peek_core_search._private.server.controller.StatusController import \
+    StatusController
+from peek_core_search._private.worker.tasks.RebuildSearchChunksTask import \
+    rebuildSearchIndexChunksTask, rebuildSearchObjectChunksTask, \
+    switchToRebuiltSearchChunksTask
+from peek_core_search._private.storage.SearchChunkFormatTuple import \
+    SearchChunkFormatTuple
+from peek_core_search._private.worker.tasks._CalcChunkKey import isValidBucketCount
+
+logger = logging.getLogger(__name__)
+
+
+class SearchChunkRebuildController:
+    """ Search Chunk Rebuild Controller
+
+    Rebuild every encoded index and object chunk, from the SearchIndex and
+    SearchObject tables.
+
+    The chunk key ranges are split into blocks of CHUNK_KEYS_PER_TASK, and compiled
+    in parallel by the workers into the staging tables. Once every block is
+    compiled, the staging tables are switched in, in one transaction, and only the
+    chunks that changed are sent to the clients.
+
+    The compiler queue controllers are paused while the rebuild runs.
+
+    A rebuild with new bucket counts re-keys the chunks, the new chunks are compiled
+    while the clients still load the old ones. Once they're switched in, the
+    clients are sent the new bucket counts and reload their chunks.
+
+    """
+
+    #: The number of chunk keys each worker task compiles
+    CHUNK_KEYS_PER_TASK = 256
+
+    #: The number of worker tasks queued at once
+    MAX_TASKS_IN_FLIGHT = 8
+
+    #: The number of changed chunks sent to the clients at a time
+    SEND_CHUNKS_BATCH_SIZE = 500
+
+    #: How often to check if the compiler queue controllers have finished their
+    # current blocks
+    BUSY_CHECK_PERIOD_SECONDS = 1.0
+
+    def __init__(self, dbSessionCreator,
+                 statusController: StatusController,
+                 clientSearchIndexUpdateHandler: ClientSearchIndexChunkUpdateHandler,
+                 clientSearchObjectUpdateHandler: ClientSearchObjectChunkUpdateHandler,
+                 clientChunkFormatUpdateHandler: ClientSearchChunkFormatUpdateHandler):
+        self._dbSessionCreator = dbSessionCreator
+        self._statusController = statusController
+        self._clientSearchIndexUpdateHandler = clientSearchIndexUpdateHandler
+        self._clientSearchObjectUpdateHandler = clientSearchObjectUpdateHandler
+        self._clientChunkFormatUpdateHandler = clientChunkFormatUpdateHandler
+
+        self._queueControllers: List[ACIProcessorQueueControllerABC] = []
+        self._rebuilding = False
+
+    @inlineCallbacks
+    def start(self):
+        chunkFormat = yield self._loadChunkFormat()
+        self._setStatusBucketCounts(chunkFormat)
+
+    def setQueueControllers(self, *queueControllers: ACIProcessorQueueControllerABC):
+        self._queueControllers = list(queueControllers)
+
+    def shutdown(self):
+        self._queueControllers = []
+
+    def isRebuilding(self) -> bool:
+        return self._rebuilding
+
+    def isProcessorEnabled(self) -> bool:
+        """ Is Processor Enabled
+
+        The compiler queue controllers don't process their queues during a rebuild.
+
+        """
+        return not self._rebuilding
+
+    def rebuild(self, indexBucketCount: Optional[int] = None,
+                objectBucketCount: Optional[int] = None) -> Optional[Deferred]:
+        """ Rebuild
+
+        Start a rebuild, unless one is already running.
+
+        :param indexBucketCount: The index bucket count to re-key the chunks with,
+            None to keep the current bucket count
+        :param objectBucketCount: The object bucket count to re-key the chunks with,
+            None to keep the current bucket count
+        :return: A deferred that fires when the rebuild is complete, or None if a
+            rebuild is already running
+        """
+        for bucketCount in (indexBucketCount, objectBucketCount):
+            if bucketCount is not None and not isValidBucketCount(bucketCount):
+                raise ValueError("Bucket count %s is not a power of two"
+                                 % bucketCount)
+
+        if self._rebuilding:
+            logger.info("A search chunk rebuild is already running")
+            return None
+
+        self._rebuilding = True
+
+        d = self._rebuild(indexBucketCount, objectBucketCount)
+        d.addErrback(self._rebuildErrback)
+        d.addBoth(self._rebuildComplete)
+        return d
+
+    def _rebuildErrback(self, failure):
+        self._statusController.status.searchChunkRebuildLastError = \
+            str(failure.value)
+        self._statusController.notify()
+        vortexLogFailure(failure, logger, consumeError=True)
+
+    def _rebuildComplete(self, _):
+        self._rebuilding = False
+        self._statusController.status.searchChunkRebuildStatus = False
+        self._statusController.notify()
+
+    @inlineCallbacks
+    def _rebuild(self, indexBucketCount: Optional[int],
+                 objectBucketCount: Optional[int]):
+        chunkFormat = yield self._loadChunkFormat()
+
+        # Only pass the bucket counts that change to the workers
+        if indexBucketCount == chunkFormat.indexBucketCount:
+            indexBucketCount = None
+
+        if objectBucketCount == chunkFormat.objectBucketCount:
+            objectBucketCount = None
+
+        newIndexBucketCount = indexBucketCount or chunkFormat.indexBucketCount
+        newObjectBucketCount = objectBucketCount or chunkFormat.objectBucketCount
+
+        status = self._statusController.status
+        status.searchChunkRebuildStatus = True
+        status.searchChunkRebuildChunkKeysTotal = \
+            newIndexBucketCount + newObjectBucketCount
+        status.searchChunkRebuildChunkKeysProcessed = 0
+        status.searchChunkRebuildChunksCompiled = 0
+        status.searchChunkRebuildChunksPerSecond = 0.0
+        status.searchChunkRebuildLastError = None
+        self._statusController.notify()
+
+        # Let the compiler queue controllers finish the blocks they have queued,
+        # otherwise they may overwrite the switched in chunks with older ones.
+        while any([c.isBusy() for c in self._queueControllers]):
+            yield deferLater(reactor, self.BUSY_CHECK_PERIOD_SECONDS, lambda: None)
+
+        startTime = datetime.now(pytz.utc)
+        semaphore = DeferredSemaphore(self.MAX_TASKS_IN_FLIGHT)
+        deferreds = []
+
+        for task, newBucketCount, rekeyBucketCount in (
+                (rebuildSearchIndexChunksTask, newIndexBucketCount, indexBucketCount),
+                (rebuildSearchObjectChunksTask, newObjectBucketCount,
+                 objectBucketCount)):
+            for start in range(0, newBucketCount, self.CHUNK_KEYS_PER_TASK):
+                end = min(start + self.CHUNK_KEYS_PER_TASK, newBucketCount)
+                d = semaphore.run(task.delay, start, end, rekeyBucketCount)
+                d.addCallback(self._blockCompiled, end - start, startTime)
+                deferreds.append(d)
+
+        yield DeferredList(deferreds, fireOnOneErrback=True, consumeErrors=True)
+
+        indexChunkKeys, objectChunkKeys = yield switchToRebuiltSearchChunksTask.delay(
+            indexBucketCount, objectBucketCount
+        )
+
+        logger.info("Rebuilt %s search chunks in %s, %s index and %s object chunks"
+                    " changed",
+                    status.searchChunkRebuildChunksCompiled,
+                    (datetime.now(pytz.utc) - startTime),
+                    len(indexChunkKeys), len(objectChunkKeys))
+
+        if indexBucketCount or objectBucketCount:
+            chunkFormat = yield self._loadChunkFormat()
+            self._setStatusBucketCounts(chunkFormat)
+
+            logger.info("Re-keyed the search chunks to %s index and %s object"
+                        " buckets",
+                        chunkFormat.indexBucketCount, chunkFormat.objectBucketCount)
+
+            # The clients reload every chunk when they receive this
+            self._clientChunkFormatUpdateHandler.sendChunkFormat(chunkFormat)
+            return
+
+        for chunkKeys, handler in ((indexChunkKeys, self._clientSearchIndexUpdateHandler),
+                                   (objectChunkKeys, self._clientSearchObjectUpdateHandler)):
+            for i in range(0, len(chunkKeys), self.SEND_CHUNKS_BATCH_SIZE):
+                handler.sendChunks(chunkKeys[i:i + self.SEND_CHUNKS_BATCH_SIZE])
+
+    @deferToThreadWrapWithLogger(logger)
+    def _loadChunkFormat(self) -> SearchChunkFormatTuple:
+        session = self._dbSessionCreator()
+        try:
+            chunkFormat = session.query(SearchChunkFormatTuple).one()
+            session.expunge_all()
+            return chunkFormat
+
+        finally:
+            session.close()
+
+    def _setStatusBucketCounts(self, chunkFormat: SearchChunkFormatTuple) -> None:
+        status = self._statusController.status
+        status.searchIndexBucketCount = chunkFormat.indexBucketCount
+        status.searchObjectBucketCount = chunkFormat.objectBucketCount
+        self._statusController.notify()
+
+    def _blockCompiled(self, result, chunkKeyCount: int, startTime: datetime):
+        chunkCount, _ = result
+
+        status = self._statusController.status
+        status.searchChunkRebuildChunkKeysProcessed += chunkKeyCount
+        status.searchChunkRebuildChunksCompiled += chunkCount
+
+        seconds = (datetime.now(pytz.utc) - startTime).total_seconds()
+        if seconds:
+            status.searchChunkRebuildChunksPerSecond = \
+                round(status.searchChunkRebuildChunksCompiled / seconds, 1)
+
+        self._statusController.notify()
@@ -2,18 +2,28 @@ import logging
 from typing import Callable
 
 from peek_abstract_chunked_index.private.server.controller.ACIProcessorQueueControllerABC import \
-    ACIProcessorQueueControllerABC, ACIProcessorQueueBlockItem
+    ACIProcessorQueueBlockItem
 from peek_abstract_chunked_index.private.server.controller.ACIProcessorStatusNotifierABC import \
     ACIProcessorStatusNotifierABC
 from peek_abstract_chunked_index.private.tuples.ACIProcessorQueueTupleABC import \
     ACIProcessorQueueTupleABC
 from peek_core_search._private.server.client_handlers.ClientSearchIndexChunkUpdateHandler import \
     ClientSearchIndexChunkUpdateHandler
+from peek_core_search._private.server.controller.ChunkCompileMetricsSummary import \
+    ChunkCompileMetricsSummary
+from peek_core_search._private.server.controller.ChunkCompilerQueueControllerABC import \
+    ChunkCompilerQueueControllerABC
+from peek_core_search._private.server.controller.ChunkCompilerTuner import \
+    ChunkCompilerTuner
 from peek_core_search._private.server.controller.StatusController import \
     StatusController
 from peek_core_search._private.storage.EncodedSearchIndexChunk import \
     EncodedSearchIndexChunk
 from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexChunkVersion import \
+    SearchIndexChunkVersion
+from peek_core_search._private.storage.SearchIndexCompilerDelta import \
+    SearchIndexCompilerDelta
 from peek_core_search._private.storage.SearchIndexCompilerQueue import \
     SearchIndexCompilerQueue
 
@@ -37,13 +47,37 @@ class _Notifier(ACIProcessorStatusNotifierABC):
         self._adminStatusController.status.searchIndexCompilerQueueLastError = error
         self._adminStatusController.notify()
 
+    def setTuning(self, tuner: ChunkCompilerTuner):
+        status = self._adminStatusController.status
+        status.searchIndexCompilerItemsPerTask = tuner.itemsPerTask
+        status.searchIndexCompilerBlocksMax = tuner.blocksMax
+        status.searchIndexCompilerPollSeconds = tuner.pollSeconds
+        status.searchIndexCompilerTaskSeconds = tuner.taskSeconds
+        status.searchIndexCompilerTuningHistory = tuner.history
+        self._adminStatusController.notify()
+
+    def setMetrics(self, summary: ChunkCompileMetricsSummary):
+        status = self._adminStatusController.status
+        status.searchIndexCompilerChunksSkipped = summary.chunksSkipped
+        status.searchIndexCompilerEncodeSeconds = round(summary.encodeSeconds, 3)
+        status.searchIndexCompilerDbReadSeconds = round(summary.dbReadSeconds, 3)
+        status.searchIndexCompilerDbWriteSeconds = round(summary.dbWriteSeconds, 3)
+        status.searchIndexCompilerChunkBytesHistogram = summary.bytesHistogram.toList()
+        status.searchIndexCompilerChunkRowsHistogram = summary.rowsHistogram.toList()
+        status.searchIndexCompilerChunkSecondsHistogram = \
+            summary.secondsHistogram.toList()
+        status.searchIndexCompilerLargestChunks = summary.largestChunks
+        status.searchIndexCompilerSlowestChunks = summary.slowestChunks
+        self._adminStatusController.notify()
+
 
-class SearchIndexChunkCompilerQueueController(ACIProcessorQueueControllerABC):
-    QUEUE_ITEMS_PER_TASK = 10
+class SearchIndexChunkCompilerQueueController(ChunkCompilerQueueControllerABC):
+    # These are the limits for the ChunkCompilerTuner
+    QUEUE_ITEMS_PER_TASK = 50
     POLL_PERIOD_SECONDS = 1.000
 
-    # We can run this with a large queue because this compiler only runs when the
-    # object compiler queue is empty
+    # This runs at the same time as the object compiler, the chunks that are
+    # waiting for object chunks are left in the queue.
     QUEUE_BLOCKS_MAX = 40
     QUEUE_BLOCKS_MIN = 4
 
@@ -51,48 +85,35 @@ class SearchIndexChunkCompilerQueueController(ACIProcessorQueueControllerABC):
 
     _logger = logger
     _QueueDeclarative: ACIProcessorQueueTupleABC = SearchIndexCompilerQueue
-    _VacuumDeclaratives = (SearchIndexCompilerQueue,
-                           SearchIndex, EncodedSearchIndexChunk)
+    _VacuumDeclaratives = (SearchIndexCompilerQueue, SearchIndexCompilerDelta,
+                           SearchIndexChunkVersion, SearchIndex,
+                           EncodedSearchIndexChunk)
 
     def __init__(self, dbSessionCreator,
                  statusController: StatusController,
                  clientSearchIndexUpdateHandler: ClientSearchIndexChunkUpdateHandler,
                  isProcessorEnabledCallable: Callable):
-        ACIProcessorQueueControllerABC \
-            .__init__(self, dbSessionCreator,
-                      _Notifier(statusController),
-                      isProcessorEnabledCallable)
+        ChunkCompilerQueueControllerABC.__init__(self, dbSessionCreator,
+                                                 _Notifier(statusController),
+                                                 isProcessorEnabledCallable)
 
         self._clientSearchIndexUpdateHandler: ClientSearchIndexChunkUpdateHandler \
             = clientSearchIndexUpdateHandler
 
-    def _sendToWorker(self, block: ACIProcessorQueueBlockItem):
+    @classmethod
+    def _fetchableWhere(cls, queueTable):
+        from peek_core_search._private.worker.tasks.SearchIndexChunkCompilerTask import \
+            searchIndexChunkBlockedWhere
+
+        return ~searchIndexChunkBlockedWhere(queueTable.c.chunkKey)
+
+    def _sendBlockToWorker(self, block: ACIProcessorQueueBlockItem):
         from peek_core_search._private.worker.tasks.SearchIndexChunkCompilerTask import \
             compileSearchIndexChunk
 
         return compileSearchIndexChunk.delay(block.itemsEncodedPayload)
 
     def _processWorkerResults(self, results):
-        self._clientSearchIndexUpdateHandler.sendChunks(results)
-
-    def _dedupeQueueSql(self, lastFetchedId: int, dedupeLimit: int):
-        return '''
-                 with sq_raw as (
-                    SELECT "id", "chunkKey"
-                    FROM core_search."SearchIndexCompilerQueue"
-                    WHERE id > %(id)s
-                    LIMIT %(limit)s
-                ), sq as (
-                    SELECT min(id) as "minId", "chunkKey"
-                    FROM sq_raw
-                    GROUP BY  "chunkKey"
-                    HAVING count("chunkKey") > 1
-                )
-                DELETE
-                FROM core_search."SearchIndexCompilerQueue"
-                     USING sq sq1
-                WHERE core_search."SearchIndexCompilerQueue"."id" != sq1."minId"
-                    AND core_search."SearchIndexCompilerQueue"."id" > %(id)s
-                    AND core_search."SearchIndexCompilerQueue"."chunkKey" = sq1."chunkKey"
-
-            ''' % {'id': lastFetchedId, 'limit': dedupeLimit}
+        chunkKeys, chunkMetrics = results
+        self._recordChunkMetrics(chunkMetrics)
+        self._clientSearchIndexUpdateHandler.sendChunks(chunkKeys)
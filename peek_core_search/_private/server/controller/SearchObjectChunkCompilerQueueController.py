@@ -1,18 +1,27 @@
 import logging
+from typing import Callable
 
 from peek_abstract_chunked_index.private.server.controller.ACIProcessorQueueControllerABC import \
-    ACIProcessorQueueControllerABC, ACIProcessorQueueBlockItem
+    ACIProcessorQueueBlockItem
 from peek_abstract_chunked_index.private.server.controller.ACIProcessorStatusNotifierABC import \
     ACIProcessorStatusNotifierABC
 from peek_abstract_chunked_index.private.tuples.ACIProcessorQueueTupleABC import \
     ACIProcessorQueueTupleABC
 from peek_core_search._private.server.client_handlers.ClientSearchObjectChunkUpdateHandler import \
     ClientSearchObjectChunkUpdateHandler
+from peek_core_search._private.server.controller.ChunkCompileMetricsSummary import \
+    ChunkCompileMetricsSummary
+from peek_core_search._private.server.controller.ChunkCompilerQueueControllerABC import \
+    ChunkCompilerQueueControllerABC
+from peek_core_search._private.server.controller.ChunkCompilerTuner import \
+    ChunkCompilerTuner
 from peek_core_search._private.server.controller.StatusController import \
     StatusController
 from peek_core_search._private.storage.EncodedSearchObjectChunk import \
     EncodedSearchObjectChunk
 from peek_core_search._private.storage.SearchObject import SearchObject
+from peek_core_search._private.storage.SearchObjectChunkVersion import \
+    SearchObjectChunkVersion
 from peek_core_search._private.storage.SearchObjectCompilerQueue import \
     SearchObjectCompilerQueue
 
@@ -36,9 +45,33 @@ class _Notifier(ACIProcessorStatusNotifierABC):
         self._adminStatusController.status.searchObjectCompilerQueueLastError = error
         self._adminStatusController.notify()
 
+    def setTuning(self, tuner: ChunkCompilerTuner):
+        status = self._adminStatusController.status
+        status.searchObjectCompilerItemsPerTask = tuner.itemsPerTask
+        status.searchObjectCompilerBlocksMax = tuner.blocksMax
+        status.searchObjectCompilerPollSeconds = tuner.pollSeconds
+        status.searchObjectCompilerTaskSeconds = tuner.taskSeconds
+        status.searchObjectCompilerTuningHistory = tuner.history
+        self._adminStatusController.notify()
+
+    def setMetrics(self, summary: ChunkCompileMetricsSummary):
+        status = self._adminStatusController.status
+        status.searchObjectCompilerChunksSkipped = summary.chunksSkipped
+        status.searchObjectCompilerEncodeSeconds = round(summary.encodeSeconds, 3)
+        status.searchObjectCompilerDbReadSeconds = round(summary.dbReadSeconds, 3)
+        status.searchObjectCompilerDbWriteSeconds = round(summary.dbWriteSeconds, 3)
+        status.searchObjectCompilerChunkBytesHistogram = summary.bytesHistogram.toList()
+        status.searchObjectCompilerChunkRowsHistogram = summary.rowsHistogram.toList()
+        status.searchObjectCompilerChunkSecondsHistogram = \
+            summary.secondsHistogram.toList()
+        status.searchObjectCompilerLargestChunks = summary.largestChunks
+        status.searchObjectCompilerSlowestChunks = summary.slowestChunks
+        self._adminStatusController.notify()
+
 
-class SearchObjectChunkCompilerQueueController(ACIProcessorQueueControllerABC):
-    QUEUE_ITEMS_PER_TASK = 10
+class SearchObjectChunkCompilerQueueController(ChunkCompilerQueueControllerABC):
+    # These are the limits for the ChunkCompilerTuner
+    QUEUE_ITEMS_PER_TASK = 50
     POLL_PERIOD_SECONDS = 1.000
 
     QUEUE_BLOCKS_MAX = 20
@@ -48,44 +81,26 @@ class SearchObjectChunkCompilerQueueController(ACIProcessorQueueControllerABC):
 
     _logger = logger
     _QueueDeclarative: ACIProcessorQueueTupleABC = SearchObjectCompilerQueue
-    _VacuumDeclaratives = (SearchObjectCompilerQueue,
+    _VacuumDeclaratives = (SearchObjectCompilerQueue, SearchObjectChunkVersion,
                            SearchObject, EncodedSearchObjectChunk)
 
     def __init__(self, dbSessionCreator,
                  statusController: StatusController,
-                 clientSearchObjectUpdateHandler: ClientSearchObjectChunkUpdateHandler):
-        ACIProcessorQueueControllerABC.__init__(self, dbSessionCreator,
-                                                _Notifier(statusController))
+                 clientSearchObjectUpdateHandler: ClientSearchObjectChunkUpdateHandler,
+                 isProcessorEnabledCallable: Callable):
+        ChunkCompilerQueueControllerABC.__init__(self, dbSessionCreator,
+                                                 _Notifier(statusController),
+                                                 isProcessorEnabledCallable)
         self._clientSearchObjectUpdateHandler: ClientSearchObjectChunkUpdateHandler \
             = clientSearchObjectUpdateHandler
 
-    def _sendToWorker(self, block: ACIProcessorQueueBlockItem):
+    def _sendBlockToWorker(self, block: ACIProcessorQueueBlockItem):
         from peek_core_search._private.worker.tasks.SearchObjectChunkCompilerTask import \
             compileSearchObjectChunk
 
         return compileSearchObjectChunk.delay(block.itemsEncodedPayload)
 
     def _processWorkerResults(self, results):
-        self._clientSearchObjectUpdateHandler.sendChunks(results)
-
-    def _dedupeQueueSql(self, lastFetchedId: int, dedupeLimit: int):
-        return '''
-                 with sq_raw as (
-                    SELECT "id", "chunkKey"
-                    FROM core_search."SearchObjectCompilerQueue"
-                    WHERE id > %(id)s
-                    LIMIT %(limit)s
-                ), sq as (
-                    SELECT min(id) as "minId", "chunkKey"
-                    FROM sq_raw
-                    GROUP BY  "chunkKey"
-                    HAVING count("chunkKey") > 1
-                )
-                DELETE
-                FROM core_search."SearchObjectCompilerQueue"
-                     USING sq sq1
-                WHERE core_search."SearchObjectCompilerQueue"."id" != sq1."minId"
-                    AND core_search."SearchObjectCompilerQueue"."id" > %(id)s
-                    AND core_search."SearchObjectCompilerQueue"."chunkKey" = sq1."chunkKey"
-
-            ''' % {'id': lastFetchedId, 'limit': dedupeLimit}
+        chunkKeys, chunkMetrics = results
+        self._recordChunkMetrics(chunkMetrics)
+        self._clientSearchObjectUpdateHandler.sendChunks(chunkKeys)
@@ -1,25 +1,238 @@
 import logging
-from typing import List
+import zlib
+from uuid import uuid4
+from typing import Callable, Dict, Iterable, List, Set, Union
 
-from twisted.internet.defer import inlineCallbacks
+from twisted.internet.defer import inlineCallbacks, Deferred, DeferredSemaphore, \
+    DeferredList, DeferredLock
+from twisted.python.failure import Failure
 
 from peek_core_search._private.worker.tasks.ImportSearchObjectTask import \
-    importSearchObjectTask, removeSearchObjectTask
+    importSearchObjectTask, removeSearchObjectTask, queueAllSearchChunksTask
+from peek_core_search.tuples.ImportSearchObjectTuple import ImportSearchObjectTuple
+from vortex.Payload import Payload
 
 logger = logging.getLogger(__name__)
 
 
 class SearchObjectImportController:
+    """ Search Object Import Controller
+
+    Objects are imported through LANE_COUNT lanes, the lane is chosen from the
+    objects key. Each lane runs one import task at a time, in order, so two workers
+    never insert or update the same SearchObject.key at once. The lanes run in
+    parallel.
+
+    """
+
+    #: The number of lanes that import tasks run in
+    LANE_COUNT = 4
+
+    #: The number of objects sent to a worker in each batch of a streamed import
+    STREAM_BATCH_SIZE = 2000
+
+    #: The number of batches of a streamed import that are queued or running on
+    # the workers at once. No more payload parts are read until one completes.
+    STREAM_MAX_BATCHES_IN_FLIGHT = 8
+
     def __init__(self):
-        pass
+        self._lanes = [DeferredLock() for _ in range(self.LANE_COUNT)]
+        self._lookupVersion = uuid4().hex
 
     def shutdown(self):
         pass
 
+    def lookupsChanged(self):
+        """ Lookups Changed
+
+        The SearchProperty or SearchObjectType tables have been edited, tell the
+        workers to drop their cached lookups.
+
+        """
+        self._lookupVersion = uuid4().hex
+
+    def importSearchObjects(self, searchObjectsEncodedPayload: bytes,
+                            interactive: bool = False) -> Deferred:
+        return self.importSearchObjectsStream([searchObjectsEncodedPayload],
+                                              interactive=interactive)
+
     @inlineCallbacks
-    def importSearchObjects(self, searchObjectsEncodedPayload: bytes):
-        yield importSearchObjectTask.delay(searchObjectsEncodedPayload)
+    def importSearchObjectsStream(self,
+                                  searchObjectsEncodedPayloads: Iterable[
+                                      Union[bytes, Deferred]],
+                                  bulkLoad: bool = False,
+                                  interactive: bool = False):
+        """ Import Search Objects Stream
+
+        Import an iterable of payloads, splitting them into batches of
+        STREAM_BATCH_SIZE objects.
+
+        The payloads are read lazily, only STREAM_MAX_BATCHES_IN_FLIGHT batches are
+        held in memory and queued on the workers at once.
+
+        In bulk load mode, the batches don't queue the chunks they change, every
+        chunk is queued once after the last batch is imported.
+
+        In interactive mode, the changed chunks are compiled ahead of the chunks
+        queued by bulk work.
+
+        """
+        stream = _ImportStream(self._lanes, self.STREAM_MAX_BATCHES_IN_FLIGHT,
+                               lambda: self._lookupVersion, bulkLoad, interactive)
+        batchByLane: List[List[ImportSearchObjectTuple]] = [[] for _ in self._lanes]
+        objectCount = 0
+
+        for encodedPayload in searchObjectsEncodedPayloads:
+            if stream.failure:
+                break
+
+            if isinstance(encodedPayload, Deferred):
+                encodedPayload = yield encodedPayload
+
+            payload = yield Payload().fromEncodedPayloadDefer(encodedPayload)
+
+            for importObject in payload.tuples:
+                laneIndex = _laneIndexForKey(importObject.key, len(self._lanes))
+                batch = batchByLane[laneIndex]
+                batch.append(importObject)
+
+                if len(batch) < self.STREAM_BATCH_SIZE or stream.failure:
+                    continue
+
+                objectCount += len(batch)
+                batchByLane[laneIndex] = []
+                yield stream.queueBatch(batch, laneIndex)
+
+            del payload
+
+        for laneIndex, batch in enumerate(batchByLane):
+            if batch and not stream.failure:
+                objectCount += len(batch)
+                yield stream.queueBatch(batch, laneIndex)
+
+        del batchByLane
+
+        yield stream.waitForBatches()
+
+        if stream.failure:
+            stream.failure.raiseException()
+
+        if bulkLoad:
+            yield queueAllSearchChunksTask.delay()
+
+        logger.debug("Imported %s SearchObjects in %s batches",
+                     objectCount, stream.batchCount)
 
     @inlineCallbacks
     def removeSearchObjects(self, importGroupHashes: List[str]):
-        yield removeSearchObjectTask.delay(importGroupHashes)
\ No newline at end of file
+        yield removeSearchObjectTask.delay(importGroupHashes)
+
+
+def _laneIndexForKey(key: str, laneCount: int) -> int:
+    """ Lane Index For Key
+
+    The import task matches keys case insensitively, so the lane must too.
+
+    """
+    return zlib.crc32(key.lower().encode()) % laneCount
+
+
+class _ImportStream:
+    """ Import Stream
+
+    The state of one import.
+
+    The first batch to contain an import group replaces the routes of that group.
+    Later batches only replace the routes of their own objects for that group, and
+    they wait for the first batch to complete, so it doesn't delete their routes.
+
+    Every batch is passed the streams id, so the later batches still skip the
+    unchanged objects that the first batch took the routes from.
+
+    """
+
+    def __init__(self, lanes: List[DeferredLock], maxBatchesInFlight: int,
+                 lookupVersionCallable: Callable[[], str], bulkLoad: bool,
+                 interactive: bool):
+        self._lanes = lanes
+        self._lookupVersionCallable = lookupVersionCallable
+        self._bulkLoad = bulkLoad
+        self._interactive = interactive
+        self._streamId = uuid4().hex
+        self._semaphore = DeferredSemaphore(maxBatchesInFlight)
+        self._firstBatchByImportGroupHash: Dict[str, Deferred] = {}
+        self._batchDeferreds: Set[Deferred] = set()
+        self.batchCount = 0
+        self.failure = None
+
+    @inlineCallbacks
+    def queueBatch(self, batch: List[ImportSearchObjectTuple], laneIndex: int):
+        """ Queue Batch
+
+        :return: A deferred that fires when the batch has been queued, once there is
+            room for it.
+        """
+        yield self._semaphore.acquire()
+
+        importGroupHashes = set()
+        for importObject in batch:
+            for impRoute in importObject.routes:
+                importGroupHashes.add(impRoute.importGroupHash)
+
+        appendImportGroupHashes = importGroupHashes & set(
+            self._firstBatchByImportGroupHash
+        )
+        firstBatchDeferreds = [self._firstBatchByImportGroupHash[h]
+                               for h in appendImportGroupHashes]
+
+        d = self._runBatch(batch, self._lanes[laneIndex],
+                           list(appendImportGroupHashes), firstBatchDeferreds)
+        self.batchCount += 1
+
+        # Later batches with the same import groups wait for this batch
+        for importGroupHash in importGroupHashes - appendImportGroupHashes:
+            self._firstBatchByImportGroupHash[importGroupHash] = d
+
+        self._batchDeferreds.add(d)
+        d.addBoth(self._batchComplete, d)
+
+    @inlineCallbacks
+    def _runBatch(self, batch: List[ImportSearchObjectTuple], lane: DeferredLock,
+                  appendImportGroupHashes: List[str],
+                  firstBatchDeferreds: List[Deferred]):
+        # Take the lane first, so the batches of a lane run in the order they
+        # were queued. The batches waited for are always queued earlier.
+        yield lane.acquire()
+
+        try:
+            # These never errback, _batchComplete records the failure
+            if firstBatchDeferreds:
+                yield DeferredList(firstBatchDeferreds)
+
+            if self.failure:
+                return
+
+            encodedPayload = yield Payload(tuples=batch).toEncodedPayloadDefer()
+            del batch
+
+            yield importSearchObjectTask.delay(encodedPayload, appendImportGroupHashes,
+                                               self._lookupVersionCallable(),
+                                               self._bulkLoad, self._interactive,
+                                               self._streamId)
+
+        finally:
+            lane.release()
+
+    def _batchComplete(self, result, d: Deferred):
+        self._batchDeferreds.discard(d)
+        self._semaphore.release()
+
+        if isinstance(result, Failure) and not self.failure:
+            self.failure = result
+
+        # The failure is raised from importSearchObjectsStream
+        return None
+
+    def waitForBatches(self) -> Deferred:
+        return DeferredList(list(self._batchDeferreds))
+
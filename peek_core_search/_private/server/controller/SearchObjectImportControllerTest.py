@@ -0,0 +1,66 @@
+from twisted.internet import defer
+from twisted.trial import unittest
+from vortex.Payload import Payload
+
+from peek_core_search._private.server.controller import \
+    SearchObjectImportController as controllerModule
+from peek_core_search._private.server.controller.SearchObjectImportController import \
+    SearchObjectImportController
+from peek_core_search.tuples.ImportSearchObjectRouteTuple import \
+    ImportSearchObjectRouteTuple
+from peek_core_search.tuples.ImportSearchObjectTuple import ImportSearchObjectTuple
+
+
+class _ImportTask:
+    def __init__(self):
+        self.calls = []
+
+    def delay(self, searchObjectsEncodedPayload, appendRouteImportGroupHashes,
+              lookupVersion, bulkLoad, interactive, streamId):
+        self.calls.append((appendRouteImportGroupHashes, streamId))
+        return defer.succeed(None)
+
+
+class SearchObjectImportControllerTest(unittest.TestCase):
+    def setUp(self):
+        self.importTask = _ImportTask()
+        self.patch(controllerModule, "importSearchObjectTask", self.importTask)
+        self.patch(SearchObjectImportController, "LANE_COUNT", 1)
+        self.patch(SearchObjectImportController, "STREAM_BATCH_SIZE", 2)
+
+        # Encode and decode the payloads in this thread
+        self.patch(Payload, "fromEncodedPayloadDefer",
+                   lambda payload, encoded: defer.succeed(
+                       payload.fromEncodedPayload(encoded)))
+        self.patch(Payload, "toEncodedPayloadDefer",
+                   lambda payload: defer.succeed(payload.toEncodedPayload()))
+
+    def _payload(self, keys):
+        return Payload(tuples=[
+            ImportSearchObjectTuple(
+                key=key, objectType="thing", fullKeywords={"name": key},
+                routes=[ImportSearchObjectRouteTuple(importGroupHash="g1",
+                                                     routeTitle="t",
+                                                     routePath=key)]
+            )
+            for key in keys
+        ]).toEncodedPayload()
+
+    @defer.inlineCallbacks
+    def testStreamBatchesShareTheStreamId(self):
+        controller = SearchObjectImportController()
+
+        yield controller.importSearchObjectsStream([self._payload(["a", "b", "c"])])
+        yield controller.importSearchObjectsStream([self._payload(["a"])])
+
+        (firstAppend, firstStreamId), (secondAppend, secondStreamId), \
+        (otherAppend, otherStreamId) = self.importTask.calls
+
+        # The first batch replaces the group, the second appends to it, and
+        # matches the content hashes the first batch marked.
+        self.assertEqual([], firstAppend)
+        self.assertEqual(["g1"], secondAppend)
+        self.assertEqual(firstStreamId, secondStreamId)
+
+        self.assertEqual([], otherAppend)
+        self.assertNotEqual(firstStreamId, otherStreamId)
@@ -17,6 +17,8 @@ class EncodedSearchIndexChunk(Tuple, DeclarativeBase,
     __tablename__ = 'EncodedSearchIndexChunk'
     __tupleType__ = searchTuplePrefix + 'EncodedSearchIndexChunkTable'
 
+    # These index the rows of the legacy vortex payload format,
+    # New chunks are encoded by worker/tasks/SearchIndexChunkCodec.py
     ENCODED_DATA_KEYWORD_NUM = 0
     ENCODED_DATA_PROPERTY_MAME_NUM = 1
     ENCODED_DATA_OBJECT_IDS_JSON_INDEX = 2
@@ -28,6 +30,10 @@ class EncodedSearchIndexChunk(Tuple, DeclarativeBase,
     encodedHash = Column(String, nullable=False)
     lastUpdate = Column(String, nullable=False)
 
+    # A fingerprint of the source rows the chunk was encoded from, the compiler
+    # skips the chunk when this hasn't changed, see worker/tasks/_SourceFingerprint.py
+    sourceFingerprint = Column(String, nullable=True)
+
     __table_args__ = (
         Index("idx_EncodedSearchIndex_chunkKey", chunkKey, unique=True),
     )
@@ -22,6 +22,10 @@ class EncodedSearchObjectChunk(Tuple, DeclarativeBase,
     encodedHash = Column(String, nullable=False)
     lastUpdate = Column(String, nullable=False)
 
+    # A fingerprint of the source rows the chunk was encoded from, the compiler
+    # skips the chunk when this hasn't changed, see worker/tasks/_SourceFingerprint.py
+    sourceFingerprint = Column(String, nullable=True)
+
     __table_args__ = (
         Index("idx_EncodedSearchObject_chunkKey", chunkKey, unique=True),
     )
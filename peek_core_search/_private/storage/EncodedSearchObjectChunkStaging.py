@@ -0,0 +1,26 @@
+import logging
+
+from sqlalchemy import Column, LargeBinary
+from sqlalchemy import Integer, String
+from vortex.Tuple import Tuple, addTupleType
+
+from peek_core_search._private.PluginNames import searchTuplePrefix
+from .DeclarativeBase import DeclarativeBase
+
+logger = logging.getLogger(__name__)
+
+
+@addTupleType
+class EncodedSearchObjectChunkStaging(Tuple, DeclarativeBase):
+    """ Encoded Search Object Chunk Staging
+
+    A full rebuild compiles every chunk into this table, the chunks are then moved
+    into EncodedSearchObjectChunk in one transaction.
+
+    """
+    __tablename__ = 'EncodedSearchObjectChunkStaging'
+    __tupleType__ = searchTuplePrefix + 'EncodedSearchObjectChunkStagingTable'
+
+    chunkKey = Column(Integer, primary_key=True)
+    encodedData = Column(LargeBinary, nullable=False)
+    encodedHash = Column(String, nullable=False)
@@ -0,0 +1,26 @@
+from sqlalchemy import Column
+from sqlalchemy import Integer
+
+from peek_core_search._private.PluginNames import searchTuplePrefix
+from peek_core_search._private.storage.DeclarativeBase import DeclarativeBase
+from vortex.Tuple import Tuple, addTupleType
+
+
+@addTupleType
+class SearchChunkFormatTuple(Tuple, DeclarativeBase):
+    """ Search Chunk Format
+
+    This table has one row, the number of chunk keys the SearchIndex and SearchObject
+    rows are hashed into.
+
+    The counts are only changed by a chunk re-key, see SearchChunkRebuildController,
+    the importers lock this row so they never key rows with a count that is being
+    switched out.
+
+    """
+    __tupleType__ = searchTuplePrefix + 'SearchChunkFormatTuple'
+    __tablename__ = 'SearchChunkFormat'
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    indexBucketCount = Column(Integer, nullable=False, server_default='8192')
+    objectBucketCount = Column(Integer, nullable=False, server_default='8192')
@@ -0,0 +1,39 @@
+import logging
+
+from sqlalchemy import Column, BigInteger, Boolean
+from sqlalchemy import Integer, String
+from sqlalchemy.sql.schema import Index
+from vortex.Tuple import Tuple, addTupleType
+
+from peek_core_search._private.PluginNames import searchTuplePrefix
+from .DeclarativeBase import DeclarativeBase
+
+logger = logging.getLogger(__name__)
+
+
+@addTupleType
+class SearchIndexCompilerDelta(Tuple, DeclarativeBase):
+    """ Search Index Compiler Delta
+
+    A log of the SearchIndex rows added and removed by reindexSearchObject.
+
+    The index chunk compiler applies these to the existing encoded chunk, instead of
+    rebuilding the whole chunk from the SearchIndex table.
+
+    """
+    __tablename__ = 'SearchIndexCompilerDelta'
+    __tupleType__ = searchTuplePrefix + 'SearchIndexCompilerDeltaTable'
+
+    id = Column(BigInteger, primary_key=True, autoincrement=True)
+
+    chunkKey = Column(Integer, nullable=False)
+    keyword = Column(String, nullable=False)
+    propertyName = Column(String, nullable=False)
+    objectId = Column(BigInteger, nullable=False)
+
+    #:  True if the SearchIndex row was added, False if it was removed
+    isAdd = Column(Boolean, nullable=False)
+
+    __table_args__ = (
+        Index("idx_SearchIndexCompDelta_chunkKey", chunkKey),
+    )
@@ -1,7 +1,8 @@
 import logging
 
-from sqlalchemy import Column, BigInteger
+from sqlalchemy import Column, BigInteger, Boolean
 from sqlalchemy import Integer
+from sqlalchemy.sql.schema import Index
 from vortex.Tuple import Tuple, addTupleType
 
 from peek_abstract_chunked_index.private.tuples.ACIProcessorQueueTupleABC import \
@@ -18,12 +19,34 @@ class SearchIndexCompilerQueue(Tuple, DeclarativeBase,
     __tablename__ = 'SearchIndexCompilerQueue'
     __tupleType__ = searchTuplePrefix + 'SearchIndexCompilerQueueTable'
 
+    # There is one row for each chunk waiting to be compiled, rows are inserted with
+    # worker/tasks/_QueueChunks.py. The generation is incremented each time the
+    # chunk is queued again, so the compiler knows when a chunk has been changed
+    # while it was compiling it.
+    #
+    # Chunks queued by interactive imports have a higher priority, the compiler
+    # fetches them ahead of the bulk work.
+    #
+    # Chunks queued with rebuild set are rebuilt from the SearchIndex, their deltas
+    # are not applied. A bulk load changes the SearchIndex without logging deltas.
+
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     chunkKey = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, server_default='0')
+    priority = Column(Integer, nullable=False, server_default='0')
+    rebuild = Column(Boolean, nullable=False, server_default='false')
+
+    __table_args__ = (
+        Index("idx_SearchIndexCompQueue_chunkKey", chunkKey, unique=True),
+        Index("idx_SearchIndexCompQueue_priority", priority, id),
+    )
 
     @classmethod
     def sqlCoreLoad(cls, row):
-        return SearchIndexCompilerQueue(id=row.id, chunkKey=row.chunkKey)
+        return SearchIndexCompilerQueue(id=row.id, chunkKey=row.chunkKey,
+                                        generation=row.generation,
+                                        priority=row.priority,
+                                        rebuild=row.rebuild)
 
     @property
     def ckiUniqueKey(self):
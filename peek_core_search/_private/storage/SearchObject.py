@@ -33,6 +33,9 @@ class SearchObject(Tuple, DeclarativeBase):
 
     packedJson = Column(String, nullable=True)
 
+    #:  A hash of the last import of this object, see ImportSearchObjectTask
+    contentHash = Column(String, nullable=True)
+
     __table_args__ = (
         Index("idx_SearchObject_objectTypeId", objectTypeId),
         Index("idx_SearchObject_key", key, unique=True),
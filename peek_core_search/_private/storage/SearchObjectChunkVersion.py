@@ -0,0 +1,28 @@
+import logging
+
+from sqlalchemy import Column, BigInteger
+from sqlalchemy import Integer
+from vortex.Tuple import Tuple, addTupleType
+
+from peek_core_search._private.PluginNames import searchTuplePrefix
+from .DeclarativeBase import DeclarativeBase
+
+logger = logging.getLogger(__name__)
+
+
+@addTupleType
+class SearchObjectChunkVersion(Tuple, DeclarativeBase):
+    """ Search Object Chunk Version
+
+    A counter for each chunk, the importers increment it in the same transaction
+    that changes the packed SearchObject rows of the chunk.
+
+    The compiler stores the version it compiled in the sourceFingerprint of the
+    encoded chunk, and skips the chunk if the version hasn't changed since.
+
+    """
+    __tablename__ = 'SearchObjectChunkVersion'
+    __tupleType__ = searchTuplePrefix + 'SearchObjectChunkVersionTable'
+
+    chunkKey = Column(Integer, primary_key=True)
+    version = Column(BigInteger, nullable=False, server_default='0')
@@ -5,6 +5,7 @@ from peek_abstract_chunked_index.private.tuples.ACIProcessorQueueTupleABC import
 from peek_core_search._private.PluginNames import searchTuplePrefix
 from sqlalchemy import Column, BigInteger
 from sqlalchemy import Integer
+from sqlalchemy.sql.schema import Index
 from vortex.Tuple import Tuple, addTupleType
 
 from .DeclarativeBase import DeclarativeBase
@@ -18,12 +19,23 @@ class SearchObjectCompilerQueue(Tuple, DeclarativeBase,
     __tablename__ = 'SearchObjectCompilerQueue'
     __tupleType__ = searchTuplePrefix + 'SearchObjectCompilerQueueTable'
 
+    # One row per chunk, the same as SearchIndexCompilerQueue
+
     id = Column(BigInteger, primary_key=True, autoincrement=True)
     chunkKey = Column(Integer, primary_key=True)
+    generation = Column(Integer, nullable=False, server_default='0')
+    priority = Column(Integer, nullable=False, server_default='0')
+
+    __table_args__ = (
+        Index("idx_SearchObjectCompQueue_chunkKey", chunkKey, unique=True),
+        Index("idx_SearchObjectCompQueue_priority", priority, id),
+    )
 
     @classmethod
     def sqlCoreLoad(cls, row):
-        return SearchObjectCompilerQueue(id=row.id, chunkKey=row.chunkKey)
+        return SearchObjectCompilerQueue(id=row.id, chunkKey=row.chunkKey,
+                                         generation=row.generation,
+                                         priority=row.priority)
 
     @property
     def ckiUniqueKey(self):
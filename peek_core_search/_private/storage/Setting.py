@@ -262,4 +262,9 @@ OBJECT_COMPILER_ENABLED = PropertyKey('Object Compiler Enabled', True,
                                     propertyDict=globalProperties)
 
 KEYWORD_COMPILER_ENABLED = PropertyKey('Keyword Compiler Enabled', True,
-                                    propertyDict=globalProperties)
\ No newline at end of file
+                                    propertyDict=globalProperties)
+
+# Keyword chunks that encode larger than this are split into sub bucket chunks,
+# zero disables splitting.
+KEYWORD_CHUNK_MAX_BYTES = PropertyKey('Keyword Chunk Max Bytes', 512 * 1024,
+                                      propertyDict=globalProperties)
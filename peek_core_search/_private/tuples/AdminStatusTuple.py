@@ -1,3 +1,5 @@
+from typing import List, Optional
+
 from peek_core_search._private.PluginNames import searchTuplePrefix
 from vortex.Tuple import addTupleType, TupleField, Tuple
 
@@ -10,9 +12,46 @@ class AdminStatusTuple(Tuple):
     searchIndexCompilerQueueSize: int = TupleField(0)
     searchIndexCompilerQueueProcessedTotal: int = TupleField(0)
     searchIndexCompilerQueueLastError: str = TupleField()
-
+    searchIndexCompilerItemsPerTask: int = TupleField(0)
+    searchIndexCompilerBlocksMax: int = TupleField(0)
+    searchIndexCompilerPollSeconds: float = TupleField(0.0)
+    searchIndexCompilerTaskSeconds: Optional[float] = TupleField()
+    searchIndexCompilerTuningHistory: List[List] = TupleField([])
+    searchIndexCompilerChunksSkipped: int = TupleField(0)
+    searchIndexCompilerEncodeSeconds: float = TupleField(0.0)
+    searchIndexCompilerDbReadSeconds: float = TupleField(0.0)
+    searchIndexCompilerDbWriteSeconds: float = TupleField(0.0)
+    searchIndexCompilerChunkBytesHistogram: List[List] = TupleField([])
+    searchIndexCompilerChunkRowsHistogram: List[List] = TupleField([])
+    searchIndexCompilerChunkSecondsHistogram: List[List] = TupleField([])
+    searchIndexCompilerLargestChunks: List[List] = TupleField([])
+    searchIndexCompilerSlowestChunks: List[List] = TupleField([])
 
     searchObjectCompilerQueueStatus: bool = TupleField(False)
     searchObjectCompilerQueueSize: int = TupleField(0)
     searchObjectCompilerQueueProcessedTotal: int = TupleField(0)
     searchObjectCompilerQueueLastError: str = TupleField()
+    searchObjectCompilerItemsPerTask: int = TupleField(0)
+    searchObjectCompilerBlocksMax: int = TupleField(0)
+    searchObjectCompilerPollSeconds: float = TupleField(0.0)
+    searchObjectCompilerTaskSeconds: Optional[float] = TupleField()
+    searchObjectCompilerTuningHistory: List[List] = TupleField([])
+    searchObjectCompilerChunksSkipped: int = TupleField(0)
+    searchObjectCompilerEncodeSeconds: float = TupleField(0.0)
+    searchObjectCompilerDbReadSeconds: float = TupleField(0.0)
+    searchObjectCompilerDbWriteSeconds: float = TupleField(0.0)
+    searchObjectCompilerChunkBytesHistogram: List[List] = TupleField([])
+    searchObjectCompilerChunkRowsHistogram: List[List] = TupleField([])
+    searchObjectCompilerChunkSecondsHistogram: List[List] = TupleField([])
+    searchObjectCompilerLargestChunks: List[List] = TupleField([])
+    searchObjectCompilerSlowestChunks: List[List] = TupleField([])
+
+    searchChunkRebuildStatus: bool = TupleField(False)
+    searchChunkRebuildChunkKeysTotal: int = TupleField(0)
+    searchChunkRebuildChunkKeysProcessed: int = TupleField(0)
+    searchChunkRebuildChunksCompiled: int = TupleField(0)
+    searchChunkRebuildChunksPerSecond: float = TupleField(0.0)
+    searchChunkRebuildLastError: str = TupleField()
+
+    searchIndexBucketCount: int = TupleField(0)
+    searchObjectBucketCount: int = TupleField(0)
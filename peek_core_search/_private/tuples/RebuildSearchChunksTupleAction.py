@@ -0,0 +1,20 @@
+from typing import Optional
+
+from vortex.Tuple import addTupleType, TupleField
+from vortex.TupleAction import TupleActionABC
+
+from peek_core_search._private.PluginNames import searchTuplePrefix
+
+
+@addTupleType
+class RebuildSearchChunksTupleAction(TupleActionABC):
+    """ Rebuild Search Chunks Tuple Action
+
+    This action tells the server to rebuild every encoded index and object chunk.
+
+    If the bucket counts are set, the chunks are re-keyed with them.
+    """
+    __tupleType__ = searchTuplePrefix + 'RebuildSearchChunksTupleAction'
+
+    indexBucketCount: Optional[int] = TupleField()
+    objectBucketCount: Optional[int] = TupleField()
@@ -1,4 +1,4 @@
-from typing import Dict
+from typing import Dict, Optional
 
 from vortex.Tuple import addTupleType, TupleField, Tuple
 
@@ -14,6 +14,9 @@ class SearchObjectUpdateDateTuple(Tuple, ACIUpdateDateTupleABC):
     This tuple represents the state of the chunks in the cache.
     Each chunkKey has a lastUpdateDate as a string, this is used for offline caching
     all the chunks.
+
+    The chunks are keyed with bucketCount, a cache with another bucketCount is
+    loaded again.
     """
     __tupleType__ = searchTuplePrefix + "SearchObjectUpdateDateTuple"
 
@@ -22,6 +25,7 @@ class SearchObjectUpdateDateTuple(Tuple, ACIUpdateDateTupleABC):
 
     initialLoadComplete: bool = TupleField()
     updateDateByChunkKey: Dict[str, str] = TupleField({})
+    bucketCount: Optional[int] = TupleField()
 
     @property
     def ckiUpdateDateByChunkKey(self):
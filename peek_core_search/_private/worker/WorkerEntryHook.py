@@ -4,7 +4,7 @@ from peek_plugin_base.worker.PluginWorkerEntryHookABC import PluginWorkerEntryHo
 from peek_core_search._private.storage.DeclarativeBase import loadStorageTuples
 from peek_core_search._private.tuples import loadPrivateTuples
 from peek_core_search._private.worker.tasks import SearchIndexChunkCompilerTask, \
-    ImportSearchObjectTask, SearchObjectChunkCompilerTask
+    ImportSearchObjectTask, SearchObjectChunkCompilerTask, RebuildSearchChunksTask
 from peek_core_search.tuples import loadPublicTuples
 
 logger = logging.getLogger(__name__)
@@ -30,4 +30,5 @@ class WorkerEntryHook(PluginWorkerEntryHookABC):
     def celeryAppIncludes(self):
         return [SearchIndexChunkCompilerTask.__name__,
                 SearchObjectChunkCompilerTask.__name__,
-                ImportSearchObjectTask.__name__]
+                ImportSearchObjectTask.__name__,
+                RebuildSearchChunksTask.__name__]
@@ -0,0 +1,116 @@
+""" Chunk Envelope
+
+The compilers wrap the encoded index and object chunks in an envelope that records
+which codec compressed them.
+
+Envelope layout ::
+
+    byte        CHUNK_ENVELOPE_MAGIC
+    byte        codec, one of CHUNK_CODEC_*
+    bytes       the chunk, compressed with the codec
+
+Chunks are compiled once and loaded by every client, so they are compressed with
+the smallest zlib level by default.
+
+Data without the magic byte is passed through, this is how chunks compiled before
+the envelope are read.
+
+This MUST MATCH plugin-module/_private/ChunkEnvelope.ts
+
+"""
+import zlib
+from typing import Iterable, Optional
+
+CHUNK_ENVELOPE_MAGIC = 0xCE
+
+CHUNK_CODEC_NONE = 0x00
+CHUNK_CODEC_ZLIB = 0x01
+
+#: The codecs this version can read and write, the most preferred is first
+SUPPORTED_CHUNK_CODECS = (CHUNK_CODEC_ZLIB, CHUNK_CODEC_NONE)
+
+#: The codec the compilers store chunks with
+DEFAULT_CHUNK_CODEC = CHUNK_CODEC_ZLIB
+
+#: The zlib level, 1 is the fastest, 9 is the smallest
+CHUNK_ZLIB_LEVEL = 9
+
+
+def isChunkEnvelope(data: bytes) -> bool:
+    return data is not None and len(data) > 1 and data[0] == CHUNK_ENVELOPE_MAGIC
+
+
+def chunkEnvelopeCodec(data: bytes) -> Optional[int]:
+    """ Chunk Envelope Codec
+
+    :return: The codec of the chunk, or None if it's not in an envelope
+    """
+    if not isChunkEnvelope(data):
+        return None
+    return data[1]
+
+
+def wrapChunk(data: bytes, codec: int = DEFAULT_CHUNK_CODEC) -> bytes:
+    """ Wrap Chunk
+
+    :param data: The encoded chunk
+    :param codec: The CHUNK_CODEC_* to compress the chunk with
+    :return: The chunk, in an envelope
+    """
+    if codec == CHUNK_CODEC_ZLIB:
+        data = zlib.compress(data, CHUNK_ZLIB_LEVEL)
+
+    elif codec != CHUNK_CODEC_NONE:
+        raise ValueError("Chunk codec %s is not supported" % codec)
+
+    return bytes([CHUNK_ENVELOPE_MAGIC, codec]) + data
+
+
+def unwrapChunk(data: bytes) -> bytes:
+    """ Unwrap Chunk
+
+    :param data: The chunk, in an envelope or not
+    :return: The encoded chunk
+    """
+    codec = chunkEnvelopeCodec(data)
+
+    if codec is None:
+        return data
+
+    if codec == CHUNK_CODEC_ZLIB:
+        return zlib.decompress(data[2:])
+
+    if codec == CHUNK_CODEC_NONE:
+        return data[2:]
+
+    raise ValueError("Chunk codec %s is not supported" % codec)
+
+
+def transcodeChunk(data: bytes, acceptedCodecs: Optional[Iterable[int]]) -> bytes:
+    """ Transcode Chunk
+
+    Convert a stored chunk into a codec the receiver understands.
+
+    :param data: The stored chunk
+    :param acceptedCodecs: The codecs the receiver can read, None for receivers
+        that don't know about the envelope
+    :return: The chunk for the receiver
+    """
+    codec = chunkEnvelopeCodec(data)
+
+    if codec is None:
+        return data
+
+    if acceptedCodecs is None:
+        return unwrapChunk(data)
+
+    acceptedCodecs = set(acceptedCodecs)
+
+    if codec in acceptedCodecs:
+        return data
+
+    for newCodec in SUPPORTED_CHUNK_CODECS:
+        if newCodec in acceptedCodecs:
+            return wrapChunk(unwrapChunk(data), newCodec)
+
+    return unwrapChunk(data)
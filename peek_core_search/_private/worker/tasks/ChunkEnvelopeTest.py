@@ -0,0 +1,38 @@
+from twisted.trial import unittest
+
+from peek_core_search._private.worker.tasks.ChunkEnvelope import wrapChunk, \
+    unwrapChunk, transcodeChunk, chunkEnvelopeCodec, CHUNK_CODEC_NONE, \
+    CHUNK_CODEC_ZLIB
+
+
+class ChunkEnvelopeTest(unittest.TestCase):
+    DATA = bytes([0x01]) + b'keyword' * 100
+
+    def testRoundTrip(self):
+        for codec in (CHUNK_CODEC_NONE, CHUNK_CODEC_ZLIB):
+            wrapped = wrapChunk(self.DATA, codec)
+            self.assertEqual(codec, chunkEnvelopeCodec(wrapped))
+            self.assertEqual(self.DATA, unwrapChunk(wrapped))
+
+        self.assertLess(len(wrapChunk(self.DATA, CHUNK_CODEC_ZLIB)), len(self.DATA))
+
+    def testUnwrappedPassesThrough(self):
+        self.assertIsNone(chunkEnvelopeCodec(self.DATA))
+        self.assertEqual(self.DATA, unwrapChunk(self.DATA))
+        self.assertEqual(self.DATA, transcodeChunk(self.DATA, [CHUNK_CODEC_ZLIB]))
+
+    def testTranscode(self):
+        wrapped = wrapChunk(self.DATA, CHUNK_CODEC_ZLIB)
+
+        self.assertIs(wrapped, transcodeChunk(wrapped, [CHUNK_CODEC_ZLIB]))
+        self.assertEqual(self.DATA, transcodeChunk(wrapped, None))
+        self.assertEqual(self.DATA, transcodeChunk(wrapped, [0x7F]))
+        self.assertEqual(wrapChunk(self.DATA, CHUNK_CODEC_NONE),
+                         transcodeChunk(wrapped, [CHUNK_CODEC_NONE]))
+
+    def testUnknownCodec(self):
+        wrapped = bytes([wrapChunk(self.DATA)[0], 0x7F]) + self.DATA
+
+        self.assertRaises(ValueError, unwrapChunk, wrapped)
+        self.assertRaises(ValueError, transcodeChunk, wrapped, [CHUNK_CODEC_NONE])
+        self.assertRaises(ValueError, wrapChunk, self.DATA, 0x7F)
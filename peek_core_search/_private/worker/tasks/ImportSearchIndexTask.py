@@ -1,17 +1,28 @@
 import logging
 from collections import namedtuple
 from datetime import datetime
-from typing import List
+from typing import List, Set, Tuple
 
 import pytz
-from sqlalchemy import select
+from sqlalchemy import select, false
+from sqlalchemy.sql import Select
 
 from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexChunkVersion import \
+    SearchIndexChunkVersion
+from peek_core_search._private.storage.SearchIndexCompilerDelta import \
+    SearchIndexCompilerDelta
 from peek_core_search._private.storage.SearchIndexCompilerQueue import \
     SearchIndexCompilerQueue
 from peek_core_search._private.worker.tasks.KeywordSplitter import splitFullKeywords, \
     splitPartialKeywords
-from peek_core_search._private.worker.tasks._CalcChunkKey import makeSearchIndexChunkKey
+from peek_core_search._private.worker.tasks._BulkInsert import bulkInsert
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    makeSearchIndexChunkKeys, INDEX_BUCKET_COUNT
+from peek_core_search._private.worker.tasks._QueueChunks import \
+    queueChunkKeysFromSelect
+from peek_core_search._private.worker.tasks._SourceFingerprint import \
+    bumpSourceVersionsFromSelect
 from peek_plugin_base.worker import CeleryDbConn
 
 logger = logging.getLogger(__name__)
@@ -20,63 +31,141 @@ ObjectToIndexTuple = namedtuple("ObjectToIndexTuple", ["id", "fullKwProps",
                                                        "partialKwProps"])
 
 
-def removeObjectIdsFromSearchIndex(deletedObjectIds: List[int]) -> None:
-    pass
+def removeObjectIdsFromSearchIndex(conn, objectIdsSelect: Select) -> None:
+    """ Remove Object IDs From Search Index
 
+    Delete the SearchIndex rows of objects, logging the compiler deltas, bumping
+    the source versions and queuing the index chunks, without loading the rows.
 
-def reindexSearchObject(conn, objectsToIndex: List[ObjectToIndexTuple]) -> None:
+    :param conn:
+    :param objectIdsSelect: A select of the object ids to remove
+    """
+    searchIndexTable = SearchIndex.__table__
+    queueTable = SearchIndexCompilerQueue.__table__
+    deltaTable = SearchIndexCompilerDelta.__table__
+
+    startTime = datetime.now(pytz.utc)
+
+    whereclause = searchIndexTable.c.objectId.in_(objectIdsSelect)
+
+    conn.execute(deltaTable.insert().from_select(
+        ['chunkKey', 'keyword', 'propertyName', 'objectId', 'isAdd'],
+        select(columns=[searchIndexTable.c.chunkKey, searchIndexTable.c.keyword,
+                        searchIndexTable.c.propertyName, searchIndexTable.c.objectId,
+                        false()],
+               whereclause=whereclause)
+    ))
+
+    chunkKeysSelect = select(columns=[searchIndexTable.c.chunkKey],
+                             whereclause=whereclause,
+                             distinct=True)
+
+    bumpSourceVersionsFromSelect(conn, SearchIndexChunkVersion.__table__,
+                                 chunkKeysSelect)
+    queueChunkKeysFromSelect(conn, queueTable, chunkKeysSelect)
+
+    result = conn.execute(searchIndexTable.delete(whereclause))
+
+    logger.debug("Removed %s SearchIndex keywords in %s",
+                 result.rowcount, (datetime.now(pytz.utc) - startTime))
+
+
+def reindexSearchObject(conn, objectsToIndex: List[ObjectToIndexTuple],
+                        bulkLoad: bool = False,
+                        bucketCount: int = INDEX_BUCKET_COUNT) -> Set[int]:
     """ Reindex Search Object
 
+    Only the difference between the existing and the new SearchIndex rows of each
+    object is deleted and inserted.
+
     :param conn:
     :param objectsToIndex: Object To Index
-    :returns:
+    :param bulkLoad: Don't log compiler deltas,
+        queueAllSearchChunksTask queues every chunk when the load is complete.
+    :param bucketCount: The index bucket count, from loadBucketCounts
+    :returns: The chunk keys that actually changed, for the caller to bump the
+        source versions of, and queue, before it commits.
     """
 
     logger.debug("Starting to index %s SearchIndex", len(objectsToIndex))
 
     searchIndexTable = SearchIndex.__table__
-    queueTable = SearchIndexCompilerQueue.__table__
 
     startTime = datetime.now(pytz.utc)
 
-    newSearchIndexes = []
+    keywordRows = []
     objectIds = []
-    searchIndexChunksToQueue = set()
 
     for objectToIndex in objectsToIndex:
-        newSearchIndexes.extend(_indexObject(objectToIndex))
+        keywordRows.extend(_indexObject(objectToIndex))
         objectIds.append(objectToIndex.id)
 
-    newIdGen = CeleryDbConn.prefetchDeclarativeIds(SearchIndex, len(newSearchIndexes))
-    for newSearchIndex in newSearchIndexes:
-        newSearchIndex.id = next(newIdGen)
-        searchIndexChunksToQueue.add(newSearchIndex.chunkKey)
+    # Hash the keywords of all the objects at once
+    chunkKeys = makeSearchIndexChunkKeys([row[0] for row in keywordRows], bucketCount)
+    newRows = set([(chunkKey,) + row for chunkKey, row in zip(chunkKeys, keywordRows)])
 
     results = conn.execute(select(
-        columns=[searchIndexTable.c.chunkKey],
+        columns=[searchIndexTable.c.id,
+                 searchIndexTable.c.chunkKey, searchIndexTable.c.keyword,
+                 searchIndexTable.c.propertyName, searchIndexTable.c.objectId],
         whereclause=searchIndexTable.c.objectId.in_(objectIds)
     ))
 
+    idByOldRow = {}
     for result in results:
-        searchIndexChunksToQueue.add(result.chunkKey)
+        idByOldRow[(result.chunkKey, result.keyword,
+                    result.propertyName, result.objectId)] = result.id
+
+    oldRows = set(idByOldRow)
+    rowsToDelete = oldRows - newRows
+    rowsToInsert = newRows - oldRows
+
+    if rowsToDelete:
+        conn.execute(searchIndexTable.delete(
+            searchIndexTable.c.id.in_([idByOldRow[row] for row in rowsToDelete])
+        ))
+
+    if rowsToInsert:
+        logger.debug("Inserting %s SearchIndex", len(rowsToInsert))
+        newIdGen = CeleryDbConn.prefetchDeclarativeIds(SearchIndex, len(rowsToInsert))
+        inserts = [dict(id=next(newIdGen), chunkKey=chunkKey, keyword=keyword,
+                        propertyName=propertyName, objectId=objectId)
+                   for chunkKey, keyword, propertyName, objectId in rowsToInsert]
+        # The unique index includes the objectId, and every existing row of these
+        # objects was loaded above, so these rows can't conflict. A conflict must
+        # fail, the deltas are logged for every row.
+        bulkInsert(conn, searchIndexTable, inserts)
 
-    if objectIds:
-        conn.execute(searchIndexTable
-                     .delete(searchIndexTable.c.objectId.in_(objectIds)))
+    if not bulkLoad:
+        _insertCompilerDeltas(conn, rowsToDelete, rowsToInsert)
 
-    if newSearchIndexes:
-        logger.debug("Inserting %s SearchIndex", len(newSearchIndexes))
-        inserts = [o.tupleToSqlaBulkInsertDict() for o in newSearchIndexes]
-        conn.execute(searchIndexTable.insert(), inserts)
+    logger.info("Reindexed %s SearchIndex keywords, deleted %s, inserted %s, in %s",
+                len(newRows), len(rowsToDelete), len(rowsToInsert),
+                (datetime.now(pytz.utc) - startTime))
+
+    return set([row[0] for row in rowsToDelete | rowsToInsert])
+
+
+def _insertCompilerDeltas(conn, deletedRows: Set[Tuple],
+                          insertedRows: Set[Tuple]) -> None:
+    """ Insert Compiler Deltas
+
+    Log the SearchIndex rows that were actually added and removed, so the index
+    chunk compiler can patch the existing chunks instead of rebuilding them.
+
+    :param deletedRows: (chunkKey, keyword, propertyName, objectId) rows deleted
+    :param insertedRows: (chunkKey, keyword, propertyName, objectId) rows inserted
+    """
+    deltaTable = SearchIndexCompilerDelta.__table__
 
-    if searchIndexChunksToQueue:
-        conn.execute(
-            queueTable.insert(),
-            [dict(chunkKey=k) for k in searchIndexChunksToQueue]
-        )
+    inserts = []
+    for isAdd, rows in ((False, deletedRows), (True, insertedRows)):
+        for chunkKey, keyword, propertyName, objectId in rows:
+            inserts.append(dict(chunkKey=chunkKey, keyword=keyword,
+                                propertyName=propertyName, objectId=objectId,
+                                isAdd=isAdd))
 
-    logger.info("Inserted %s SearchIndex keywords in %s",
-                len(newSearchIndexes), (datetime.now(pytz.utc) - startTime))
+    bulkInsert(conn, deltaTable, inserts)
 
 
 # stopwords = set()  # nltk.corpus.stopwords.words('english'))
@@ -91,10 +180,11 @@ def reindexSearchObject(conn, objectsToIndex: List[ObjectToIndexTuple]) -> None:
 #
 # lemmatizer = WordNetLemmatizer()
 
-def _indexObject(objectToIndex: ObjectToIndexTuple) -> List[SearchIndex]:
+def _indexObject(objectToIndex: ObjectToIndexTuple) -> List[Tuple[str, str, int]]:
     """ Index Object
 
-    This method creates  the "SearchIndex" objects to insert into the DB.
+    This method creates the "SearchIndex" rows to insert into the DB, the caller
+    adds their chunk keys.
 
     Because our data is not news articles, we can skip some of the advanced
     natural language processing (NLP)
@@ -102,30 +192,17 @@ def _indexObject(objectToIndex: ObjectToIndexTuple) -> List[SearchIndex]:
     We're going to be indexing things like unique IDs, job titles, and equipment names.
     We may add exclusions for nuisance words later on.
 
+    :return: A list of (keyword, propertyName, objectId)
     """
     searchIndexes = []
 
     for propKey, text in objectToIndex.fullKwProps.items():
         for token in splitFullKeywords(text):
-            searchIndexes.append(
-                SearchIndex(
-                    chunkKey=makeSearchIndexChunkKey(token),
-                    keyword=token,
-                    propertyName=propKey,
-                    objectId=objectToIndex.id
-                )
-            )
+            searchIndexes.append((token, propKey, objectToIndex.id))
 
     for propKey, text in objectToIndex.partialKwProps.items():
         for token in splitPartialKeywords(text):
-            searchIndexes.append(
-                SearchIndex(
-                    chunkKey=makeSearchIndexChunkKey(token),
-                    keyword=token,
-                    propertyName=propKey,
-                    objectId=objectToIndex.id
-                )
-            )
+            searchIndexes.append((token, propKey, objectToIndex.id))
 
     return searchIndexes
 
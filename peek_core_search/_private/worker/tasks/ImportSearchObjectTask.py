@@ -1,11 +1,24 @@
+import hashlib
 import json
+from base64 import b64encode
 import logging
-from collections import defaultdict
+from collections import defaultdict, namedtuple
 from datetime import datetime
-from typing import List, Dict, Tuple, Set
+from typing import List, Dict, Optional, Tuple, Set
 
 import pytz
+from peek_core_search._private.storage.EncodedSearchIndexChunk import \
+    EncodedSearchIndexChunk
+from peek_core_search._private.storage.EncodedSearchObjectChunk import \
+    EncodedSearchObjectChunk
+from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexChunkVersion import \
+    SearchIndexChunkVersion
+from peek_core_search._private.storage.SearchIndexCompilerQueue import \
+    SearchIndexCompilerQueue
 from peek_core_search._private.storage.SearchObject import SearchObject
+from peek_core_search._private.storage.SearchObjectChunkVersion import \
+    SearchObjectChunkVersion
 from peek_core_search._private.storage.SearchObjectCompilerQueue import \
     SearchObjectCompilerQueue
 from peek_core_search._private.storage.SearchObjectRoute import SearchObjectRoute
@@ -13,18 +26,57 @@ from peek_core_search._private.storage.SearchObjectTypeTuple import \
     SearchObjectTypeTuple
 from peek_core_search._private.storage.SearchPropertyTuple import SearchPropertyTuple
 from peek_core_search._private.worker.tasks.ImportSearchIndexTask import \
-    ObjectToIndexTuple, reindexSearchObject
+    ObjectToIndexTuple, reindexSearchObject, removeObjectIdsFromSearchIndex
+from peek_core_search._private.worker.tasks._BulkInsert import bulkInsert
 from peek_core_search._private.worker.tasks._CalcChunkKey import \
-    makeSearchObjectChunkKey
+    makeSearchObjectChunkKey, INDEX_BUCKET_COUNT, OBJECT_BUCKET_COUNT
+from peek_core_search._private.worker.tasks._ChunkFormat import loadBucketCounts
+from peek_core_search._private.worker.tasks._QueueChunks import queueChunkKeys, \
+    queueChunkKeysFromSelect, QUEUE_PRIORITY_BULK, QUEUE_PRIORITY_INTERACTIVE
+from peek_core_search._private.worker.tasks._SourceFingerprint import \
+    bumpSourceVersions, bumpSourceVersionsFromSelect
 from peek_core_search.tuples.ImportSearchObjectTuple import ImportSearchObjectTuple
 from peek_plugin_base.worker import CeleryDbConn
 from peek_plugin_base.worker.CeleryApp import celeryApp
-from sqlalchemy import select, bindparam, and_, or_
+from sqlalchemy import select, bindparam, and_, exists, func, cast, String, union, \
+    literal
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.dialects.postgresql import JSONB, aggregate_order_by
 from txcelery.defer import DeferrableTask
 from vortex.Payload import Payload
 
 logger = logging.getLogger(__name__)
 
+_ObjectToPackTuple = namedtuple("_ObjectToPackTuple", ["fullKwProps", "partialKwProps",
+                                                       "objectTypeId"])
+
+
+class _LookupCache:
+    """ Lookup Cache
+
+    The SearchProperty names and SearchObjectType ids, cached for the life of this
+    worker process.
+
+    """
+
+    def __init__(self):
+        self.version: Optional[str] = None
+        self.propertyNames: Set[str] = set()
+        self.objectTypeIdsByName: Dict[str, int] = {}
+
+    def checkVersion(self, version: Optional[str]) -> None:
+        if version is None or version != self.version:
+            self.clear()
+            self.version = version
+
+    def clear(self) -> None:
+        self.version = None
+        self.propertyNames = set()
+        self.objectTypeIdsByName = {}
+
+
+_lookupCache = _LookupCache()
+
 
 # We need to insert the into the following tables:
 # SearchObject - or update it's details if required
@@ -36,12 +88,135 @@ logger = logging.getLogger(__name__)
 @DeferrableTask
 @celeryApp.task(bind=True)
 def removeSearchObjectTask(self, importGroupHashes: List[str]) -> None:
-    pass
+    """ Remove Search Object Task
+
+    Remove the routes of the import groups. Objects left without routes are
+    deleted, along with their keywords. The other objects have the routes removed
+    from their packed JSON.
+
+    This is all done in the database, no objects are loaded.
+
+    :param importGroupHashes: The importGroupHash of the routes to remove
+    """
+    startTime = datetime.now(pytz.utc)
+
+    routeTable = SearchObjectRoute.__table__
+    otherRouteTable = routeTable.alias('otherRoute')
+    searchObjectTable = SearchObject.__table__
+    objectQueueTable = SearchObjectCompilerQueue.__table__
+
+    isGroupRoute = routeTable.c.importGroupHash.in_(importGroupHashes)
+
+    # The objects with a route in the groups
+    objectIdsSelect = select(columns=[routeTable.c.objectId],
+                             whereclause=isGroupRoute)
+
+    # The objects with a route in the groups, and a route in another group
+    hasOtherRoutes = exists().where(and_(
+        otherRouteTable.c.objectId == routeTable.c.objectId,
+        ~otherRouteTable.c.importGroupHash.in_(importGroupHashes)
+    ))
+
+    keptObjectIdsSelect = select(columns=[routeTable.c.objectId],
+                                 whereclause=and_(isGroupRoute, hasOtherRoutes))
+
+    deletedObjectIdsSelect = select(columns=[routeTable.c.objectId],
+                                    whereclause=and_(isGroupRoute, ~hasOtherRoutes))
+
+    # The routes the kept objects will have left, as packed by _packObjectJson
+    otherRoutesJson = (
+        select(columns=[func.coalesce(
+            func.jsonb_agg(aggregate_order_by(
+                func.jsonb_build_array(otherRouteTable.c.routeTitle,
+                                       otherRouteTable.c.routePath),
+                otherRouteTable.c.routeTitle
+            )),
+            cast('[]', JSONB)
+        )])
+            .where(and_(otherRouteTable.c.objectId == searchObjectTable.c.id,
+                        ~otherRouteTable.c.importGroupHash.in_(importGroupHashes)))
+            .as_scalar()
+    )
+
+    packedJsonWithOtherRoutes = cast(
+        func.jsonb_set(cast(searchObjectTable.c.packedJson, JSONB),
+                       '{_r_}', otherRoutesJson),
+        String
+    )
+
+    engine = CeleryDbConn.getDbEngine()
+    conn = engine.connect()
+    transaction = conn.begin()
+
+    try:
+        # The queued chunk keys must not be switched out by a re-key
+        loadBucketCounts(conn, lockForImport=True)
+
+        conn.execute(
+            searchObjectTable.update()
+                .where(searchObjectTable.c.id.in_(keptObjectIdsSelect))
+                .values(packedJson=packedJsonWithOtherRoutes, contentHash=None)
+        )
+
+        # This queues the index chunks, queue them before the object chunks, the
+        # same order as importSearchObjectTask locks them
+        removeObjectIdsFromSearchIndex(conn, deletedObjectIdsSelect)
+
+        objectChunkKeysSelect = select(
+            columns=[searchObjectTable.c.chunkKey],
+            whereclause=searchObjectTable.c.id.in_(objectIdsSelect),
+            distinct=True
+        )
+
+        bumpSourceVersionsFromSelect(conn, SearchObjectChunkVersion.__table__,
+                                     objectChunkKeysSelect)
+        queueChunkKeysFromSelect(conn, objectQueueTable, objectChunkKeysSelect)
+
+        # This cascades to the routes of the deleted objects
+        deletedObjects = conn.execute(
+            searchObjectTable.delete(searchObjectTable.c.id.in_(deletedObjectIdsSelect))
+        )
+
+        deletedRoutes = conn.execute(routeTable.delete(isGroupRoute))
+
+        transaction.commit()
+
+        logger.info("Removed %s SearchObjects and %s other SearchObjectRoutes in %s",
+                    deletedObjects.rowcount, deletedRoutes.rowcount,
+                    datetime.now(pytz.utc) - startTime)
+
+    except Exception as e:
+        transaction.rollback()
+        logger.debug("Retrying remove search objects, %s", e)
+        raise self.retry(exc=e, countdown=3)
+
+    finally:
+        conn.close()
 
 
 @DeferrableTask
 @celeryApp.task(bind=True)
-def importSearchObjectTask(self, searchObjectsEncodedPayload: bytes) -> None:
+def importSearchObjectTask(self, searchObjectsEncodedPayload: bytes,
+                           appendRouteImportGroupHashes: List[str] = None,
+                           lookupVersion: Optional[str] = None,
+                           bulkLoad: bool = False,
+                           interactive: bool = False,
+                           streamId: Optional[str] = None) -> None:
+    """ Import Search Object Task
+
+    :param searchObjectsEncodedPayload: The List[ImportSearchObjectTuple] to import
+    :param appendRouteImportGroupHashes: The import groups that an earlier batch of
+        the same import has already replaced the routes of, only the routes of the
+        objects in this batch are replaced for these groups.
+    :param lookupVersion: The version of the SearchProperty and SearchObjectType
+        tables, the cached lookups are dropped when this changes.
+        None disables the cache.
+    :param bulkLoad: Don't queue the changed chunks for compiling,
+        queueAllSearchChunksTask is called once the whole load is imported.
+    :param interactive: Queue the changed chunks ahead of the bulk work.
+    :param streamId: The id of the streamed import this batch belongs to, see
+        _contentHashMark.
+    """
     startTime = datetime.now(pytz.utc)
 
     # Decode arguments
@@ -62,469 +237,590 @@ def importSearchObjectTask(self, searchObjectsEncodedPayload: bytes) -> None:
         if o.partialKeywords:
             o.partialKeywords = {k.lower(): v for k, v in o.partialKeywords.items()}
 
+    engine = CeleryDbConn.getDbEngine()
+    conn = engine.connect()
+    transaction = conn.begin()
+
     try:
-        objectTypeIdsByName = _prepareLookups(newSearchObjects)
+        # Lock the chunk format first, a re-key can't switch the bucket counts
+        # until this import commits.
+        bucketCounts = loadBucketCounts(conn, lockForImport=True)
 
-        objectIdByKey, chunkKeysForQueue = _insertOrUpdateObjects(
-            newSearchObjects, objectTypeIdsByName
-        )
+        objectTypeIdsByName = _prepareLookups(conn, newSearchObjects, lookupVersion)
+
+        objectIdByKey, objectChunkKeys, indexChunkKeys, objectsToPackById = \
+            _insertOrUpdateObjects(conn, newSearchObjects, objectTypeIdsByName,
+                                   bulkLoad, bucketCounts, streamId)
+
+        routesByObjectId = _insertObjectRoutes(conn, newSearchObjects, objectIdByKey,
+                                               appendRouteImportGroupHashes, streamId)
+
+        _packObjectJson(conn, objectsToPackById, routesByObjectId)
 
-        _insertObjectRoutes(newSearchObjects, objectIdByKey)
+        # Queue the chunks last, the version and queue rows are locked until the
+        # commit. A bulk load bumps the versions too, queueAllSearchChunksTask then
+        # skips the chunks it didn't change.
+        priority = QUEUE_PRIORITY_INTERACTIVE if interactive else QUEUE_PRIORITY_BULK
+        for versionTable, queueTable, chunkKeys in (
+                (SearchIndexChunkVersion.__table__,
+                 SearchIndexCompilerQueue.__table__, indexChunkKeys),
+                (SearchObjectChunkVersion.__table__,
+                 SearchObjectCompilerQueue.__table__, objectChunkKeys)):
+            bumpSourceVersions(conn, versionTable, chunkKeys)
+            if not bulkLoad:
+                queueChunkKeys(conn, queueTable, chunkKeys, priority)
 
-        _packObjectJson(list(objectIdByKey.values()), chunkKeysForQueue)
+        transaction.commit()
 
         logger.info("Imported %s SearchObjects in %s",
                     len(newSearchObjects),
                     datetime.now(pytz.utc) - startTime)
 
     except Exception as e:
+        transaction.rollback()
+        # The cache may hold lookups that were just rolled back
+        _lookupCache.clear()
         logger.debug("Retrying import search objects, %s", e)
         raise self.retry(exc=e, countdown=3)
 
+    finally:
+        conn.close()
 
-def _prepareLookups(newSearchObjects: List[ImportSearchObjectTuple]) -> Dict[str, int]:
-    """ Check Or Insert Search Properties
 
-    Make sure the search properties exist.
+@DeferrableTask
+@celeryApp.task(bind=True)
+def queueAllSearchChunksTask(self) -> None:
+    """ Queue All Search Chunks Task
 
-    """
+    Queue every index and object chunk for compiling, once each.
+
+    This is called at the end of a bulk load, the compilers then build each chunk
+    once, instead of once for every batch that changed it.
 
-    dbSession = CeleryDbConn.getDbSession()
+    The chunks already compiled are queued too, so chunks left empty are deleted.
+    The object chunks the load didn't change still have the same source version,
+    the compiler skips them.
 
+    The bulk load didn't log any compiler deltas, the index chunks are queued to be
+    rebuilt, so the deltas other imports logged meanwhile aren't applied to the
+    chunks compiled before the load.
+
+    """
     startTime = datetime.now(pytz.utc)
 
+    engine = CeleryDbConn.getDbEngine()
+    conn = engine.connect()
+    transaction = conn.begin()
+
     try:
+        loadBucketCounts(conn, lockForImport=True)
+
+        for queueTable, table, encodedTable, rebuild in (
+                (SearchIndexCompilerQueue.__table__, SearchIndex.__table__,
+                 EncodedSearchIndexChunk.__table__, True),
+                (SearchObjectCompilerQueue.__table__, SearchObject.__table__,
+                 EncodedSearchObjectChunk.__table__, False)):
+            queueChunkKeysFromSelect(
+                conn, queueTable,
+                union(select(columns=[table.c.chunkKey]),
+                      select(columns=[encodedTable.c.chunkKey])),
+                rebuild=rebuild
+            )
 
-        objectTypeNames = {'none'}
-        propertyNames = {'key'}
+        transaction.commit()
 
-        for o in newSearchObjects:
-            objectTypeNames.add(o.objectType)
+        logger.info("Queued all search chunks in %s",
+                    datetime.now(pytz.utc) - startTime)
 
-            if o.fullKeywords:
-                propertyNames.update(o.fullKeywords)
+    except Exception as e:
+        transaction.rollback()
+        logger.debug("Retrying queue all search chunks, %s", e)
+        raise self.retry(exc=e, countdown=3)
 
-            if o.partialKeywords:
-                propertyNames.update(o.partialKeywords)
+    finally:
+        conn.close()
 
-        # Prepare Properties
-        dbProps = dbSession.query(SearchPropertyTuple).all()
-        propertyNames -= set([o.name for o in dbProps])
 
-        if propertyNames:
-            for newPropName in propertyNames:
-                dbSession.add(SearchPropertyTuple(name=newPropName, title=newPropName))
+def _prepareLookups(conn, newSearchObjects: List[ImportSearchObjectTuple],
+                    lookupVersion: Optional[str]) -> Dict[str, int]:
+    """ Check Or Insert Search Properties
 
-            dbSession.commit()
+    Make sure the search properties exist.
 
-        del dbProps
-        del propertyNames
+    The database is only queried for names that are not in the lookup cache.
 
-        # Prepare Object Types
-        dbObjectTypes = dbSession.query(SearchObjectTypeTuple).all()
-        objectTypeNames -= set([o.name for o in dbObjectTypes])
+    """
+    propertyTable = SearchPropertyTuple.__table__
+    objectTypeTable = SearchObjectTypeTuple.__table__
 
-        if not objectTypeNames:
-            objectTypeIdsByName = {o.name: o.id for o in dbObjectTypes}
+    startTime = datetime.now(pytz.utc)
 
-        else:
-            for newPropName in objectTypeNames:
-                dbSession.add(SearchObjectTypeTuple(name=newPropName, title=newPropName))
+    _lookupCache.checkVersion(lookupVersion)
 
-            dbSession.commit()
+    objectTypeNames = {'none'}
+    propertyNames = {'key'}
 
-            dbObjectTypes = dbSession.query(SearchObjectTypeTuple).all()
-            objectTypeIdsByName = {o.name: o.id for o in dbObjectTypes}
+    for o in newSearchObjects:
+        objectTypeNames.add(o.objectType)
 
-        logger.debug("Prepared lookups in %s", (datetime.now(pytz.utc) - startTime))
+        if o.fullKeywords:
+            propertyNames.update(o.fullKeywords)
 
-        return objectTypeIdsByName
+        if o.partialKeywords:
+            propertyNames.update(o.partialKeywords)
 
-    except Exception as e:
-        dbSession.rollback()
-        raise
+    # Prepare Properties
+    propertyNames -= _lookupCache.propertyNames
 
-    finally:
-        dbSession.close()
+    if propertyNames:
+        conn.execute(
+            postgresql.insert(propertyTable)
+                .values([dict(name=name, title=name) for name in propertyNames])
+                .on_conflict_do_nothing()
+        )
+        _lookupCache.propertyNames |= propertyNames
 
+    del propertyNames
 
-def _insertOrUpdateObjects(newSearchObjects: List[ImportSearchObjectTuple],
-                           objectTypeIdsByName: Dict[str, int]) -> Tuple[
-    Dict[str, int], Set[int]]:
+    # Prepare Object Types
+    objectTypeNames -= set(_lookupCache.objectTypeIdsByName)
+
+    if objectTypeNames:
+        conn.execute(
+            postgresql.insert(objectTypeTable)
+                .values([dict(name=name, title=name) for name in objectTypeNames])
+                .on_conflict_do_nothing()
+        )
+
+        results = conn.execute(select(
+            columns=[objectTypeTable.c.id, objectTypeTable.c.name],
+            whereclause=objectTypeTable.c.name.in_(objectTypeNames)
+        ))
+        _lookupCache.objectTypeIdsByName.update({o.name: o.id for o in results})
+
+    logger.debug("Prepared lookups in %s", (datetime.now(pytz.utc) - startTime))
+
+    return _lookupCache.objectTypeIdsByName
+
+
+def _insertOrUpdateObjects(conn, newSearchObjects: List[ImportSearchObjectTuple],
+                           objectTypeIdsByName: Dict[str, int],
+                           bulkLoad: bool = False,
+                           bucketCounts: Tuple[int, int] = (INDEX_BUCKET_COUNT,
+                                                            OBJECT_BUCKET_COUNT),
+                           streamId: Optional[str] = None
+                           ) -> Tuple[Dict[str, int], Set[int], Set[int],
+                                      Dict[int, _ObjectToPackTuple]]:
     """ Insert or Update Objects
 
     1) Find objects and update them
     2) Insert object if the are missing
 
+    :param bucketCounts: The (index, object) bucket counts, from loadBucketCounts
+    :param streamId: The id of the streamed import, see _contentHashMark
+    :return: A tuple of (the object ids by their lowered key, the object chunk keys
+        to queue, the index chunk keys to queue, the properties to pack for each
+        object)
     """
 
     searchObjectTable = SearchObject.__table__
+    indexBucketCount, objectBucketCount = bucketCounts
 
     startTime = datetime.now(pytz.utc)
 
-    createdObjectByKey, engine, newIdGen = _loadExistingObjects(newSearchObjects,
-                                                                searchObjectTable)
+    createdObjectByKey, newIdGen = _loadExistingObjects(conn, newSearchObjects,
+                                                        searchObjectTable)
+
+    # Create state arrays
+    objectsToIndex: Dict[int, ObjectToIndexTuple] = {}
+    objectsToPackById: Dict[int, _ObjectToPackTuple] = {}
+    objectIdByKey: Dict[str, int] = {}
+    inserts = []
+    propUpdates = []
+    objectTypeUpdates = []
+    contentHashRestores = []
+    chunkKeysForQueue: Set[int] = set()
+
+    # Work out which objects have been updated or need inserting
+    for importObject in newSearchObjects:
+        originalImportObjectKey = importObject.key
+        importObject.key = importObject.key.lower()
+        loweredObjectKey = importObject.key
+
+        existingObject = createdObjectByKey.get(loweredObjectKey)
+        importObjectTypeId = objectTypeIdsByName[importObject.objectType]
+
+        contentHash = _makeContentHash(originalImportObjectKey, importObject)
+
+        # This object was last imported with the same content, there is nothing
+        # to update, apart from reinserting its routes.
+        if existingObject and existingObject.contentHash == contentHash:
+            objectIdByKey[loweredObjectKey] = existingObject.id
+            continue
+
+        # An earlier batch of this stream replaced the objects import group.
+        if (existingObject and streamId is not None
+                and existingObject.contentHash
+                == _contentHashMark(streamId) + contentHash):
+            contentHashRestores.append(dict(b_id=existingObject.id,
+                                            b_contentHash=contentHash))
+            objectIdByKey[loweredObjectKey] = existingObject.id
+            continue
 
-    conn = engine.connect()
-    transaction = conn.begin()
+        fullKwPropsWithKey = dict(key=originalImportObjectKey)
+        partialKwProps = {}
 
-    try:
-
-        # Create state arrays
-        objectsToIndex: Dict[int, ObjectToIndexTuple] = {}
-        objectIdByKey: Dict[str, int] = {}
-        inserts = []
-        propUpdates = []
-        objectTypeUpdates = []
-        chunkKeysForQueue: Set[int] = set()
-
-        # Work out which objects have been updated or need inserting
-        for importObject in newSearchObjects:
-            originalImportObjectKey = importObject.key
-            importObject.key = importObject.key.lower()
-            loweredObjectKey = importObject.key
-
-            existingObject = createdObjectByKey.get(loweredObjectKey)
-            importObjectTypeId = objectTypeIdsByName[importObject.objectType]
-
-            fullKwPropsWithKey = dict(key=originalImportObjectKey)
-            partialKwProps = {}
-
-            if importObject.fullKeywords:
-                if existingObject and existingObject.fullKwPropertiesJson:
-                    fullKwPropsWithKey \
-                        .update(json.loads(existingObject.fullKwPropertiesJson))
-
-                # Add the data we're importing second
-                # Remove null values
+        if importObject.fullKeywords:
+            if existingObject and existingObject.fullKwPropertiesJson:
                 fullKwPropsWithKey \
-                    .update({k: v for k, v in importObject.fullKeywords.items() if v})
+                    .update(json.loads(existingObject.fullKwPropertiesJson))
 
-            if importObject.partialKeywords:
-                if existingObject and existingObject.partialKwPropertiesJson:
-                    partialKwProps \
-                        .update(json.loads(existingObject.partialKwPropertiesJson))
+            # Add the data we're importing second
+            # Remove null values
+            fullKwPropsWithKey \
+                .update({k: v for k, v in importObject.fullKeywords.items() if v})
 
-                # Add the data we're importing second
-                # Remove null values
+        if importObject.partialKeywords:
+            if existingObject and existingObject.partialKwPropertiesJson:
                 partialKwProps \
-                    .update({k: v for k, v in importObject.partialKeywords.items() if v})
-
-            fullKwPropsStr = json.dumps(fullKwPropsWithKey, sort_keys=True)
-            partialKwPropsStr = json.dumps(partialKwProps, sort_keys=True)
+                    .update(json.loads(existingObject.partialKwPropertiesJson))
 
-            # Work out if we need to update the object type
-            if importObject.objectType != 'None' and existingObject:
-                objectTypeUpdates.append(
-                    dict(b_id=existingObject.id, b_typeId=importObjectTypeId)
-                )
+            # Add the data we're importing second
+            # Remove null values
+            partialKwProps \
+                .update({k: v for k, v in importObject.partialKeywords.items() if v})
 
-            # Work out if we need to update the existing object or create one
-            if existingObject:
-                searchIndexUpdateNeeded = \
-                    fullKwPropsStr and existingObject.fullKwPropertiesJson != fullKwPropsStr
+        fullKwPropsStr = json.dumps(fullKwPropsWithKey, sort_keys=True)
+        partialKwPropsStr = json.dumps(partialKwProps, sort_keys=True)
 
-                searchIndexUpdateNeeded = \
-                    searchIndexUpdateNeeded or \
-                    partialKwPropsStr and existingObject.partialKwPropertiesJson != partialKwPropsStr
+        # Work out if we need to update the object type
+        if importObject.objectType != 'None' and existingObject:
+            objectTypeUpdates.append(
+                dict(b_id=existingObject.id, b_typeId=importObjectTypeId,
+                     b_contentHash=contentHash)
+            )
 
-                if searchIndexUpdateNeeded:
-                    propUpdates.append(dict(b_id=existingObject.id,
-                                            b_fullPropsKwStr=fullKwPropsStr,
-                                            b_partialKwPropsStr=partialKwPropsStr))
+        # Work out if we need to update the existing object or create one
+        if existingObject:
+            searchIndexUpdateNeeded = \
+                fullKwPropsStr and existingObject.fullKwPropertiesJson != fullKwPropsStr
 
-            else:
-                searchIndexUpdateNeeded = True
-                id_ = next(newIdGen)
-                existingObject = SearchObject(
-                    id=id_,
-                    key=originalImportObjectKey,
-                    objectTypeId=importObjectTypeId,
-                    fullKwPropertiesJson=fullKwPropsStr,
-                    partialKwPropertiesJson=partialKwPropsStr,
-                    chunkKey=makeSearchObjectChunkKey(id_)
-                )
-                inserts.append(existingObject.tupleToSqlaBulkInsertDict())
-
-                # Add our made up object to the created list, the logic of this loop
-                # will merge and subsequent objects if they contain prop updates, etc
-                createdObjectByKey[loweredObjectKey] = existingObject
+            searchIndexUpdateNeeded = \
+                searchIndexUpdateNeeded or \
+                partialKwPropsStr and existingObject.partialKwPropertiesJson != partialKwPropsStr
 
             if searchIndexUpdateNeeded:
-                objectsToIndex[existingObject.id] = ObjectToIndexTuple(
-                    id=existingObject.id,
-                    fullKwProps=fullKwPropsWithKey,
-                    partialKwProps=partialKwProps
-                )
+                propUpdates.append(dict(b_id=existingObject.id,
+                                        b_fullPropsKwStr=fullKwPropsStr,
+                                        b_partialKwPropsStr=partialKwPropsStr))
 
-            objectIdByKey[loweredObjectKey] = existingObject.id
-            chunkKeysForQueue.add(existingObject.chunkKey)
-
-        # Insert the Search Objects
-        if inserts:
-            conn.execute(searchObjectTable.insert(), inserts)
-
-        if propUpdates:
-            stmt = (
-                searchObjectTable.update()
-                    .where(searchObjectTable.c.id == bindparam('b_id'))
-                    .values(fullKwPropertiesJson=bindparam('b_fullPropsKwStr'),
-                            partialKwPropertiesJson=bindparam('b_partialKwPropsStr'))
+        else:
+            searchIndexUpdateNeeded = True
+            id_ = next(newIdGen)
+            existingObject = SearchObject(
+                id=id_,
+                key=originalImportObjectKey,
+                objectTypeId=importObjectTypeId,
+                fullKwPropertiesJson=fullKwPropsStr,
+                partialKwPropertiesJson=partialKwPropsStr,
+                chunkKey=makeSearchObjectChunkKey(id_, objectBucketCount),
+                contentHash=contentHash
             )
-            conn.execute(stmt, propUpdates)
+            inserts.append(existingObject.tupleToSqlaBulkInsertDict())
 
-        if objectTypeUpdates:
-            stmt = (
-                searchObjectTable.update()
-                    .where(searchObjectTable.c.id == bindparam('b_id'))
-                    .values(objectTypeId=bindparam('b_typeId'))
+            # Add our made up object to the created list, the logic of this loop
+            # will merge and subsequent objects if they contain prop updates, etc
+            createdObjectByKey[loweredObjectKey] = existingObject
+
+        if searchIndexUpdateNeeded:
+            objectsToIndex[existingObject.id] = ObjectToIndexTuple(
+                id=existingObject.id,
+                fullKwProps=fullKwPropsWithKey,
+                partialKwProps=partialKwProps
             )
-            conn.execute(stmt, objectTypeUpdates)
 
-        # Reindex the keywords
-        reindexSearchObject(conn, list(objectsToIndex.values()))
+        objectsToPackById[existingObject.id] = _ObjectToPackTuple(
+            fullKwProps=fullKwPropsWithKey,
+            partialKwProps=partialKwProps,
+            objectTypeId=importObjectTypeId
+        )
 
-        if objectsToIndex or inserts or propUpdates or objectTypeUpdates:
-            transaction.commit()
-        else:
-            transaction.rollback()
+        objectIdByKey[loweredObjectKey] = existingObject.id
+        chunkKeysForQueue.add(existingObject.chunkKey)
 
-        logger.debug("Inserted %s updated %s ObjectToIndexTuple in %s",
-                     len(inserts), len(propUpdates),
-                     (datetime.now(pytz.utc) - startTime))
+    # Insert the Search Objects
+    bulkInsert(conn, searchObjectTable, inserts)
 
-        logger.debug("Passing to index %s SearchIndex", len(objectsToIndex))
+    if propUpdates:
+        stmt = (
+            searchObjectTable.update()
+                .where(searchObjectTable.c.id == bindparam('b_id'))
+                .values(fullKwPropertiesJson=bindparam('b_fullPropsKwStr'),
+                        partialKwPropertiesJson=bindparam('b_partialKwPropsStr'))
+        )
+        conn.execute(stmt, propUpdates)
+
+    if objectTypeUpdates:
+        stmt = (
+            searchObjectTable.update()
+                .where(searchObjectTable.c.id == bindparam('b_id'))
+                .values(objectTypeId=bindparam('b_typeId'),
+                        contentHash=bindparam('b_contentHash'))
+        )
+        conn.execute(stmt, objectTypeUpdates)
 
-        return objectIdByKey, chunkKeysForQueue
+    if contentHashRestores:
+        stmt = (
+            searchObjectTable.update()
+                .where(searchObjectTable.c.id == bindparam('b_id'))
+                .values(contentHash=bindparam('b_contentHash'))
+        )
+        conn.execute(stmt, contentHashRestores)
 
-    except Exception as e:
-        transaction.rollback()
-        raise
+    # Reindex the keywords
+    indexChunkKeysForQueue = reindexSearchObject(conn, list(objectsToIndex.values()),
+                                                 bulkLoad=bulkLoad,
+                                                 bucketCount=indexBucketCount)
 
+    logger.debug("Inserted %s updated %s ObjectToIndexTuple in %s",
+                 len(inserts), len(propUpdates),
+                 (datetime.now(pytz.utc) - startTime))
 
-    finally:
-        conn.close()
+    logger.debug("Passing to index %s SearchIndex", len(objectsToIndex))
 
+    return objectIdByKey, chunkKeysForQueue, indexChunkKeysForQueue, objectsToPackById
 
-def _loadExistingObjects(newSearchObjects, searchObjectTable):
-    engine = CeleryDbConn.getDbEngine()
-    conn = engine.connect()
-    try:
-        objectKeys = set(
-            [o.key for o in newSearchObjects]
-            + [o.key.lower() for o in newSearchObjects]
-        )
 
-        # Query existing objects
-        results = list(conn.execute(select(
-            columns=[searchObjectTable.c.id, searchObjectTable.c.key,
-                     searchObjectTable.c.chunkKey,
-                     searchObjectTable.c.fullKwPropertiesJson,
-                     searchObjectTable.c.partialKwPropertiesJson],
-            whereclause=searchObjectTable.c.key.in_(objectKeys)
-        )))
+def _makeContentHash(objectKey: str, importObject: ImportSearchObjectTuple) -> str:
+    """ Make Content Hash
 
-        createdObjectByKey = {o.key.lower(): o for o in results}
-        del results
-        del objectKeys
+    Hash everything the import sets on an object, so an object that is imported
+    again with the same content can be skipped without loading its stored JSON.
+
+    """
+    routes = sorted([(r.importGroupHash, r.routeTitle, r.routePath)
+                     for r in importObject.routes])
+
+    content = json.dumps([objectKey, importObject.objectType,
+                          importObject.fullKeywords, importObject.partialKeywords,
+                          routes],
+                         sort_keys=True)
+
+    m = hashlib.sha256()
+    m.update(content.encode())
+    return b64encode(m.digest()).decode()
+
+
+def _contentHashMark(streamId: str) -> str:
+    """ Content Hash Mark
+
+    A batch that replaces an import group marks the content hash of the objects in
+    that group it didn't import, they may have lost their route.
+
+    The later batches of the same stream import the rest of the group, they match
+    the marked hash and restore it. The marked hash never matches for any other
+    import, so those objects are updated in full when they are next imported.
+
+    :return: The prefix the marked hashes have
+    """
+    return '%s:' % streamId
+
+
+def _loadExistingObjects(conn, newSearchObjects, searchObjectTable):
+    objectKeys = set(
+        [o.key for o in newSearchObjects]
+        + [o.key.lower() for o in newSearchObjects]
+    )
+
+    # Query existing objects
+    results = list(conn.execute(select(
+        columns=[searchObjectTable.c.id, searchObjectTable.c.key,
+                 searchObjectTable.c.chunkKey,
+                 searchObjectTable.c.fullKwPropertiesJson,
+                 searchObjectTable.c.partialKwPropertiesJson,
+                 searchObjectTable.c.contentHash],
+        whereclause=searchObjectTable.c.key.in_(objectKeys)
+    )))
+
+    createdObjectByKey = {o.key.lower(): o for o in results}
+    del results
+    del objectKeys
 
-    finally:
-        conn.close()
     # Get the IDs that we need
     newSearchObjectUniqueCount = len(set([o.key.lower() for o in newSearchObjects]))
     newIdGen = CeleryDbConn.prefetchDeclarativeIds(
         SearchObject, newSearchObjectUniqueCount - len(createdObjectByKey)
     )
     del newSearchObjectUniqueCount
-    return createdObjectByKey, engine, newIdGen
+    return createdObjectByKey, newIdGen
 
 
-def _insertObjectRoutes(newSearchObjects: List[ImportSearchObjectTuple],
-                        objectIdByKey: Dict[str, int]):
+def _insertObjectRoutes(conn, newSearchObjects: List[ImportSearchObjectTuple],
+                        objectIdByKey: Dict[str, int],
+                        appendImportGroupHashes: List[str] = None,
+                        streamId: Optional[str] = None
+                        ) -> Dict[int, List[List[str]]]:
     """ Insert Object Routes
 
-    1) Drop all routes with matching importGroupHash
+    1) Drop all routes with matching importGroupHash,
+        or only the routes of these objects for the appended import groups
 
     2) Insert the new routes
 
     :param newSearchObjects:
     :param objectIdByKey:
-    :return:
+    :param appendImportGroupHashes:
+    :param streamId: The id of the streamed import, see _contentHashMark
+    :return: The [routeTitle, routePath] of every object in this import, after the
+        routes have been updated
     """
 
     searchObjectRoute = SearchObjectRoute.__table__
+    searchObjectTable = SearchObject.__table__
 
     startTime = datetime.now(pytz.utc)
 
-    engine = CeleryDbConn.getDbEngine()
-    conn = engine.connect()
-    transaction = conn.begin()
-
-    try:
-        importHashSet = set()
-        inserts = []
-        objectIdSet = set()
-
-        # Make some lists to work out the existing routes
-        for importObject in newSearchObjects:
-            for impRoute in importObject.routes:
-                importHashSet.add(impRoute.importGroupHash)
-                objectIdSet.add(objectIdByKey[importObject.key])
-
-        # Query for existing routes
-        results = list(conn.execute(select(
-            columns=[searchObjectRoute.c.objectId,
-                     searchObjectRoute.c.routeTitle,
-                     searchObjectRoute.c.importGroupHash],
-            whereclause=and_(searchObjectRoute.c.objectId.in_(objectIdSet),
-                             ~searchObjectRoute.c.importGroupHash.in_(importHashSet))
-        )))
-
-        existingRoutes = {'%s.%s' % (o.objectId, o.routeTitle): dict(o) for o in results}
-        newRoutes = {}
-        del results
-
-        # Now create the inserts
-        for importObject in newSearchObjects:
-            for impRoute in importObject.routes:
-                objectId = objectIdByKey[importObject.key]
-                routeInsert = dict(
-                    objectId=objectId,
-                    importGroupHash=impRoute.importGroupHash,
-                    routeTitle=impRoute.routeTitle,
-                    routePath=impRoute.routePath
-                )
-
-                uniqueRouteStr = '%s.%s' % (objectId, impRoute.routeTitle)
-
-                if uniqueRouteStr in existingRoutes:
-                    logger.debug("A duplicate route exists in another"
-                                 " import group\n%s\n%s",
-                                 existingRoutes[uniqueRouteStr], routeInsert)
-
-                elif uniqueRouteStr in newRoutes:
-                    logger.debug("Duplicate route titles defined in this"
-                                 " import group\n%s\n%s",
-                                 newRoutes[uniqueRouteStr], routeInsert)
-
-                else:
-                    inserts.append(routeInsert)
-                    newRoutes[uniqueRouteStr] = routeInsert
-
-        if importHashSet:
-            conn.execute(
-                searchObjectRoute
-                    .delete(searchObjectRoute.c.importGroupHash.in_(importHashSet))
+    importHashSet = set()
+    inserts = []
+
+    # Make some lists to work out the existing routes
+    for importObject in newSearchObjects:
+        for impRoute in importObject.routes:
+            importHashSet.add(impRoute.importGroupHash)
+
+    # Query for the existing routes that this import will keep
+    results = list(conn.execute(select(
+        columns=[searchObjectRoute.c.objectId,
+                 searchObjectRoute.c.routeTitle,
+                 searchObjectRoute.c.routePath,
+                 searchObjectRoute.c.importGroupHash],
+        whereclause=and_(searchObjectRoute.c.objectId.in_(objectIdByKey.values()),
+                         ~searchObjectRoute.c.importGroupHash.in_(importHashSet))
+    )))
+
+    existingRoutes = {'%s.%s' % (o.objectId, o.routeTitle): dict(o) for o in results}
+    newRoutes = {}
+    del results
+
+    # Now create the inserts
+    for importObject in newSearchObjects:
+        for impRoute in importObject.routes:
+            objectId = objectIdByKey[importObject.key]
+            routeInsert = dict(
+                objectId=objectId,
+                importGroupHash=impRoute.importGroupHash,
+                routeTitle=impRoute.routeTitle,
+                routePath=impRoute.routePath
             )
 
-        # Insert the Search Object routes
-        if inserts:
-            conn.execute(searchObjectRoute.insert(), inserts)
+            uniqueRouteStr = '%s.%s' % (objectId, impRoute.routeTitle)
 
-        if importHashSet or inserts:
-            transaction.commit()
+            if uniqueRouteStr in existingRoutes:
+                logger.debug("A duplicate route exists in another"
+                             " import group\n%s\n%s",
+                             existingRoutes[uniqueRouteStr], routeInsert)
+
+            elif uniqueRouteStr in newRoutes:
+                logger.debug("Duplicate route titles defined in this"
+                             " import group\n%s\n%s",
+                             newRoutes[uniqueRouteStr], routeInsert)
+
+            else:
+                inserts.append(routeInsert)
+                newRoutes[uniqueRouteStr] = routeInsert
+
+    appendHashSet = importHashSet & set(appendImportGroupHashes or [])
+    replaceHashSet = importHashSet - appendHashSet
+
+    if replaceHashSet:
+        # The objects that are not in this import lose their routes for these
+        # groups, so they must not match their content hash again.
+        if streamId is None:
+            lostContentHash = None
         else:
-            transaction.rollback()
+            lostContentHash = literal(_contentHashMark(streamId)) \
+                              + searchObjectTable.c.contentHash
+
+        conn.execute(
+            searchObjectTable.update()
+                .where(and_(
+                    searchObjectTable.c.id.in_(select(
+                        columns=[searchObjectRoute.c.objectId],
+                        whereclause=searchObjectRoute.c.importGroupHash
+                            .in_(replaceHashSet)
+                    )),
+                    ~searchObjectTable.c.id.in_(objectIdByKey.values())
+                ))
+                .values(contentHash=lostContentHash)
+        )
 
-        logger.debug("Inserted %s SearchObjectRoute in %s",
-                     len(inserts),
-                     (datetime.now(pytz.utc) - startTime))
+        conn.execute(
+            searchObjectRoute
+                .delete(searchObjectRoute.c.importGroupHash.in_(replaceHashSet))
+        )
 
-    except Exception as e:
-        transaction.rollback()
-        raise
+    if appendHashSet:
+        conn.execute(
+            searchObjectRoute
+                .delete(and_(searchObjectRoute.c.importGroupHash.in_(appendHashSet),
+                             searchObjectRoute.c.objectId.in_(objectIdByKey.values())))
+        )
 
+    # Insert the Search Object routes
+    if inserts:
+        conn.execute(searchObjectRoute.insert(), inserts)
 
-    finally:
-        conn.close()
+    routesByObjectId = defaultdict(list)
+    for route in list(existingRoutes.values()) + inserts:
+        routesByObjectId[route['objectId']].append(
+            [route['routeTitle'], route['routePath']]
+        )
+
+    logger.debug("Inserted %s SearchObjectRoute in %s",
+                 len(inserts),
+                 (datetime.now(pytz.utc) - startTime))
 
+    return routesByObjectId
 
-def _packObjectJson(updatedIds: List[int],
-                    chunkKeysForQueue: Set[int]):
+
+def _packObjectJson(conn, objectsToPackById: Dict[int, _ObjectToPackTuple],
+                    routesByObjectId: Dict[int, List[List[str]]]):
     """ Pack Object Json
 
     1) Create JSON and update object.
 
+    The JSON is created from the data already in hand, rather than requerying the
+    objects and routes that this import has just written.
+
     Doing this takes longer to bulk load, but quicker to make incremental changes
 
-    :param updatedIds:
-    :param chunkKeysForQueue:
+    :param objectsToPackById:
+    :param routesByObjectId:
     :return:
     """
 
     searchObjectTable = SearchObject.__table__
-    objectQueueTable = SearchObjectCompilerQueue.__table__
-    dbSession = CeleryDbConn.getDbSession()
 
     startTime = datetime.now(pytz.utc)
 
-    try:
-
-        indexQry = (
-            dbSession.query(SearchObject.id,
-                            SearchObject.fullKwPropertiesJson,
-                            SearchObject.partialKwPropertiesJson,
-                            SearchObject.objectTypeId,
-                            SearchObjectRoute.routeTitle, SearchObjectRoute.routePath)
-                .outerjoin(SearchObjectRoute,
-                           SearchObject.id == SearchObjectRoute.objectId)
-                .filter(SearchObject.id.in_(updatedIds))
-                .filter(or_(SearchObject.fullKwPropertiesJson != None,
-                            SearchObject.partialKwPropertiesJson != None))
-                .order_by(SearchObject.id, SearchObjectRoute.routeTitle)
-                .yield_per(1000)
-                .all()
+    packedJsonUpdates = []
+
+    for id_, objectToPack in objectsToPackById.items():
+        props = dict(objectToPack.fullKwProps)
+        props.update(objectToPack.partialKwProps)
+        props['_r_'] = sorted(routesByObjectId.get(id_, []))
+        props['_otid_'] = objectToPack.objectTypeId
+        packedJson = json.dumps(props, sort_keys=True)
+        packedJsonUpdates.append(dict(b_id=id_, b_packedJson=packedJson))
+
+    if packedJsonUpdates:
+        stmt = (
+            searchObjectTable.update()
+                .where(searchObjectTable.c.id == bindparam('b_id'))
+                .values(packedJson=bindparam('b_packedJson'))
         )
+        conn.execute(stmt, packedJsonUpdates)
 
-        # I chose a simple name for this one.
-        qryDict = defaultdict(list)
-
-        for item in indexQry:
-            (
-                qryDict[(item.id,
-                         item.fullKwPropertiesJson, item.partialKwPropertiesJson,
-                         item.objectTypeId)]
-                    .append([item.routeTitle, item.routePath])
-            )
-
-        packedJsonUpdates = []
-
-        # Sort each bucket by the key
-        for (id_, fullKwPropJson, partialKwPropJson, objectTypeId), routes in qryDict.items():
-            props = json.loads(fullKwPropJson)
-            props.update(json.loads(partialKwPropJson))
-            props['_r_'] = routes
-            props['_otid_'] = objectTypeId
-            packedJson = json.dumps(props, sort_keys=True)
-            packedJsonUpdates.append(dict(b_id=id_, b_packedJson=packedJson))
-
-        if packedJsonUpdates:
-            stmt = (
-                searchObjectTable.update()
-                    .where(searchObjectTable.c.id == bindparam('b_id'))
-                    .values(packedJson=bindparam('b_packedJson'))
-            )
-            dbSession.execute(stmt, packedJsonUpdates)
-
-        if chunkKeysForQueue:
-            dbSession.execute(
-                objectQueueTable.insert(),
-                [dict(chunkKey=v) for v in chunkKeysForQueue]
-            )
-
-        if packedJsonUpdates or chunkKeysForQueue:
-            dbSession.commit()
-        else:
-            dbSession.rollback()
-
-        logger.debug("Packed JSON for %s SearchObjects in %s",
-                     len(updatedIds),
-                     (datetime.now(pytz.utc) - startTime))
-
-    except Exception as e:
-        dbSession.rollback()
-        raise
-
-
-    finally:
-        dbSession.close()
+    logger.debug("Packed JSON for %s SearchObjects in %s",
+                 len(objectsToPackById),
+                 (datetime.now(pytz.utc) - startTime))
@@ -0,0 +1,73 @@
+from collections import namedtuple
+
+from twisted.trial import unittest
+
+from peek_core_search._private.worker.tasks import ImportSearchObjectTask as taskModule
+from peek_core_search._private.worker.tasks.ImportSearchObjectTask import \
+    _insertOrUpdateObjects, _makeContentHash, _contentHashMark
+from peek_core_search.tuples.ImportSearchObjectRouteTuple import \
+    ImportSearchObjectRouteTuple
+from peek_core_search.tuples.ImportSearchObjectTuple import ImportSearchObjectTuple
+
+_ExistingObject = namedtuple("_ExistingObject",
+                             ["id", "key", "chunkKey", "fullKwPropertiesJson",
+                              "partialKwPropertiesJson", "contentHash"])
+
+
+class _Conn:
+    def __init__(self):
+        self.executed = []
+
+    def execute(self, stmt, params=None):
+        self.executed.append(params)
+
+
+class ImportSearchObjectTaskTest(unittest.TestCase):
+    def setUp(self):
+        self.indexed = []
+        self.patch(taskModule, "bulkInsert", lambda conn, table, inserts: None)
+        self.patch(taskModule, "reindexSearchObject", self._reindexSearchObject)
+
+    def _reindexSearchObject(self, conn, objectsToIndex, **kwargs):
+        self.indexed.extend(o.id for o in objectsToIndex)
+        return set()
+
+    def _importObject(self, key):
+        return ImportSearchObjectTuple(
+            key=key, objectType="thing", fullKeywords={"name": key},
+            routes=[ImportSearchObjectRouteTuple(importGroupHash="g1",
+                                                 routeTitle="t", routePath=key)]
+        )
+
+    def _import(self, contentHash, streamId):
+        importObject = self._importObject("a")
+        existing = _ExistingObject(1, "a", 5, None, None, contentHash)
+        self.patch(taskModule, "_loadExistingObjects",
+                   lambda *args: ({"a": existing}, iter([])))
+
+        conn = _Conn()
+        objectIdByKey, objectChunkKeys, _, objectsToPackById = \
+            _insertOrUpdateObjects(conn, [importObject], {"thing": 1},
+                                   streamId=streamId)
+
+        self.assertEqual({"a": 1}, objectIdByKey)
+        return conn, objectChunkKeys
+
+    def testSecondBatchSkipsMarkedObject(self):
+        contentHash = _makeContentHash("a", self._importObject("a"))
+
+        # The first batch of stream "s1" marked the hash, the second batch skips
+        # the object, and restores the hash.
+        conn, objectChunkKeys = self._import(_contentHashMark("s1") + contentHash,
+                                             "s1")
+        self.assertEqual(set(), objectChunkKeys)
+        self.assertEqual([], self.indexed)
+        self.assertIn([dict(b_id=1, b_contentHash=contentHash)], conn.executed)
+
+    def testOtherImportUpdatesMarkedObject(self):
+        contentHash = _makeContentHash("a", self._importObject("a"))
+
+        conn, objectChunkKeys = self._import(_contentHashMark("s1") + contentHash,
+                                             "s2")
+        self.assertEqual({5}, objectChunkKeys)
+        self.assertEqual([1], self.indexed)
@@ -0,0 +1,375 @@
+import hashlib
+import logging
+from base64 import b64encode
+from datetime import datetime
+from collections import defaultdict
+from typing import Callable, Iterator, List, Optional, Tuple
+
+import pytz
+from sqlalchemy import select, and_, or_, literal, null, Table
+from sqlalchemy.sql import ColumnElement
+from txcelery.defer import DeferrableTask
+
+from peek_core_search._private.storage.EncodedSearchIndexChunk import \
+    EncodedSearchIndexChunk
+from peek_core_search._private.storage.EncodedSearchIndexChunkStaging import \
+    EncodedSearchIndexChunkStaging
+from peek_core_search._private.storage.EncodedSearchObjectChunk import \
+    EncodedSearchObjectChunk
+from peek_core_search._private.storage.EncodedSearchObjectChunkStaging import \
+    EncodedSearchObjectChunkStaging
+from peek_core_search._private.storage.SearchChunkFormatTuple import \
+    SearchChunkFormatTuple
+from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexChunkVersion import \
+    SearchIndexChunkVersion
+from peek_core_search._private.storage.SearchIndexCompilerDelta import \
+    SearchIndexCompilerDelta
+from peek_core_search._private.storage.SearchIndexCompilerQueue import \
+    SearchIndexCompilerQueue
+from peek_core_search._private.storage.SearchObject import SearchObject
+from peek_core_search._private.storage.SearchObjectChunkVersion import \
+    SearchObjectChunkVersion
+from peek_core_search._private.storage.SearchObjectCompilerQueue import \
+    SearchObjectCompilerQueue
+from peek_core_search._private.worker.tasks import SearchIndexChunkCompilerTask, \
+    SearchObjectChunkCompilerTask
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    rekeyTargetChunkKeys
+from peek_core_search._private.worker.tasks._ChunkFormat import ChunkRekey, \
+    loadBucketCounts, searchIndexChunkKeyExpr, searchObjectChunkKeyExpr, \
+    searchIndexSplitChunkKeyBucketExpr
+from peek_core_search._private.worker.tasks._QueueChunks import queueChunkKeys
+from peek_core_search._private.worker.tasks._SourceFingerprint import \
+    bumpSourceVersions
+from peek_core_search._private.worker.tasks._UpsertEncodedChunks import \
+    upsertEncodedChunksFromSelect
+from peek_plugin_base.worker import CeleryDbConn
+from peek_plugin_base.worker.CeleryApp import celeryApp
+
+logger = logging.getLogger(__name__)
+
+#: The number of encoded chunks inserted into the staging table at a time
+STAGING_INSERT_SIZE = 50
+
+""" Rebuild Search Chunks
+
+A full rebuild of every encoded chunk runs in two steps
+
+1) The chunk key range is split up, each range is compiled by a worker into the
+    staging tables.
+2) The staging tables are switched in to the encoded chunk tables in one
+    transaction.
+
+A re-key is a rebuild with new bucket counts. The staging chunks are compiled with
+the chunk keys the rows will have, computed in SQL, while the clients still load
+the old chunks. The rows, the compiler queues and the bucket counts are then
+re-keyed in the switch transaction.
+
+"""
+
+
+@DeferrableTask
+@celeryApp.task(bind=True)
+def rebuildSearchIndexChunksTask(self, chunkKeyStart: int, chunkKeyEnd: int,
+                                 bucketCount: Optional[int] = None
+                                 ) -> Tuple[int, int]:
+    """ Rebuild Search Index Chunks Task
+
+    :param self: A celery reference to this task
+    :param chunkKeyStart: The first chunk key to rebuild
+    :param chunkKeyEnd: The chunk key to stop before
+    :param bucketCount: The bucket count to re-key the chunks with, None to keep
+        the current bucket count
+    :returns: A tuple of (the number of chunks compiled, the number of bytes)
+    """
+    try:
+        return _rebuildChunks(EncodedSearchIndexChunkStaging.__table__,
+                              SearchIndexChunkCompilerTask._buildIndex,
+                              chunkKeyStart, chunkKeyEnd,
+                              bucketCount, 0)
+
+    except Exception as e:
+        logger.exception(e)
+        raise self.retry(exc=e, countdown=3)
+
+
+@DeferrableTask
+@celeryApp.task(bind=True)
+def rebuildSearchObjectChunksTask(self, chunkKeyStart: int, chunkKeyEnd: int,
+                                  bucketCount: Optional[int] = None
+                                  ) -> Tuple[int, int]:
+    """ Rebuild Search Object Chunks Task
+
+    :param self: A celery reference to this task
+    :param chunkKeyStart: The first chunk key to rebuild
+    :param chunkKeyEnd: The chunk key to stop before
+    :param bucketCount: The bucket count to re-key the chunks with, None to keep
+        the current bucket count
+    :returns: A tuple of (the number of chunks compiled, the number of bytes)
+    """
+    try:
+        return _rebuildChunks(EncodedSearchObjectChunkStaging.__table__,
+                              SearchObjectChunkCompilerTask._buildIndex,
+                              chunkKeyStart, chunkKeyEnd,
+                              bucketCount, 1)
+
+    except Exception as e:
+        logger.exception(e)
+        raise self.retry(exc=e, countdown=3)
+
+
+@DeferrableTask
+@celeryApp.task(bind=True)
+def switchToRebuiltSearchChunksTask(self, indexBucketCount: Optional[int] = None,
+                                    objectBucketCount: Optional[int] = None
+                                    ) -> List[List[int]]:
+    """ Switch To Rebuilt Search Chunks Task
+
+    Replace the encoded chunks that differ from the rebuilt chunks, and delete the
+    encoded chunks that weren't rebuilt, all in one transaction. The clients never
+    see a mix of old and new chunks.
+
+    :param self: A celery reference to this task
+    :param indexBucketCount: The index bucket count the chunks were rebuilt with,
+        None if they kept the current bucket count
+    :param objectBucketCount: The object bucket count the chunks were rebuilt with,
+        None if they kept the current bucket count
+    :returns: A list of [the changed index chunk keys, the changed object chunk keys]
+    """
+    lastUpdate = datetime.now(pytz.utc).isoformat()
+
+    startTime = datetime.now(pytz.utc)
+
+    engine = CeleryDbConn.getDbEngine()
+    conn = engine.connect()
+    transaction = conn.begin()
+    try:
+        # Wait for the importers to commit, and block new ones, while the rows are
+        # re-keyed
+        formatTable = SearchChunkFormatTuple.__table__
+        conn.execute(select([formatTable.c.id]).with_for_update())
+
+        currentIndexBucketCount, currentObjectBucketCount = loadBucketCounts(conn)
+        indexBucketCount = indexBucketCount or currentIndexBucketCount
+        objectBucketCount = objectBucketCount or currentObjectBucketCount
+
+        indexTable = SearchIndex.__table__
+        _rekeyRows(conn, indexTable, SearchIndexCompilerQueue.__table__,
+                   SearchIndexChunkVersion.__table__,
+                   searchIndexChunkKeyExpr(indexTable.c.keyword, indexBucketCount),
+                   ChunkRekey(currentIndexBucketCount, indexBucketCount))
+
+        objectTable = SearchObject.__table__
+        _rekeyRows(conn, objectTable, SearchObjectCompilerQueue.__table__,
+                   SearchObjectChunkVersion.__table__,
+                   searchObjectChunkKeyExpr(objectTable.c.id, objectBucketCount),
+                   ChunkRekey(currentObjectBucketCount, objectBucketCount))
+
+        if indexBucketCount != currentIndexBucketCount:
+            # The deltas are for the old chunks, the chunks they changed were
+            # queued with them, and are rebuilt from the re-keyed queue.
+            conn.execute(SearchIndexCompilerDelta.__table__.delete())
+
+        conn.execute(formatTable.update().values(indexBucketCount=indexBucketCount,
+                                                 objectBucketCount=objectBucketCount))
+
+        indexChunkKeys = _switchChunks(conn,
+                                       EncodedSearchIndexChunkStaging.__table__,
+                                       EncodedSearchIndexChunk.__table__,
+                                       lastUpdate)
+
+        objectChunkKeys = _switchChunks(conn,
+                                        EncodedSearchObjectChunkStaging.__table__,
+                                        EncodedSearchObjectChunk.__table__,
+                                        lastUpdate)
+
+        transaction.commit()
+        logger.info("Switched to the rebuilt chunks, %s index and %s object chunks"
+                    " changed, in %s",
+                    len(indexChunkKeys), len(objectChunkKeys),
+                    (datetime.now(pytz.utc) - startTime))
+
+        return [indexChunkKeys, objectChunkKeys]
+
+    except Exception as e:
+        transaction.rollback()
+        logger.exception(e)
+        raise self.retry(exc=e, countdown=3)
+
+    finally:
+        conn.close()
+
+
+def _rebuildChunks(stagingTable: Table,
+                   buildIndex: Callable[..., Iterator[Tuple[int, bytes]]],
+                   chunkKeyStart: int, chunkKeyEnd: int,
+                   bucketCount: Optional[int], bucketCountIndex: int
+                   ) -> Tuple[int, int]:
+    """ Rebuild Chunks
+
+    Compile a range of chunks into the staging table. The compilers stream their
+    rows, and the encoded chunks are inserted STAGING_INSERT_SIZE at a time, so the
+    memory used doesn't depend on the size of the range.
+
+    :param bucketCount: The bucket count to re-key with, or None
+    :param bucketCountIndex: The index of the bucket count in loadBucketCounts
+    """
+    chunkKeys = list(range(chunkKeyStart, chunkKeyEnd))
+
+    startTime = datetime.now(pytz.utc)
+
+    engine = CeleryDbConn.getDbEngine()
+    conn = engine.connect()
+    transaction = conn.begin()
+    try:
+        currentBucketCount = loadBucketCounts(conn)[bucketCountIndex]
+
+        rekey = None
+        if bucketCount:
+            rekey = ChunkRekey(currentBucketCount, bucketCount)
+
+        # Clear out anything left from a failed attempt, including the negative
+        # sub bucket chunk keys of split index chunks
+        chunkKeyColumn = stagingTable.c.chunkKey
+        splitBucketExpr = searchIndexSplitChunkKeyBucketExpr(
+            chunkKeyColumn, bucketCount or currentBucketCount
+        )
+        conn.execute(stagingTable.delete(or_(
+            and_(chunkKeyColumn >= chunkKeyStart,
+                 chunkKeyColumn < chunkKeyEnd),
+            and_(chunkKeyColumn < 0,
+                 splitBucketExpr >= chunkKeyStart,
+                 splitBucketExpr < chunkKeyEnd)
+        )))
+
+        chunkCount = 0
+        byteCount = 0
+        inserts = []
+
+        for chunkKey, encodedData in buildIndex(conn, chunkKeys, rekey=rekey):
+            m = hashlib.sha256()
+            m.update(encodedData)
+
+            inserts.append(dict(chunkKey=chunkKey,
+                                encodedData=encodedData,
+                                encodedHash=b64encode(m.digest()).decode()))
+
+            chunkCount += 1
+            byteCount += len(encodedData)
+
+            if len(inserts) == STAGING_INSERT_SIZE:
+                conn.execute(stagingTable.insert(), inserts)
+                inserts = []
+
+        if inserts:
+            conn.execute(stagingTable.insert(), inserts)
+
+        transaction.commit()
+        logger.debug("Rebuilt %s %s chunks from %s to %s, in %s",
+                     chunkCount, stagingTable.name, chunkKeyStart, chunkKeyEnd,
+                     (datetime.now(pytz.utc) - startTime))
+
+        return chunkCount, byteCount
+
+    except Exception:
+        transaction.rollback()
+        raise
+
+    finally:
+        conn.close()
+
+
+def _rekeyRows(conn, table: Table, queueTable: Table, versionTable: Table,
+               chunkKeyExpr: ColumnElement, rekey: ChunkRekey) -> None:
+    """ Re-key Rows
+
+    Update the chunk keys of the SearchIndex or SearchObject rows in one statement,
+    and move the queued chunks to the chunks their rows are re-keyed to.
+
+    The queued chunks may have changed since they were rebuilt, the source versions
+    of the chunks they are moved to are bumped, so the compiler doesn't skip them.
+
+    :param chunkKeyExpr: The SQL expression of the new chunk key of a row
+    """
+    if rekey.fromBucketCount == rekey.toBucketCount:
+        return
+
+    startTime = datetime.now(pytz.utc)
+
+    result = conn.execute(
+        table.update()
+            .where(table.c.chunkKey != chunkKeyExpr)
+            .values(chunkKey=chunkKeyExpr)
+    )
+
+    chunkKeysByPriority = defaultdict(list)
+    for chunkKey, priority in conn.execute(
+            select([queueTable.c.chunkKey, queueTable.c.priority])):
+        chunkKeysByPriority[priority].append(chunkKey)
+
+    conn.execute(queueTable.delete())
+
+    targetChunkKeysByPriority = {
+        priority: rekeyTargetChunkKeys(chunkKeys, rekey.fromBucketCount,
+                                       rekey.toBucketCount)
+        for priority, chunkKeys in chunkKeysByPriority.items()
+    }
+
+    bumpSourceVersions(conn, versionTable,
+                       [chunkKey
+                        for chunkKeys in targetChunkKeysByPriority.values()
+                        for chunkKey in chunkKeys])
+
+    for priority, chunkKeys in sorted(targetChunkKeysByPriority.items()):
+        queueChunkKeys(conn, queueTable, chunkKeys, priority)
+
+    logger.info("Re-keyed %s %s rows from %s to %s buckets, in %s",
+                result.rowcount, table.name, rekey.fromBucketCount,
+                rekey.toBucketCount, (datetime.now(pytz.utc) - startTime))
+
+
+def _switchChunks(conn, stagingTable: Table, compiledTable: Table,
+                  lastUpdate: str) -> List[int]:
+    """ Switch Chunks
+
+    The source fingerprints of the changed chunks are cleared, the compiler
+    fingerprints them again the next time they're compiled.
+
+    :return: The chunk keys that were changed or deleted
+    """
+    # The staged chunks that are new or differ from the encoded chunks
+    results = conn.execute(select(
+        columns=[stagingTable.c.chunkKey],
+        from_obj=[stagingTable.outerjoin(
+            compiledTable, compiledTable.c.chunkKey == stagingTable.c.chunkKey
+        )],
+        whereclause=or_(compiledTable.c.chunkKey == None,
+                        compiledTable.c.encodedHash != stagingTable.c.encodedHash)
+    ))
+    updatedChunkKeys = sorted([r.chunkKey for r in results])
+
+    # The encoded chunks that are now empty
+    results = conn.execute(select(
+        columns=[compiledTable.c.chunkKey],
+        whereclause=~compiledTable.c.chunkKey.in_(select([stagingTable.c.chunkKey]))
+    ))
+    deletedChunkKeys = sorted([r.chunkKey for r in results])
+
+    if deletedChunkKeys:
+        conn.execute(compiledTable.delete(
+            compiledTable.c.chunkKey.in_(deletedChunkKeys)
+        ))
+
+    if updatedChunkKeys:
+        upsertEncodedChunksFromSelect(
+            conn, compiledTable,
+            select(columns=[stagingTable.c.chunkKey, stagingTable.c.encodedData,
+                            stagingTable.c.encodedHash, literal(lastUpdate),
+                            null()],
+                   whereclause=stagingTable.c.chunkKey.in_(updatedChunkKeys))
+        )
+
+    conn.execute(stagingTable.delete())
+
+    return sorted(updatedChunkKeys + deletedChunkKeys)
@@ -0,0 +1,242 @@
+""" Search Index Chunk Codec
+
+This module encodes and decodes the binary format of the EncodedSearchIndexChunk.
+
+The original format was a vortex Payload of [keyword, propertyName, objectIdsJson]
+rows. Object IDs as decimal JSON text are large and slow to decode, so the
+binary format stores them as delta encoded varints.
+
+Format V1 layout ::
+
+    byte        FORMAT_BINARY_V1
+    varint      property name count
+                    string (varint length, utf-8 bytes) per property name
+    varint      keyword count
+                    string      keyword, sorted
+                    varint      posting count
+                        varint      property name index
+                        varint      object id count
+                        varint      first object id, then deltas to the next id
+
+Chunks larger than the keyword chunk byte budget are split by keyword into sub
+bucket chunks, the chunk is then replaced with a split chunk.
+
+Format Split layout ::
+
+    byte        FORMAT_SPLIT
+    varint      sub bucket count, the sub bucket chunks are keyed by
+                    makeSearchIndexSplitChunkKey in _CalcChunkKey.py
+
+This MUST MATCH plugin-module/_private/search-index-loader/SearchIndexChunkDecoder.ts
+
+"""
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+SEARCH_INDEX_CHUNK_FORMAT_V1 = 0x01
+SEARCH_INDEX_CHUNK_FORMAT_SPLIT = 0x02
+
+
+def isBinarySearchIndexChunk(encodedData: bytes) -> bool:
+    """ Is Binary Search Index Chunk
+
+    Legacy chunks are vortex encoded payloads, they start with an ascii character.
+
+    """
+    return bool(encodedData) and encodedData[0] == SEARCH_INDEX_CHUNK_FORMAT_V1
+
+
+def encodeSearchIndexSplitChunk(subBucketCount: int) -> bytes:
+    """ Encode Search Index Split Chunk
+
+    :param subBucketCount: The number of sub buckets the chunk was split into
+    :return: The binary encoded split chunk
+    """
+    out = bytearray([SEARCH_INDEX_CHUNK_FORMAT_SPLIT])
+    writeVarint(out, subBucketCount)
+    return bytes(out)
+
+
+def searchIndexSplitChunkSubBucketCount(encodedData: bytes) -> Optional[int]:
+    """ Search Index Split Chunk Sub Bucket Count
+
+    :return: The number of sub buckets if this is a split chunk, otherwise None
+    """
+    if not encodedData or encodedData[0] != SEARCH_INDEX_CHUNK_FORMAT_SPLIT:
+        return None
+
+    subBucketCount, _ = readVarint(memoryview(encodedData), 1)
+    return subBucketCount
+
+
+def encodeSearchIndexChunk(
+        objectIdsByPropByKeyword: Dict[str, Dict[str, Iterable[int]]]) -> bytes:
+    """ Encode Search Index Chunk
+
+    :param objectIdsByPropByKeyword: keyword -> propertyName -> [objectId, ...]
+    :return: The binary encoded chunk
+    """
+    propertyNames = set()
+    for objectIdsByProp in objectIdsByPropByKeyword.values():
+        propertyNames.update(objectIdsByProp)
+
+    propertyNames = sorted(propertyNames)
+    propertyIndexByName = {name: index for index, name in enumerate(propertyNames)}
+
+    out = bytearray([SEARCH_INDEX_CHUNK_FORMAT_V1])
+
+    writeVarint(out, len(propertyNames))
+    for propertyName in propertyNames:
+        writeString(out, propertyName)
+
+    writeVarint(out, len(objectIdsByPropByKeyword))
+    for keyword in sorted(objectIdsByPropByKeyword):
+        objectIdsByProp = objectIdsByPropByKeyword[keyword]
+
+        writeString(out, keyword)
+        writeVarint(out, len(objectIdsByProp))
+
+        for propertyName in sorted(objectIdsByProp):
+            objectIds = sorted(set(objectIdsByProp[propertyName]))
+
+            writeVarint(out, propertyIndexByName[propertyName])
+            writeVarint(out, len(objectIds))
+
+            lastObjectId = 0
+            for objectId in objectIds:
+                writeVarint(out, objectId - lastObjectId)
+                lastObjectId = objectId
+
+    return bytes(out)
+
+
+def iterSearchIndexChunk(encodedData: bytes) -> Iterator[Tuple[str, str, List[int]]]:
+    """ Iterate Search Index Chunk
+
+    Decode a binary chunk, yielding (keyword, propertyName, objectIds) in
+    keyword order.
+
+    """
+    if not isBinarySearchIndexChunk(encodedData):
+        raise ValueError("Encoded data is not a binary search index chunk")
+
+    data = memoryview(encodedData)
+    offset = 1
+
+    propertyCount, offset = readVarint(data, offset)
+    propertyNames = []
+    for _ in range(propertyCount):
+        propertyName, offset = readString(data, offset)
+        propertyNames.append(propertyName)
+
+    keywordCount, offset = readVarint(data, offset)
+    for _ in range(keywordCount):
+        keyword, offset = readString(data, offset)
+        postingCount, offset = readVarint(data, offset)
+
+        for _ in range(postingCount):
+            propertyIndex, offset = readVarint(data, offset)
+            idCount, offset = readVarint(data, offset)
+
+            objectIds = []
+            objectId = 0
+            for _ in range(idCount):
+                delta, offset = readVarint(data, offset)
+                objectId += delta
+                objectIds.append(objectId)
+
+            yield keyword, propertyNames[propertyIndex], objectIds
+
+
+def decodeSearchIndexChunk(encodedData: bytes) -> Dict[str, Dict[str, List[int]]]:
+    """ Decode Search Index Chunk
+
+    :return: keyword -> propertyName -> [objectId, ...], the reverse of
+        encodeSearchIndexChunk
+    """
+    objectIdsByPropByKeyword: Dict[str, Dict[str, List[int]]] = {}
+    for keyword, propertyName, objectIds in iterSearchIndexChunk(encodedData):
+        objectIdsByPropByKeyword.setdefault(keyword, {})[propertyName] = objectIds
+
+    return objectIdsByPropByKeyword
+
+
+def patchSearchIndexChunk(encodedData: bytes,
+                          deltas: Iterable[Tuple[str, str, int, bool]]
+                          ) -> Tuple[Optional[bytes], int]:
+    """ Patch Search Index Chunk
+
+    Apply SearchIndexCompilerDelta rows to an existing binary chunk.
+
+    :param encodedData: The existing binary chunk
+    :param deltas: (keyword, propertyName, objectId, isAdd), in the order they
+        were logged
+    :return: A tuple of (the new binary chunk or None if the chunk is now empty,
+        the number of object ids in the chunk)
+    """
+    objectIdsByPropByKeyword: Dict[str, Dict[str, Set[int]]] = {}
+    for keyword, propertyName, objectIds in iterSearchIndexChunk(encodedData):
+        objectIdsByPropByKeyword.setdefault(keyword, {})[propertyName] = set(objectIds)
+
+    for keyword, propertyName, objectId, isAdd in deltas:
+        if isAdd:
+            (objectIdsByPropByKeyword
+             .setdefault(keyword, {})
+             .setdefault(propertyName, set())
+             .add(objectId))
+            continue
+
+        objectIdsByProp = objectIdsByPropByKeyword.get(keyword)
+        if not objectIdsByProp or propertyName not in objectIdsByProp:
+            continue
+
+        objectIdsByProp[propertyName].discard(objectId)
+        if not objectIdsByProp[propertyName]:
+            del objectIdsByProp[propertyName]
+            if not objectIdsByProp:
+                del objectIdsByPropByKeyword[keyword]
+
+    objectIdCount = sum([len(objectIds)
+                         for objectIdsByProp in objectIdsByPropByKeyword.values()
+                         for objectIds in objectIdsByProp.values()])
+
+    if not objectIdsByPropByKeyword:
+        return None, 0
+
+    return encodeSearchIndexChunk(objectIdsByPropByKeyword), objectIdCount
+
+
+# ---------------
+# Varint helpers, these are shared with the other binary chunk codecs
+
+def writeVarint(out: bytearray, value: int) -> None:
+    if value < 0:
+        raise ValueError("Varints must not be negative, got %s" % value)
+
+    while value > 0x7F:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def readVarint(data: memoryview, offset: int) -> Tuple[int, int]:
+    value = 0
+    shift = 0
+    while True:
+        byte = data[offset]
+        offset += 1
+        value |= (byte & 0x7F) << shift
+        if not byte & 0x80:
+            return value, offset
+        shift += 7
+
+
+def writeString(out: bytearray, value: str) -> None:
+    encoded = value.encode()
+    writeVarint(out, len(encoded))
+    out.extend(encoded)
+
+
+def readString(data: memoryview, offset: int) -> Tuple[str, int]:
+    length, offset = readVarint(data, offset)
+    end = offset + length
+    return bytes(data[offset:end]).decode(), end
@@ -0,0 +1,75 @@
+from twisted.trial import unittest
+
+from peek_core_search._private.worker.tasks.SearchIndexChunkCodec import \
+    encodeSearchIndexChunk, decodeSearchIndexChunk, isBinarySearchIndexChunk, \
+    iterSearchIndexChunk, patchSearchIndexChunk, encodeSearchIndexSplitChunk, \
+    searchIndexSplitChunkSubBucketCount
+from vortex.Payload import Payload
+
+
+class SearchIndexChunkCodecTest(unittest.TestCase):
+    def testRoundTrip(self):
+        data = {
+            '^smi': {'name': [9, 2, 2 ** 40 + 7], 'alias': [5]},
+            'ith': {'name': [2]},
+            '^zürich$': {'locality': [300, 128, 127]},
+        }
+
+        encoded = encodeSearchIndexChunk(data)
+
+        self.assertTrue(isBinarySearchIndexChunk(encoded))
+        self.assertEqual(
+            {
+                '^smi': {'name': [2, 9, 2 ** 40 + 7], 'alias': [5]},
+                'ith': {'name': [2]},
+                '^zürich$': {'locality': [127, 128, 300]},
+            },
+            decodeSearchIndexChunk(encoded)
+        )
+
+    def testKeywordOrder(self):
+        data = {'b': {'p': [1]}, 'a': {'q': [2], 'p': [3]}}
+
+        self.assertEqual(
+            [('a', 'p', [3]), ('a', 'q', [2]), ('b', 'p', [1])],
+            list(iterSearchIndexChunk(encodeSearchIndexChunk(data)))
+        )
+
+    def testEmpty(self):
+        self.assertEqual({}, decodeSearchIndexChunk(encodeSearchIndexChunk({})))
+
+    def testPatch(self):
+        encoded = encodeSearchIndexChunk({'a': {'p': [1, 2]}, 'b': {'p': [3]}})
+
+        patched, objectIdCount = patchSearchIndexChunk(encoded, [
+            ('a', 'p', 2, False),
+            ('b', 'p', 3, False),
+            ('c', 'q', 4, True),
+            ('c', 'q', 5, True),
+            ('c', 'q', 5, False),
+            ('x', 'p', 9, False),
+        ])
+
+        self.assertEqual(2, objectIdCount)
+        self.assertEqual({'a': {'p': [1]}, 'c': {'q': [4]}},
+                         decodeSearchIndexChunk(patched))
+
+    def testPatchToEmpty(self):
+        encoded = encodeSearchIndexChunk({'a': {'p': [1]}})
+        self.assertEqual((None, 0),
+                         patchSearchIndexChunk(encoded, [('a', 'p', 1, False)]))
+
+    def testLegacyPayloadIsNotBinary(self):
+        legacy = Payload(tuples=[['^smi', 'name', '[1, 2]']]).toEncodedPayload()
+        self.assertFalse(isBinarySearchIndexChunk(legacy))
+        self.assertFalse(isBinarySearchIndexChunk(b''))
+        self.assertFalse(isBinarySearchIndexChunk(None))
+
+    def testSplitChunk(self):
+        encoded = encodeSearchIndexSplitChunk(512)
+
+        self.assertFalse(isBinarySearchIndexChunk(encoded))
+        self.assertEqual(512, searchIndexSplitChunkSubBucketCount(encoded))
+        self.assertIsNone(searchIndexSplitChunkSubBucketCount(
+            encodeSearchIndexChunk({'a': {'p': [1]}})
+        ))
@@ -1,27 +1,58 @@
 import hashlib
-import json
 import logging
 from _collections import defaultdict
+from collections import Counter
 from base64 import b64encode
 from datetime import datetime
-from functools import cmp_to_key
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Set, Tuple
 
 import pytz
-from sqlalchemy import select
+from sqlalchemy import select, func, and_, or_, exists
+from sqlalchemy.sql import ColumnElement
 from txcelery.defer import DeferrableTask
 from vortex.Payload import Payload
 
 from peek_core_search._private.storage.EncodedSearchIndexChunk import \
     EncodedSearchIndexChunk
+from peek_core_search._private.storage.EncodedSearchObjectChunk import \
+    EncodedSearchObjectChunk
 from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexChunkVersion import \
+    SearchIndexChunkVersion
+from peek_core_search._private.storage.SearchIndexCompilerDelta import \
+    SearchIndexCompilerDelta
 from peek_core_search._private.storage.SearchIndexCompilerQueue import \
     SearchIndexCompilerQueue
+from peek_core_search._private.storage.SearchObject import SearchObject
+from peek_core_search._private.storage.SearchObjectCompilerQueue import \
+    SearchObjectCompilerQueue
+from peek_core_search._private.worker.tasks.ChunkEnvelope import unwrapChunk, \
+    wrapChunk
+from peek_core_search._private.worker.tasks.SearchIndexChunkCodec import \
+    encodeSearchIndexChunk, isBinarySearchIndexChunk, patchSearchIndexChunk
+from peek_core_search._private.worker.tasks._ChunkCompileMetrics import \
+    ChunkCompileMetrics
+from peek_core_search._private.worker.tasks._ChunkFormat import ChunkRekey, \
+    selectChunkKeys, searchIndexChunkKeyExpr
+from peek_core_search._private.worker.tasks._ChunkSplitter import \
+    SearchIndexChunkSplitter
+from peek_core_search._private.worker.tasks._QueueChunks import \
+    deleteCompiledQueueItems
+from peek_core_search._private.worker.tasks._SourceFingerprint import \
+    loadSourceFingerprints, updateSourceFingerprints
+from peek_core_search._private.worker.tasks._UpsertEncodedChunks import \
+    UPSERT_BATCH_SIZE, upsertEncodedChunks
 from peek_plugin_base.worker import CeleryDbConn
 from peek_plugin_base.worker.CeleryApp import celeryApp
 
 logger = logging.getLogger(__name__)
 
+#: The number of SearchIndex rows to fetch from the server side cursor at a time
+STREAM_FETCH_SIZE = 5000
+
+#: Chunks with more SearchIndexCompilerDelta rows than this are rebuilt, not patched
+PATCH_MAX_DELTAS_PER_CHUNK = 2000
+
 """ Search Index Compiler
 
 Compile the search indexes
@@ -34,24 +65,25 @@ Compile the search indexes
 
 @DeferrableTask
 @celeryApp.task(bind=True)
-def compileSearchIndexChunk(self, payloadEncodedArgs: bytes) -> List[str]:
+def compileSearchIndexChunk(self, payloadEncodedArgs: bytes) -> List[List]:
     """ Compile Search Index Task
 
     :param self: A celery reference to this task
     :param payloadEncodedArgs: An encoded payload containing the queue tuples.
-    :returns: A list of grid keys that have been updated.
+    :returns: A list of [the chunk keys that have been updated, including the sub
+        bucket chunk keys of split chunks, the ChunkCompileMetrics.toList() of the
+        chunks]
     """
     argData = Payload().fromEncodedPayload(payloadEncodedArgs).tuples
     queueItems = argData[0]
-    queueItemIds: List[int] = argData[1]
-
-    chunkKeys = list(set([i.chunkKey for i in queueItems]))
 
     queueTable = SearchIndexCompilerQueue.__table__
     compiledTable = EncodedSearchIndexChunk.__table__
+    deltaTable = SearchIndexCompilerDelta.__table__
     lastUpdate = datetime.now(pytz.utc).isoformat()
 
     startTime = datetime.now(pytz.utc)
+    metrics = ChunkCompileMetrics()
 
     engine = CeleryDbConn.getDbEngine()
     conn = engine.connect()
@@ -61,66 +93,136 @@ def compileSearchIndexChunk(self, payloadEncodedArgs: bytes) -> List[str]:
         logger.debug("Staring compile of %s queueItems in %s",
                      len(queueItems), (datetime.now(pytz.utc) - startTime))
 
+        # The bucket count is share locked, so a re-key can't switch it while
+        # the chunks are compiled.
+        splitter = SearchIndexChunkSplitter.load(conn, lockForImport=True)
+
+        # Leave the blocked chunks in the queue, they are compiled in a later task
+        blockedChunkKeys = _loadBlockedChunkKeys(
+            conn, list(set([i.chunkKey for i in queueItems]))
+        )
+        if blockedChunkKeys:
+            logger.debug("%s SearchIndex chunks are waiting for object chunks",
+                         len(blockedChunkKeys))
+            queueItems = [i for i in queueItems
+                          if i.chunkKey not in blockedChunkKeys]
+
+        chunkKeys = list(set([i.chunkKey for i in queueItems]))
+
+        # These were changed without logging deltas, they must not be patched, and
+        # their fingerprints may be from a chunk that was patched meanwhile.
+        rebuildQueuedChunkKeys = set([i.chunkKey for i in queueItems if i.rebuild])
+
         # Get Model Sets
 
         total = 0
-        existingHashes = _loadExistingHashes(conn, chunkKeys)
-        encKwPayloadByChunkKey = _buildIndex(conn, chunkKeys)
-        chunksToDelete = []
+        existingHashes, existingFingerprints = _loadExistingHashes(conn, chunkKeys,
+                                                                   splitter)
+
+        fingerprints = loadSourceFingerprints(conn, SearchIndexChunkVersion.__table__,
+                                              chunkKeys)
+
+        # Skip the chunks that haven't changed since they were encoded
+        unchangedChunkKeys = set([k for k in chunkKeys
+                                  if k not in rebuildQueuedChunkKeys
+                                  and fingerprints[k] == existingFingerprints.get(k)])
+        for chunkKey in unchangedChunkKeys:
+            metrics.setHashMatched(chunkKey)
+
+        # Including the sub bucket chunks of the unchanged split chunks
+        for chunkKey in list(existingHashes):
+            if splitter.chunkKeyOf(chunkKey) in unchangedChunkKeys:
+                existingHashes.pop(chunkKey)
+
+        changedChunkKeys = [k for k in chunkKeys if k not in unchangedChunkKeys]
+
+        # The deltas of the unchanged chunks are loaded, so they are deleted
+        readStartTime = datetime.now(pytz.utc)
+        deltasByChunkKey, deltaIds = _loadDeltas(conn, chunkKeys)
+        metrics.addRead({k: len(v) for k, v in deltasByChunkKey.items()},
+                        (datetime.now(pytz.utc) - readStartTime).total_seconds())
+
+        patchedChunkKeys = set()
+        encodedChunks = _encodeChunks(
+            conn, changedChunkKeys,
+            {k: v for k, v in deltasByChunkKey.items()
+             if k not in unchangedChunkKeys and k not in rebuildQueuedChunkKeys},
+            patchedChunkKeys, metrics, splitter
+        )
 
+        # Write the chunks as they are encoded, UPSERT_BATCH_SIZE at a time, so the
+        # memory used doesn't depend on the size of the block.
         inserts = []
-        for chunkKey, searchIndexChunkEncodedPayload in encKwPayloadByChunkKey.items():
+        insertedChunkKeys = []
+        fingerprintUpdates = {}
+        writeSeconds = 0.0
+        for chunkKey, searchIndexChunkEncodedPayload in encodedChunks:
             m = hashlib.sha256()
             m.update(searchIndexChunkEncodedPayload)
             encodedHash = b64encode(m.digest()).decode()
 
-            # Compare the hash, AND delete the chunk key
+            # Compare the hash, AND remove the chunk key, the rest are deleted
             if chunkKey in existingHashes:
-                # At this point we could decide to do an update instead,
-                # but inserts are quicker
                 if encodedHash == existingHashes.pop(chunkKey):
+                    metrics.setHashMatched(chunkKey)
+                    fingerprintUpdates[chunkKey] = fingerprints.get(chunkKey)
                     continue
 
-            chunksToDelete.append(chunkKey)
             inserts.append(dict(
                 chunkKey=chunkKey,
                 encodedData=searchIndexChunkEncodedPayload,
                 encodedHash=encodedHash,
-                lastUpdate=lastUpdate))
+                lastUpdate=lastUpdate,
+                sourceFingerprint=fingerprints.get(chunkKey)))
+            insertedChunkKeys.append(chunkKey)
+
+            if len(inserts) == UPSERT_BATCH_SIZE:
+                writeStartTime = datetime.now(pytz.utc)
+                upsertEncodedChunks(conn, compiledTable, inserts)
+                writeSeconds += (datetime.now(pytz.utc) - writeStartTime).total_seconds()
+                inserts = []
 
-        # Add any chnuks that we need to delete that we don't have new data for, here
-        chunksToDelete.extend(list(existingHashes))
+        # Delete the chunks that we don't have new data for, they are now empty
+        chunksToDelete = list(existingHashes)
+
+        # Write the chunks and delete the queue items in the one transaction, so the
+        # clients never see a changed chunk as missing.
+        writeStartTime = datetime.now(pytz.utc)
 
         if chunksToDelete:
-            # Delete the old chunks
             conn.execute(
                 compiledTable.delete(compiledTable.c.chunkKey.in_(chunksToDelete))
             )
 
-        if inserts:
-            newIdGen = CeleryDbConn.prefetchDeclarativeIds(SearchIndex, len(inserts))
-            for insert in inserts:
-                insert["id"] = next(newIdGen)
+        upsertEncodedChunks(conn, compiledTable, inserts)
+        updateSourceFingerprints(conn, compiledTable, fingerprintUpdates)
 
-        transaction.commit()
-        transaction = conn.begin()
+        logger.debug("Compiled %s SearchIndexes, %s unchanged, %s patched, %s missing,"
+                     " in %s",
+                     len(insertedChunkKeys), len(unchangedChunkKeys),
+                     len(patchedChunkKeys), len(chunkKeys) - len(insertedChunkKeys),
+                     (datetime.now(pytz.utc) - startTime))
 
-        if inserts:
-            conn.execute(compiledTable.insert(), inserts)
+        total += len(insertedChunkKeys)
 
-        logger.debug("Compiled %s SearchIndexes, %s missing, in %s",
-                     len(inserts),
-                     len(chunkKeys) - len(inserts), (datetime.now(pytz.utc) - startTime))
+        deleteCompiledQueueItems(conn, queueTable, queueItems)
 
-        total += len(inserts)
-
-        conn.execute(queueTable.delete(queueTable.c.id.in_(queueItemIds)))
+        if deltaIds:
+            conn.execute(deltaTable.delete(deltaTable.c.id.in_(deltaIds)))
 
         transaction.commit()
+
+        writeSeconds += (datetime.now(pytz.utc) - writeStartTime).total_seconds()
+        metrics.addWrite(insertedChunkKeys + chunksToDelete, writeSeconds)
+
         logger.info("Compiled and Committed %s EncodedSearchIndexChunks in %s",
                     total, (datetime.now(pytz.utc) - startTime))
 
-        return chunkKeys
+        updatedChunkKeys = set(chunkKeys)
+        updatedChunkKeys.update(insertedChunkKeys)
+        updatedChunkKeys.update(chunksToDelete)
+
+        return [sorted(updatedChunkKeys), metrics.toList()]
 
     except Exception as e:
         transaction.rollback()
@@ -132,68 +234,364 @@ def compileSearchIndexChunk(self, payloadEncodedArgs: bytes) -> List[str]:
         conn.close()
 
 
-def _loadExistingHashes(conn, chunkKeys: List[str]) -> Dict[str, str]:
+def _loadExistingHashes(conn, chunkKeys: List[int],
+                        splitter: SearchIndexChunkSplitter
+                        ) -> Tuple[Dict[int, str], Dict[int, Optional[str]]]:
+    """ Load Existing Hashes
+
+    The sub bucket chunks of the split chunks are loaded with them, so they are
+    deleted if the chunk isn't split into them again.
+
+    :return: A tuple of (the encoded hash of each chunk key,
+        the source fingerprint of each chunk key)
+    """
     compiledTable = EncodedSearchIndexChunk.__table__
 
     results = conn.execute(select(
-        columns=[compiledTable.c.chunkKey, compiledTable.c.encodedHash],
-        whereclause=compiledTable.c.chunkKey.in_(chunkKeys)
+        columns=[compiledTable.c.chunkKey, compiledTable.c.encodedHash,
+                 compiledTable.c.sourceFingerprint],
+        whereclause=or_(compiledTable.c.chunkKey.in_(chunkKeys),
+                        splitter.subBucketChunkKeysWhere(compiledTable.c.chunkKey,
+                                                         chunkKeys))
     )).fetchall()
 
-    return {result[0]: result[1] for result in results}
+    return ({result[0]: result[1] for result in results},
+            {result[0]: result[2] for result in results})
+
 
+def _loadRowCounts(conn, chunkKeys: List[int]) -> Dict[int, int]:
+    """ Load Row Counts
 
-def _buildIndex(conn, chunkKeys) -> Dict[str, bytes]:
+    Count the SearchIndex rows of each chunk, from the idx_SearchIndex_quick_query
+    index.
+
+    :return: The SearchIndex row count of each chunk key
+    """
     indexTable = SearchIndex.__table__
 
     results = conn.execute(select(
-        columns=[indexTable.c.chunkKey, indexTable.c.keyword,
-                 indexTable.c.propertyName, indexTable.c.objectId],
-        whereclause=indexTable.c.chunkKey.in_(chunkKeys)
+        columns=[indexTable.c.chunkKey, func.count()],
+        whereclause=indexTable.c.chunkKey.in_(chunkKeys),
+        group_by=[indexTable.c.chunkKey]
     ))
 
-    encKwPayloadByChunkKey = {}
+    return dict(results.fetchall())
 
-    # Create the SearchTerm -> SearchProperty -> [objectIds, objectIds, ....] structure
-    objIdsByPropByKwByChunkKey = defaultdict(
-        lambda: defaultdict(lambda: defaultdict(list))
+
+def searchIndexChunkBlockedWhere(chunkKeyColumn) -> ColumnElement:
+    """ Search Index Chunk Blocked Where
+
+    An index chunk must not reach the clients before the object chunks of the
+    objects it adds, or the clients will find objects they can't load yet.
+
+    A chunk is blocked while an object its deltas add has a queued object chunk,
+    or while any of its objects has a queued object chunk that has never been
+    compiled. The object chunks that have been compiled are compiled alongside, the
+    chunk doesn't wait for those, a busy object queue can't hold back a rebuild.
+
+    The compiler queue controller doesn't fetch the blocked chunks, and the compiler
+    task leaves them in the queue.
+
+    :param chunkKeyColumn: The index chunk key column to correlate with
+    :return: A where clause that is true for the blocked chunks
+    """
+    deltaTable = SearchIndexCompilerDelta.__table__
+    indexTable = SearchIndex.__table__
+    objectTable = SearchObject.__table__
+    objectQueueTable = SearchObjectCompilerQueue.__table__
+    encodedObjectTable = EncodedSearchObjectChunk.__table__
+
+    isObjectChunkQueued = exists().where(
+        objectQueueTable.c.chunkKey == objectTable.c.chunkKey
+    )
+
+    isObjectChunkNew = ~exists().where(
+        encodedObjectTable.c.chunkKey == objectTable.c.chunkKey
     )
 
-    for item in results:
-        (
-            objIdsByPropByKwByChunkKey
-            [item.chunkKey]
-            [item.keyword]
-            [item.propertyName]
-                .append(item.objectId)
+    addedObjectBlocked = exists().where(and_(
+        deltaTable.c.chunkKey == chunkKeyColumn,
+        deltaTable.c.isAdd,
+        objectTable.c.id == deltaTable.c.objectId,
+        isObjectChunkQueued
+    ))
+
+    newObjectBlocked = exists().where(and_(
+        indexTable.c.chunkKey == chunkKeyColumn,
+        objectTable.c.id == indexTable.c.objectId,
+        isObjectChunkNew,
+        isObjectChunkQueued
+    ))
+
+    return or_(addedObjectBlocked, newObjectBlocked)
+
+
+def _loadBlockedChunkKeys(conn, chunkKeys: List[int]) -> Set[int]:
+    """ Load Blocked Chunk Keys
+
+    Check the chunks again, an object chunk may have been queued since the queue
+    controller fetched them.
+
+    :return: The chunk keys that are blocked, see searchIndexChunkBlockedWhere
+    """
+    if not chunkKeys:
+        return set()
+
+    queueTable = SearchIndexCompilerQueue.__table__
+
+    results = conn.execute(select(
+        columns=[queueTable.c.chunkKey],
+        whereclause=and_(queueTable.c.chunkKey.in_(chunkKeys),
+                         searchIndexChunkBlockedWhere(queueTable.c.chunkKey))
+    ))
+
+    return set([result[0] for result in results])
+
+
+def _loadDeltas(conn, chunkKeys: List[int]
+                ) -> Tuple[Dict[int, List[Tuple[str, str, int, bool]]], List[int]]:
+    """ Load Deltas
+
+    :return: A tuple of (the deltas for each chunk key, in the order they were
+        logged, the IDs of all the delta rows loaded)
+    """
+    deltaTable = SearchIndexCompilerDelta.__table__
+
+    results = conn.execute(select(
+        columns=[deltaTable.c.id, deltaTable.c.chunkKey, deltaTable.c.keyword,
+                 deltaTable.c.propertyName, deltaTable.c.objectId,
+                 deltaTable.c.isAdd],
+        whereclause=deltaTable.c.chunkKey.in_(chunkKeys),
+        order_by=deltaTable.c.id
+    ))
+
+    deltasByChunkKey = defaultdict(list)
+    deltaIds = []
+
+    for result in results:
+        deltaIds.append(result.id)
+        deltasByChunkKey[result.chunkKey].append(
+            (result.keyword, result.propertyName, result.objectId, result.isAdd)
         )
 
-    def _sortSearchIndex(o1, o2):
-        if o1[0] < o2[0]: return -1
-        if o1[0] > o2[0]: return 1
-        if o1[1] < o2[1]: return -1
-        if o1[1] > o2[1]: return 1
-        return 0
+    return deltasByChunkKey, deltaIds
+
 
-    # Sort each bucket by the key
-    for chunkKey, objIdsByPropByKw in objIdsByPropByKwByChunkKey.items():
-        compileSearchIndexChunks = []
+def _encodeChunks(conn, chunkKeys: List[int],
+                  deltasByChunkKey: Dict[int, List[Tuple[str, str, int, bool]]],
+                  patchedChunkKeys: Set[int],
+                  metrics: ChunkCompileMetrics, splitter: SearchIndexChunkSplitter
+                  ) -> Iterator[Tuple[int, bytes]]:
+    """ Encode Chunks
 
-        for keyword, objIdsByProp in objIdsByPropByKw.items():
-            if len(objIdsByProp) > 1000:
-                logger.error("Too many items in bucket for keyword %s",
-                             keyword, len(objIdsByProp))
+    Patch the chunks that can be patched, then rebuild the rest. The chunks that
+    are patched to empty aren't yielded, they are deleted.
 
-            for propertyName, objectIds in objIdsByProp.items():
-                compileSearchIndexChunks.append(
-                    [keyword, propertyName, json.dumps(list(sorted(objectIds)))]
-                )
+    :param patchedChunkKeys: The chunk keys that were patched are added to this
+    """
+    for chunkKey, patched in _patchIndex(conn, deltasByChunkKey, metrics, splitter):
+        patchedChunkKeys.add(chunkKey)
+        if patched is not None:
+            yield chunkKey, patched
+
+    rebuildChunkKeys = [k for k in chunkKeys if k not in patchedChunkKeys]
+    yield from _buildIndex(conn, rebuildChunkKeys, metrics, splitter=splitter)
+
+
+def _patchIndex(conn, deltasByChunkKey: Dict[int, List[Tuple[str, str, int, bool]]],
+                metrics: Optional[ChunkCompileMetrics] = None,
+                splitter: Optional[SearchIndexChunkSplitter] = None
+                ) -> Iterator[Tuple[int, Optional[bytes]]]:
+    """ Patch Index
+
+    Apply the logged deltas to the existing encoded chunks, the cost of this is
+    proportional to the change, rather than the number of rows in the chunk.
+
+    The existing chunks are streamed through a server side cursor, and each chunk
+    is yielded as soon as it's patched.
+
+    Chunks aren't yielded, so they are fully rebuilt, if they have no deltas, too
+    many deltas, are missing, are in the legacy format, are split, or if the patched
+    chunk doesn't have the same number of object ids as the SearchIndex table, or
+    needs to be split.
+
+    :return: An iterator of (chunk key, the patched encoded data, None if the chunk
+        is now empty)
+    """
+    compiledTable = EncodedSearchIndexChunk.__table__
+
+    chunkKeys = [chunkKey for chunkKey, deltas in deltasByChunkKey.items()
+                 if len(deltas) <= PATCH_MAX_DELTAS_PER_CHUNK]
+
+    if not chunkKeys:
+        return
+
+    readStartTime = datetime.now(pytz.utc)
+    rowCountByChunkKey = _loadRowCounts(conn, chunkKeys)
+    if metrics:
+        metrics.addReadSeconds(rowCountByChunkKey,
+                               (datetime.now(pytz.utc) - readStartTime).total_seconds())
+
+    readStartTime = datetime.now(pytz.utc)
+    results = conn.execution_options(stream_results=True).execute(select(
+        columns=[compiledTable.c.chunkKey, compiledTable.c.encodedData],
+        whereclause=compiledTable.c.chunkKey.in_(chunkKeys)
+    ))
+
+    try:
+        while True:
+            rows = results.fetchmany(UPSERT_BATCH_SIZE)
+            if not rows:
+                break
+
+            if metrics:
+                metrics.addRead({result.chunkKey: 1 for result in rows},
+                                (datetime.now(pytz.utc) - readStartTime).total_seconds())
+
+            for result in rows:
+                patched = _patchChunk(result.chunkKey, bytes(result.encodedData),
+                                      deltasByChunkKey[result.chunkKey],
+                                      rowCountByChunkKey, metrics, splitter)
+                if patched is not False:
+                    yield result.chunkKey, patched
+
+            readStartTime = datetime.now(pytz.utc)
+
+    finally:
+        results.close()
+
+
+def _patchChunk(chunkKey: int, encodedData: bytes,
+                deltas: List[Tuple[str, str, int, bool]],
+                rowCountByChunkKey: Dict[int, int],
+                metrics: Optional[ChunkCompileMetrics],
+                splitter: Optional[SearchIndexChunkSplitter]):
+    """ Patch Chunk
+
+    :return: The patched encoded data, None if the chunk is now empty, or False if
+        the chunk must be rebuilt.
+    """
+    encodedData = unwrapChunk(encodedData)
+    if not isBinarySearchIndexChunk(encodedData):
+        return False
+
+    encodeStartTime = datetime.now(pytz.utc)
+    patched, objectIdCount = patchSearchIndexChunk(encodedData, deltas)
+    patched = None if patched is None else wrapChunk(patched)
+
+    if metrics:
+        metrics.addEncode(chunkKey,
+                          (datetime.now(pytz.utc) - encodeStartTime).total_seconds(),
+                          len(patched) if patched else 0)
+
+    # Sanity check the patched chunk against the index, this catches most missed
+    # deltas. The chunks a bulk load changes are queued to be rebuilt instead.
+    if rowCountByChunkKey.get(chunkKey, 0) != objectIdCount:
+        logger.debug("Patched chunk %s doesn't match the index, rebuilding",
+                     chunkKey)
+        return False
+
+    # Leave the chunks that have grown too large for the rebuild to split
+    if splitter and patched and splitter.isOversized(patched):
+        logger.debug("Patched chunk %s is over the byte budget, rebuilding",
+                     chunkKey)
+        return False
+
+    return patched
+
+
+def _buildIndex(conn, chunkKeys, metrics: Optional[ChunkCompileMetrics] = None,
+                rekey: Optional[ChunkRekey] = None,
+                splitter: Optional[SearchIndexChunkSplitter] = None
+                ) -> Iterator[Tuple[int, bytes]]:
+    """ Build Index
+
+    Stream the SearchIndex rows through a server side cursor, ordered so the rows
+    of each chunk are contiguous, and yield each chunks encoded blob as soon as
+    its rows end.
+
+    This bounds the worker memory to one chunk, instead of the whole task block.
+
+    Chunks over the byte budget are yielded as a split chunk, then its sub bucket
+    chunks.
+
+    :param rekey: Build the chunks keyed with the new bucket count of a re-key
+    :param splitter: The splitter to split the chunks with, loaded if it's None
+    """
+    if not chunkKeys:
+        return
+
+    if splitter is None:
+        splitter = SearchIndexChunkSplitter.load(conn, rekey)
+
+    indexTable = SearchIndex.__table__
+
+    def encode(chunkKey, objIdsByPropByKw) -> List[Tuple[int, bytes]]:
+        encodeStartTime = datetime.now(pytz.utc)
+        encodedChunks = splitter.encodeChunk(chunkKey, objIdsByPropByKw, _encodeChunk)
+        if metrics:
+            # Share the time between the sub bucket chunks, by encoded bytes
+            seconds = (datetime.now(pytz.utc) - encodeStartTime).total_seconds()
+            totalBytes = sum([len(e) for _, e in encodedChunks])
+            for encodedChunkKey, encodedData in encodedChunks:
+                metrics.addEncode(encodedChunkKey,
+                                  seconds * len(encodedData) / totalBytes,
+                                  len(encodedData))
+        return encodedChunks
+
+    chunkKeyColumn, whereclause = selectChunkKeys(
+        indexTable.c.chunkKey,
+        lambda bucketCount: searchIndexChunkKeyExpr(indexTable.c.keyword, bucketCount),
+        chunkKeys, rekey
+    )
+
+    readStartTime = datetime.now(pytz.utc)
+    results = conn.execution_options(stream_results=True).execute(select(
+        columns=[chunkKeyColumn, indexTable.c.keyword,
+                 indexTable.c.propertyName, indexTable.c.objectId],
+        whereclause=whereclause,
+        order_by=[chunkKeyColumn, indexTable.c.keyword,
+                  indexTable.c.propertyName, indexTable.c.objectId]
+    ))
+
+    lastChunkKey = None
+
+    # Create the SearchTerm -> SearchProperty -> [objectIds, objectIds, ....] structure
+    objIdsByPropByKw = None
+
+    try:
+        while True:
+            rows = results.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
+
+            if metrics:
+                metrics.addRead(Counter([item.chunkKey for item in rows]),
+                                (datetime.now(pytz.utc) - readStartTime).total_seconds())
+
+            for item in rows:
+                if item.chunkKey != lastChunkKey:
+                    if objIdsByPropByKw:
+                        yield from encode(lastChunkKey, objIdsByPropByKw)
+
+                    lastChunkKey = item.chunkKey
+                    objIdsByPropByKw = defaultdict(lambda: defaultdict(list))
+
+                objIdsByPropByKw[item.keyword][item.propertyName].append(item.objectId)
+
+            readStartTime = datetime.now(pytz.utc)
+
+        if objIdsByPropByKw:
+            yield from encode(lastChunkKey, objIdsByPropByKw)
+
+    finally:
+        results.close()
 
-        compileSearchIndexChunks.sort(key=cmp_to_key(_sortSearchIndex))
 
-        # Create the blob data for this index.
-        # It will be searched by a binary sort
-        encKwPayloadByChunkKey[chunkKey] = Payload(
-            tuples=compileSearchIndexChunks).toEncodedPayload()
+def _encodeChunk(objIdsByPropByKw: Dict[str, Dict[str, List[int]]]) -> bytes:
+    for keyword, objIdsByProp in objIdsByPropByKw.items():
+        if len(objIdsByProp) > 1000:
+            logger.error("Too many items in bucket for keyword %s, %s",
+                         keyword, len(objIdsByProp))
 
-    return encKwPayloadByChunkKey
+    return wrapChunk(encodeSearchIndexChunk(objIdsByPropByKw))
@@ -0,0 +1,172 @@
+""" Search Object Chunk Codec
+
+This module encodes and decodes the binary format of the EncodedSearchObjectChunk.
+
+The original format was the SearchObject.packedJson strings, json encoded again into
+one {id: packedJson} string, then wrapped in a vortex Payload. Clients had to parse
+the JSON twice to read an object.
+
+The binary format stores each objects type, properties and routes once, with the
+property names interned per chunk.
+
+Format V1 layout ::
+
+    byte        SEARCH_OBJECT_CHUNK_FORMAT_V1
+    varint      property name count
+                    string (varint length, utf-8 bytes) per property name
+    varint      object count
+                    varint      object id delta from the previous object, sorted
+                    varint      object type id
+                    varint      property count
+                        varint      property name index
+                        string      property value
+                    varint      route count
+                        string      route title
+                        string      route path
+
+This MUST MATCH plugin-module/_private/search-object-loader/SearchObjectChunkDecoder.ts
+
+"""
+import json
+from collections import namedtuple
+from typing import Dict, Iterable, Iterator, Optional
+
+from peek_core_search._private.worker.tasks.SearchIndexChunkCodec import \
+    readString, readVarint, writeString, writeVarint
+
+SEARCH_OBJECT_CHUNK_FORMAT_V1 = 0x01
+
+
+DecodedSearchObject = namedtuple("DecodedSearchObject", ["id", "objectTypeId",
+                                                         "properties", "routes"])
+
+
+def isBinarySearchObjectChunk(encodedData: bytes) -> bool:
+    """ Is Binary Search Object Chunk
+
+    Legacy chunks are vortex encoded payloads, they start with an ascii character.
+
+    """
+    return bool(encodedData) and encodedData[0] == SEARCH_OBJECT_CHUNK_FORMAT_V1
+
+
+def unpackSearchObjectJson(objectId: int, packedJson: str) -> DecodedSearchObject:
+    """ Unpack Search Object Json
+
+    Convert the SearchObject.packedJson, created by the import, into the values
+    stored in the chunk.
+
+    """
+    props = json.loads(packedJson)
+    objectTypeId = props.pop('_otid_')
+    routes = [(title, path) for title, path in props.pop('_r_')
+              if title is not None]
+
+    # Values are stored as strings, None means there is no value.
+    props = {name: value if isinstance(value, str) else str(value)
+             for name, value in props.items()
+             if value is not None}
+
+    return DecodedSearchObject(objectId, objectTypeId, props, routes)
+
+
+def encodeSearchObjectChunk(objects: Iterable[DecodedSearchObject]) -> bytes:
+    """ Encode Search Object Chunk
+
+    :param objects: The objects to store in the chunk
+    :return: The binary encoded chunk
+    """
+    objects = sorted(objects, key=lambda o: o.id)
+
+    propertyNames = set()
+    for obj in objects:
+        propertyNames.update(obj.properties)
+
+    propertyNames = sorted(propertyNames)
+    propertyIndexByName = {name: index for index, name in enumerate(propertyNames)}
+
+    out = bytearray([SEARCH_OBJECT_CHUNK_FORMAT_V1])
+
+    writeVarint(out, len(propertyNames))
+    for propertyName in propertyNames:
+        writeString(out, propertyName)
+
+    writeVarint(out, len(objects))
+
+    lastObjectId = 0
+    for obj in objects:
+        writeVarint(out, obj.id - lastObjectId)
+        lastObjectId = obj.id
+
+        writeVarint(out, obj.objectTypeId)
+
+        writeVarint(out, len(obj.properties))
+        for propertyName in sorted(obj.properties):
+            writeVarint(out, propertyIndexByName[propertyName])
+            writeString(out, obj.properties[propertyName])
+
+        writeVarint(out, len(obj.routes))
+        for title, path in obj.routes:
+            writeString(out, title)
+            writeString(out, path)
+
+    return bytes(out)
+
+
+def iterSearchObjectChunk(encodedData: bytes) -> Iterator[DecodedSearchObject]:
+    """ Iterate Search Object Chunk
+
+    Decode a binary chunk, yielding the objects in id order.
+
+    """
+    if not isBinarySearchObjectChunk(encodedData):
+        raise ValueError("Encoded data is not a binary search object chunk")
+
+    data = memoryview(encodedData)
+    offset = 1
+
+    propertyCount, offset = readVarint(data, offset)
+    propertyNames = []
+    for _ in range(propertyCount):
+        propertyName, offset = readString(data, offset)
+        propertyNames.append(propertyName)
+
+    objectCount, offset = readVarint(data, offset)
+
+    objectId = 0
+    for _ in range(objectCount):
+        delta, offset = readVarint(data, offset)
+        objectId += delta
+
+        objectTypeId, offset = readVarint(data, offset)
+
+        props = {}
+        propCount, offset = readVarint(data, offset)
+        for _ in range(propCount):
+            propertyIndex, offset = readVarint(data, offset)
+            props[propertyNames[propertyIndex]], offset = readString(data, offset)
+
+        routes = []
+        routeCount, offset = readVarint(data, offset)
+        for _ in range(routeCount):
+            title, offset = readString(data, offset)
+            path, offset = readString(data, offset)
+            routes.append((title, path))
+
+        yield DecodedSearchObject(objectId, objectTypeId, props, routes)
+
+
+def decodeSearchObjectChunk(encodedData: bytes,
+                            objectIds: Optional[Iterable[int]] = None
+                            ) -> Dict[int, DecodedSearchObject]:
+    """ Decode Search Object Chunk
+
+    :param encodedData: The binary chunk
+    :param objectIds: Optionally, only return these objects
+    :return: The objects by their id
+    """
+    wantedIds = None if objectIds is None else set(objectIds)
+
+    return {obj.id: obj
+            for obj in iterSearchObjectChunk(encodedData)
+            if wantedIds is None or obj.id in wantedIds}
@@ -0,0 +1,33 @@
+from twisted.trial import unittest
+
+from peek_core_search._private.worker.tasks.SearchObjectChunkCodec import \
+    encodeSearchObjectChunk, decodeSearchObjectChunk, isBinarySearchObjectChunk, \
+    unpackSearchObjectJson, DecodedSearchObject
+from vortex.Payload import Payload
+
+
+class SearchObjectChunkCodecTest(unittest.TestCase):
+    def testRoundTrip(self):
+        objects = [
+            DecodedSearchObject(2 ** 40 + 3, 7, {'key': 'c2', 'name': 'zürich'}, []),
+            DecodedSearchObject(12, 1, {'key': 'c1', 'alias': 'a'},
+                                [('Open', '/a/b'), ('Show', '/c')]),
+        ]
+
+        encoded = encodeSearchObjectChunk(objects)
+
+        self.assertTrue(isBinarySearchObjectChunk(encoded))
+        self.assertEqual({o.id: o for o in objects}, decodeSearchObjectChunk(encoded))
+        self.assertEqual([12], list(decodeSearchObjectChunk(encoded, [12, 99])))
+
+    def testUnpackSearchObjectJson(self):
+        packedJson = '{"_otid_": 3, "_r_": [[null, null]], "key": "c1", "n": 5}'
+
+        self.assertEqual(
+            DecodedSearchObject(4, 3, {'key': 'c1', 'n': '5'}, []),
+            unpackSearchObjectJson(4, packedJson)
+        )
+
+    def testLegacyPayloadIsNotBinary(self):
+        legacy = Payload(tuples='{"1": "{}"}').toEncodedPayload()
+        self.assertFalse(isBinarySearchObjectChunk(legacy))
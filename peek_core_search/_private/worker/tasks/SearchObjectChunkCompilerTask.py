@@ -1,26 +1,43 @@
 import hashlib
-import json
 import logging
 from base64 import b64encode
-from collections import defaultdict
+from collections import Counter
 from datetime import datetime
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional, Tuple
 
 import pytz
-from sqlalchemy import select
+from sqlalchemy import select, and_
 from txcelery.defer import DeferrableTask
 from vortex.Payload import Payload
 
 from peek_core_search._private.storage.EncodedSearchObjectChunk import \
     EncodedSearchObjectChunk
 from peek_core_search._private.storage.SearchObject import SearchObject
+from peek_core_search._private.storage.SearchObjectChunkVersion import \
+    SearchObjectChunkVersion
 from peek_core_search._private.storage.SearchObjectCompilerQueue import \
     SearchObjectCompilerQueue
+from peek_core_search._private.worker.tasks.ChunkEnvelope import wrapChunk
+from peek_core_search._private.worker.tasks.SearchObjectChunkCodec import \
+    encodeSearchObjectChunk, unpackSearchObjectJson
+from peek_core_search._private.worker.tasks._ChunkCompileMetrics import \
+    ChunkCompileMetrics
+from peek_core_search._private.worker.tasks._ChunkFormat import ChunkRekey, \
+    selectChunkKeys, searchObjectChunkKeyExpr, loadBucketCounts
+from peek_core_search._private.worker.tasks._QueueChunks import \
+    deleteCompiledQueueItems
+from peek_core_search._private.worker.tasks._SourceFingerprint import \
+    loadSourceFingerprints, updateSourceFingerprints
+from peek_core_search._private.worker.tasks._UpsertEncodedChunks import \
+    UPSERT_BATCH_SIZE, upsertEncodedChunks
 from peek_plugin_base.worker import CeleryDbConn
 from peek_plugin_base.worker.CeleryApp import celeryApp
 
 logger = logging.getLogger(__name__)
 
+#: The number of SearchObject rows to fetch from the server side cursor at a time
+STREAM_FETCH_SIZE = 1000
+
 """ Search Index Compiler
 
 Compile the search indexes
@@ -33,16 +50,16 @@ Compile the search indexes
 
 @DeferrableTask
 @celeryApp.task(bind=True)
-def compileSearchObjectChunk(self, payloadEncodedArgs: bytes) -> List[str]:
+def compileSearchObjectChunk(self, payloadEncodedArgs: bytes) -> List[List]:
     """ Compile Search Index Task
 
     :param self: A celery reference to this task
     :param payloadEncodedArgs: An encoded payload containing the queue tuples.
-    :returns: A list of grid keys that have been updated.
+    :returns: A list of [the chunk keys that have been updated,
+        the ChunkCompileMetrics.toList() of the chunks]
     """
     argData = Payload().fromEncodedPayload(payloadEncodedArgs).tuples
     queueItems = argData[0]
-    queueItemIds: List[int] = argData[1]
 
     chunkKeys = list(set([i.chunkKey for i in queueItems]))
 
@@ -51,6 +68,7 @@ def compileSearchObjectChunk(self, payloadEncodedArgs: bytes) -> List[str]:
     lastUpdate = datetime.now(pytz.utc).isoformat()
 
     startTime = datetime.now(pytz.utc)
+    metrics = ChunkCompileMetrics()
 
     engine = CeleryDbConn.getDbEngine()
     conn = engine.connect()
@@ -60,66 +78,94 @@ def compileSearchObjectChunk(self, payloadEncodedArgs: bytes) -> List[str]:
         logger.debug("Staring compile of %s queueItems in %s",
                      len(queueItems), (datetime.now(pytz.utc) - startTime))
 
+        # The bucket count is share locked, so a re-key can't switch the chunks
+        # while they are compiled under the old chunk keys.
+        loadBucketCounts(conn, lockForImport=True)
+
         # Get Model Sets
 
         total = 0
-        existingHashes = _loadExistingHashes(conn, chunkKeys)
-        encKwPayloadByChunkKey = _buildIndex(chunkKeys)
-        chunksToDelete = []
+        existingHashes, existingFingerprints = _loadExistingHashes(conn, chunkKeys)
+
+        fingerprints = loadSourceFingerprints(conn, SearchObjectChunkVersion.__table__,
+                                              chunkKeys)
+
+        # Skip the chunks that haven't changed since they were encoded
+        unchangedChunkKeys = set([k for k in chunkKeys
+                                  if fingerprints[k] == existingFingerprints.get(k)])
+        for chunkKey in unchangedChunkKeys:
+            existingHashes.pop(chunkKey)
+            metrics.setHashMatched(chunkKey)
 
+        changedChunkKeys = [k for k in chunkKeys if k not in unchangedChunkKeys]
+
+        encodedChunks = _buildIndex(conn, changedChunkKeys, metrics)
+
+        # Write the chunks as they are encoded, UPSERT_BATCH_SIZE at a time, so the
+        # memory used doesn't depend on the size of the block.
         inserts = []
-        for chunkKey, searchIndexChunkEncodedPayload in encKwPayloadByChunkKey.items():
+        insertedChunkKeys = []
+        fingerprintUpdates = {}
+        writeSeconds = 0.0
+        for chunkKey, searchIndexChunkEncodedPayload in encodedChunks:
             m = hashlib.sha256()
             m.update(searchIndexChunkEncodedPayload)
             encodedHash = b64encode(m.digest()).decode()
 
-            # Compare the hash, AND delete the chunk key
+            # Compare the hash, AND remove the chunk key, the rest are deleted
             if chunkKey in existingHashes:
-                # At this point we could decide to do an update instead,
-                # but inserts are quicker
                 if encodedHash == existingHashes.pop(chunkKey):
+                    metrics.setHashMatched(chunkKey)
+                    fingerprintUpdates[chunkKey] = fingerprints.get(chunkKey)
                     continue
 
-            chunksToDelete.append(chunkKey)
             inserts.append(dict(
                 chunkKey=chunkKey,
                 encodedData=searchIndexChunkEncodedPayload,
                 encodedHash=encodedHash,
-                lastUpdate=lastUpdate))
+                lastUpdate=lastUpdate,
+                sourceFingerprint=fingerprints.get(chunkKey)))
+            insertedChunkKeys.append(chunkKey)
+
+            if len(inserts) == UPSERT_BATCH_SIZE:
+                writeStartTime = datetime.now(pytz.utc)
+                upsertEncodedChunks(conn, compiledTable, inserts)
+                writeSeconds += (datetime.now(pytz.utc) - writeStartTime).total_seconds()
+                inserts = []
+
+        # Delete the chunks that we don't have new data for, they are now empty
+        chunksToDelete = list(existingHashes)
 
-        # Add any chnuks that we need to delete that we don't have new data for, here
-        chunksToDelete.extend(list(existingHashes))
+        # Write the chunks and delete the queue items in the one transaction, so the
+        # clients never see a changed chunk as missing.
+        writeStartTime = datetime.now(pytz.utc)
 
         if chunksToDelete:
-            # Delete the old chunks
             conn.execute(
                 compiledTable.delete(compiledTable.c.chunkKey.in_(chunksToDelete))
             )
 
-        if inserts:
-            newIdGen = CeleryDbConn.prefetchDeclarativeIds(SearchObject, len(inserts))
-            for insert in inserts:
-                insert["id"] = next(newIdGen)
+        upsertEncodedChunks(conn, compiledTable, inserts)
+        updateSourceFingerprints(conn, compiledTable, fingerprintUpdates)
 
-        transaction.commit()
-        transaction = conn.begin()
+        logger.debug("Compiled %s SearchObjects, %s unchanged, %s missing, in %s",
+                     len(insertedChunkKeys), len(unchangedChunkKeys),
+                     len(chunkKeys) - len(insertedChunkKeys),
+                     (datetime.now(pytz.utc) - startTime))
 
-        if inserts:
-            conn.execute(compiledTable.insert(), inserts)
+        total += len(insertedChunkKeys)
 
-        logger.debug("Compiled %s SearchObjects, %s missing, in %s",
-                     len(inserts),
-                     len(chunkKeys) - len(inserts), (datetime.now(pytz.utc) - startTime))
+        deleteCompiledQueueItems(conn, queueTable, queueItems)
 
-        total += len(inserts)
+        transaction.commit()
 
-        conn.execute(queueTable.delete(queueTable.c.id.in_(queueItemIds)))
+        writeSeconds += (datetime.now(pytz.utc) - writeStartTime).total_seconds()
+        metrics.addWrite(insertedChunkKeys + chunksToDelete, writeSeconds)
 
-        transaction.commit()
         logger.info("Compiled and Committed %s EncodedSearchObjectChunks in %s",
                     total, (datetime.now(pytz.utc) - startTime))
 
-        return chunkKeys
+        return [chunkKeys, metrics.toList()]
 
     except Exception as e:
         transaction.rollback()
@@ -131,47 +177,89 @@ def compileSearchObjectChunk(self, payloadEncodedArgs: bytes) -> List[str]:
         conn.close()
 
 
-def _loadExistingHashes(conn, chunkKeys: List[str]) -> Dict[str, str]:
+def _loadExistingHashes(conn, chunkKeys: List[int]
+                        ) -> Tuple[Dict[int, str], Dict[int, Optional[str]]]:
+    """ Load Existing Hashes
+
+    :return: A tuple of (the encoded hash of each chunk key,
+        the source fingerprint of each chunk key)
+    """
     compiledTable = EncodedSearchObjectChunk.__table__
 
     results = conn.execute(select(
-        columns=[compiledTable.c.chunkKey, compiledTable.c.encodedHash],
+        columns=[compiledTable.c.chunkKey, compiledTable.c.encodedHash,
+                 compiledTable.c.sourceFingerprint],
         whereclause=compiledTable.c.chunkKey.in_(chunkKeys)
     )).fetchall()
 
-    return {result[0]: result[1] for result in results}
+    return ({result[0]: result[1] for result in results},
+            {result[0]: result[2] for result in results})
+
 
+def _buildIndex(conn, chunkKeys, metrics: Optional[ChunkCompileMetrics] = None,
+                rekey: Optional[ChunkRekey] = None) -> Iterator[Tuple[int, bytes]]:
+    """ Build Index
 
-def _buildIndex(chunkKeys) -> Dict[str, bytes]:
-    session = CeleryDbConn.getDbSession()
+    Stream the SearchObject rows through a server side cursor, ordered so the rows
+    of each chunk are contiguous, and yield each chunks encoded blob as soon as
+    its rows end.
+
+    :param rekey: Build the chunks keyed with the new bucket count of a re-key
+    """
+    if not chunkKeys:
+        return
+
+    objectTable = SearchObject.__table__
+
+    def encode(chunkKey, objects) -> bytes:
+        encodeStartTime = datetime.now(pytz.utc)
+        encodedData = wrapChunk(encodeSearchObjectChunk(objects))
+        if metrics:
+            metrics.addEncode(chunkKey,
+                              (datetime.now(pytz.utc) - encodeStartTime).total_seconds(),
+                              len(encodedData))
+        return encodedData
+
+    chunkKeyColumn, whereclause = selectChunkKeys(
+        objectTable.c.chunkKey,
+        lambda bucketCount: searchObjectChunkKeyExpr(objectTable.c.id, bucketCount),
+        chunkKeys, rekey
+    )
+
+    readStartTime = datetime.now(pytz.utc)
+    results = conn.execution_options(stream_results=True).execute(select(
+        columns=[chunkKeyColumn, objectTable.c.id, objectTable.c.packedJson],
+        whereclause=and_(whereclause, objectTable.c.packedJson != None),
+        order_by=[chunkKeyColumn, objectTable.c.id]
+    ))
+
+    lastChunkKey = None
+    objects = None
 
     try:
-        indexQry = (
-            session.query(SearchObject.chunkKey, SearchObject.id, SearchObject.packedJson)
-                .filter(SearchObject.chunkKey.in_(chunkKeys))
-                .filter(SearchObject.packedJson != None)
-                .order_by(SearchObject.id)
-                .yield_per(1000)
-                .all()
-        )
+        while True:
+            rows = results.fetchmany(STREAM_FETCH_SIZE)
+            if not rows:
+                break
 
-        # Create the ChunkKey -> {id -> packedJson, id -> packedJson, ....]
-        packagedJsonByObjIdByChunkKey = defaultdict(dict)
+            if metrics:
+                metrics.addRead(Counter([item.chunkKey for item in rows]),
+                                (datetime.now(pytz.utc) - readStartTime).total_seconds())
 
-        for item in indexQry:
-            packagedJsonByObjIdByChunkKey[item.chunkKey][item.id] = item.packedJson
+            for item in rows:
+                if item.chunkKey != lastChunkKey:
+                    if objects:
+                        yield lastChunkKey, encode(lastChunkKey, objects)
 
-        encPayloadByChunkKey = {}
+                    lastChunkKey = item.chunkKey
+                    objects = []
 
-        # Sort each bucket by the key
-        for chunkKey, packedJsonById in packagedJsonByObjIdByChunkKey.items():
-            tuples = json.dumps(packedJsonById, sort_keys=True)
+                objects.append(unpackSearchObjectJson(item.id, item.packedJson))
 
-            # Create the blob data for this index.
-            # It will be searched by a binary sort
-            encPayloadByChunkKey[chunkKey] = Payload(tuples=tuples).toEncodedPayload()
+            readStartTime = datetime.now(pytz.utc)
 
-        return encPayloadByChunkKey
+        if objects:
+            yield lastChunkKey, encode(lastChunkKey, objects)
 
     finally:
-        session.close()
+        results.close()
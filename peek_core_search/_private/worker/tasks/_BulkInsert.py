@@ -0,0 +1,90 @@
+import logging
+from io import StringIO
+from typing import Any, Dict, List
+from uuid import uuid4
+
+from sqlalchemy import Table
+from sqlalchemy.dialects import postgresql
+
+logger = logging.getLogger(__name__)
+
+#: Batches smaller than this are inserted with an executemany insert,
+# the COPY and staging table overhead isn't worth it for them.
+COPY_MIN_ROWS = 2000
+
+
+def bulkInsert(conn, table: Table, rows: List[Dict[str, Any]],
+               onConflictDoNothing: bool = False) -> None:
+    """ Bulk Insert
+
+    Insert large batches with PostgreSQL COPY into a staging table, then merge them
+    into the table with one INSERT ... SELECT.
+
+    The staging table is dropped when the transaction commits, so this must be
+    called within the callers transaction.
+
+    :param conn: The SQLAlchemy connection, with a transaction started
+    :param table: The table to insert into
+    :param rows: The rows to insert, all rows must have the same keys
+    :param onConflictDoNothing: Skip rows that violate a unique constraint.
+    """
+    if not rows:
+        return
+
+    if len(rows) < COPY_MIN_ROWS:
+        if onConflictDoNothing:
+            conn.execute(postgresql.insert(table).on_conflict_do_nothing(), rows)
+        else:
+            conn.execute(table.insert(), rows)
+        return
+
+    columnNames = [c.name for c in table.columns if c.name in rows[0]]
+    quotedColumns = ', '.join(['"%s"' % name for name in columnNames])
+
+    tableName = '"%s"."%s"' % (table.schema, table.name)
+    stagingName = '"_copy_%s_%s"' % (table.name, uuid4().hex[:8])
+
+    buffer = StringIO()
+    for row in rows:
+        buffer.write('\t'.join([_copyValue(row[name]) for name in columnNames]))
+        buffer.write('\n')
+    buffer.seek(0)
+
+    cursor = conn.connection.cursor()
+    try:
+        cursor.execute('CREATE TEMP TABLE %s (LIKE %s INCLUDING DEFAULTS)'
+                       ' ON COMMIT DROP' % (stagingName, tableName))
+
+        cursor.copy_expert('COPY %s (%s) FROM STDIN' % (stagingName, quotedColumns),
+                           buffer)
+
+        cursor.execute('INSERT INTO %s (%s) SELECT %s FROM %s%s'
+                       % (tableName, quotedColumns, quotedColumns, stagingName,
+                          ' ON CONFLICT DO NOTHING' if onConflictDoNothing else ''))
+
+        logger.debug("Copied %s rows into %s", len(rows), table.name)
+
+    finally:
+        cursor.close()
+
+
+def _copyValue(value: Any) -> str:
+    """ Copy Value
+
+    Format a value for the COPY text format.
+
+    """
+    if value is None:
+        return '\\N'
+
+    if value is True:
+        return 't'
+
+    if value is False:
+        return 'f'
+
+    return (str(value)
+            .replace('\\', '\\\\')
+            .replace('\t', '\\t')
+            .replace('\n', '\\n')
+            .replace('\r', '\\r'))
@@ -0,0 +1,48 @@
+from sqlalchemy.dialects import postgresql
+from twisted.trial import unittest
+
+from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.worker.tasks._BulkInsert import bulkInsert, \
+    COPY_MIN_ROWS
+
+
+class _Cursor:
+    def __init__(self, sql):
+        self._sql = sql
+
+    def execute(self, sql):
+        self._sql.append(sql)
+
+    def copy_expert(self, sql, buffer):
+        self._sql.append(sql)
+
+    def close(self):
+        pass
+
+
+class _Conn:
+    def __init__(self):
+        self.sql = []
+        self.connection = self
+
+    def execute(self, stmt, rows):
+        self.sql.append(str(stmt.compile(dialect=postgresql.dialect())))
+
+    def cursor(self):
+        return _Cursor(self.sql)
+
+
+class BulkInsertTest(unittest.TestCase):
+    def _insert(self, rowCount, onConflictDoNothing):
+        rows = [dict(id=i, chunkKey=1, keyword='kw', propertyName='name', objectId=i)
+                for i in range(rowCount)]
+
+        conn = _Conn()
+        bulkInsert(conn, SearchIndex.__table__, rows,
+                   onConflictDoNothing=onConflictDoNothing)
+        return conn.sql[-1]
+
+    def testOnConflictDoNothing(self):
+        for rowCount in (1, COPY_MIN_ROWS - 1, COPY_MIN_ROWS):
+            self.assertIn('ON CONFLICT DO NOTHING', self._insert(rowCount, True))
+            self.assertNotIn('ON CONFLICT', self._insert(rowCount, False))
@@ -1,17 +1,30 @@
 import logging
+from typing import Dict, Iterable, List
 
 logger = logging.getLogger(__name__)
 
+#: The default bucket counts, the counts in use are stored in SearchChunkFormat
 INDEX_BUCKET_COUNT = 8192
 OBJECT_BUCKET_COUNT = 8192
 
+#: The most sub buckets an oversized index chunk is split into
+MAX_SUB_BUCKET_COUNT = 1024
 
-def makeSearchIndexChunkKey(key: str) -> int:
+#: The most keyword hashes makeSearchIndexChunkKeys keeps
+KEYWORD_HASH_CACHE_SIZE = 200000
+
+_keywordHashByKey: Dict[str, int] = {}
+
+
+def makeSearchIndexChunkKey(key: str, bucketCount: int = INDEX_BUCKET_COUNT) -> int:
     """ Make Chunk Key
 
     This is simple, and provides a reasonable distribution
 
+    This MUST MATCH core_search.search_index_chunk_key in the database.
+
     :param key:
+    :param bucketCount: The number of index chunk keys, a power of two
 
     :return: chunkKey
 
@@ -25,17 +38,61 @@ def makeSearchIndexChunkKey(key: str) -> int:
         bucket = ((bucket << 5) - bucket) + ord(char)
         bucket = bucket | 0  # This is in the javascript code.
 
-    bucket = bucket & (INDEX_BUCKET_COUNT - 1)
+    bucket = bucket & (bucketCount - 1)
 
     return bucket
 
 
-def makeSearchObjectChunkKey(key: int) -> int:
+def makeSearchIndexChunkKeys(keys: Iterable[str],
+                             bucketCount: int = INDEX_BUCKET_COUNT) -> List[int]:
+    """ Make Chunk Keys
+
+    The batch version of makeSearchIndexChunkKey, for all the keywords of an import
+    or a search, it returns the same chunk keys.
+
+    The same keywords are hashed over and over, the trigrams especially, so the hash
+    of each keyword is kept, and masked to the chunk key for the bucket count.
+    Only the low 32 bits are kept while hashing, that is all the javascript keeps,
+    and all the mask needs.
+
+    :param keys: The keywords
+    :param bucketCount: The number of index chunk keys, a power of two
+
+    :return: The chunkKey of each keyword, in the same order
+
+    """
+    keywordHashByKey = _keywordHashByKey
+    if len(keywordHashByKey) > KEYWORD_HASH_CACHE_SIZE:
+        keywordHashByKey.clear()
+
+    mask = bucketCount - 1
+    chunkKeys = []
+
+    for key in keys:
+        bucket = keywordHashByKey.get(key)
+
+        if bucket is None:
+            if not key:
+                raise Exception("key is None or zero length")
+
+            bucket = 0
+            for char in key:
+                bucket = (bucket * 31 + ord(char)) & 0xFFFFFFFF
+
+            keywordHashByKey[key] = bucket
+
+        chunkKeys.append(bucket & mask)
+
+    return chunkKeys
+
+
+def makeSearchObjectChunkKey(key: int, bucketCount: int = OBJECT_BUCKET_COUNT) -> int:
     """ Make Chunk Key
 
     This is simple, and provides a reasonable distribution
 
     :param key:
+    :param bucketCount: The number of object chunk keys, a power of two
 
     :return: chunkKey
 
@@ -44,6 +101,111 @@ def makeSearchObjectChunkKey(key: int) -> int:
     if key is None:
         raise Exception("key is None")
 
-    bucket = key & (OBJECT_BUCKET_COUNT - 1)
+    bucket = key & (bucketCount - 1)
 
     return bucket
+
+
+def isValidBucketCount(bucketCount: int) -> bool:
+    """ Is Valid Bucket Count
+
+    The chunk keys are masked from the hash, so the count must be a power of two.
+
+    """
+    return (isinstance(bucketCount, int) and 1 < bucketCount <= (1 << 30)
+            and bucketCount & (bucketCount - 1) == 0)
+
+
+def rekeySourceChunkKeys(chunkKeys: Iterable[int], fromBucketCount: int,
+                         toBucketCount: int) -> List[int]:
+    """ Re-key Source Chunk Keys
+
+    The bucket counts are powers of two, so a chunk key keeps the low bits of the
+    hash. The rows of a chunk keyed with toBucketCount are in the chunks keyed
+    with fromBucketCount that share the low bits of the smaller count.
+
+    :param chunkKeys: The chunk keys, keyed with toBucketCount
+    :return: The chunk keys keyed with fromBucketCount, that hold their rows
+    """
+    return rekeyTargetChunkKeys(chunkKeys, toBucketCount, fromBucketCount)
+
+
+def rekeyTargetChunkKeys(chunkKeys: Iterable[int], fromBucketCount: int,
+                         toBucketCount: int) -> List[int]:
+    """ Re-key Target Chunk Keys
+
+    :param chunkKeys: The chunk keys, keyed with fromBucketCount
+    :return: The chunk keys keyed with toBucketCount, that their rows can move to
+    """
+    lowMask = min(fromBucketCount, toBucketCount) - 1
+    step = lowMask + 1
+
+    targets = set()
+    for chunkKey in chunkKeys:
+        targets.update(range(chunkKey & lowMask, toBucketCount, step))
+
+    return sorted(targets)
+
+
+def makeSearchIndexSubBucket(key: str, subBucketCount: int) -> int:
+    """ Make Search Index Sub Bucket
+
+    The keywords of an index chunk share the low bits of makeSearchIndexChunkKey,
+    so the sub bucket of a keyword in a split chunk comes from another hash, an
+    FNV-1a hash with the murmur3 finaliser, so the low bits depend on every char.
+
+    This MUST MATCH keywordSubBucket in PrivateSearchIndexLoaderService.ts
+
+    :param key: The keyword
+    :param subBucketCount: The number of sub buckets, a power of two
+
+    :return: subBucket
+
+    """
+    bucket = 0x811C9DC5
+    for char in key:
+        bucket = ((bucket ^ ord(char)) * 0x01000193) & 0xFFFFFFFF
+
+    bucket ^= bucket >> 16
+    bucket = (bucket * 0x85EBCA6B) & 0xFFFFFFFF
+    bucket ^= bucket >> 13
+
+    return bucket & (subBucketCount - 1)
+
+
+def makeSearchIndexSplitChunkKey(chunkKey: int, subBucket: int,
+                                 bucketCount: int = INDEX_BUCKET_COUNT) -> int:
+    """ Make Search Index Split Chunk Key
+
+    The sub bucket chunks of a split chunk have negative chunk keys, so they never
+    clash with the chunk keys of the buckets.
+
+    This MUST MATCH keywordSplitChunk in PrivateSearchIndexLoaderService.ts
+
+    :param chunkKey: The chunk key of the split chunk
+    :param subBucket: The sub bucket from makeSearchIndexSubBucket
+    :param bucketCount: The number of index chunk keys
+
+    :return: chunkKey
+
+    """
+    return -1 - (subBucket * bucketCount + chunkKey)
+
+
+def searchIndexSplitChunkKeyBucket(splitChunkKey: int,
+                                   bucketCount: int = INDEX_BUCKET_COUNT) -> int:
+    """ Search Index Split Chunk Key Bucket
+
+    :return: The chunk key of the split chunk that a sub bucket chunk belongs to,
+        the reverse of makeSearchIndexSplitChunkKey
+    """
+    return (-1 - splitChunkKey) & (bucketCount - 1)
+
+
+def maxSubBucketCount(bucketCount: int) -> int:
+    """ Max Sub Bucket Count
+
+    The split chunk keys must fit in the 32bit chunkKey column.
+
+    """
+    return min(MAX_SUB_BUCKET_COUNT, (1 << 31) // bucketCount)
@@ -0,0 +1,62 @@
+from twisted.trial import unittest
+
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    makeSearchIndexChunkKey, makeSearchIndexChunkKeys, isValidBucketCount, rekeySourceChunkKeys, \
+    rekeyTargetChunkKeys, makeSearchIndexSubBucket, makeSearchIndexSplitChunkKey, \
+    searchIndexSplitChunkKeyBucket, maxSubBucketCount
+
+
+class CalcChunkKeyTest(unittest.TestCase):
+    KEYWORDS = ['^abc', 'xyz$', 'héllo', '^a', 'z' * 40, '日本語']
+
+    def testValidBucketCount(self):
+        for count in (2, 1024, 8192, 1 << 30):
+            self.assertTrue(isValidBucketCount(count))
+
+        for count in (None, 0, 1, 1000, 8192.0, 1 << 31):
+            self.assertFalse(isValidBucketCount(count))
+
+    def testRekeyMatchesHash(self):
+        for fromCount, toCount in ((8192, 16384), (8192, 1024), (64, 64)):
+            for keyword in self.KEYWORDS:
+                fromKey = makeSearchIndexChunkKey(keyword, fromCount)
+                toKey = makeSearchIndexChunkKey(keyword, toCount)
+
+                self.assertIn(toKey, rekeyTargetChunkKeys([fromKey],
+                                                          fromCount, toCount))
+                self.assertIn(fromKey, rekeySourceChunkKeys([toKey],
+                                                            fromCount, toCount))
+
+    def testChunkKeysMatchChunkKey(self):
+        for bucketCount in (2, 8192, 1 << 30):
+            expected = [makeSearchIndexChunkKey(k, bucketCount) for k in self.KEYWORDS]
+
+            # The second time the hashes are cached
+            for _ in range(2):
+                self.assertEqual(expected,
+                                 makeSearchIndexChunkKeys(self.KEYWORDS, bucketCount))
+
+        self.assertRaises(Exception, makeSearchIndexChunkKeys, ['abc', ''])
+
+    def testRekeyChunkKeys(self):
+        self.assertEqual([3, 11], rekeyTargetChunkKeys([3], 8, 16))
+        self.assertEqual([3], rekeyTargetChunkKeys([3, 11], 16, 8))
+        self.assertEqual([3, 11], rekeySourceChunkKeys([3], 16, 8))
+
+    def testSubBucket(self):
+        # These match keywordSubBucket in PrivateSearchIndexLoaderService.ts
+        self.assertEqual([640, 796, 989, 873, 970],
+                         [makeSearchIndexSubBucket(k, 1024)
+                          for k in ['^abc', 'xyz$', 'héllo', '^a', '日本語']])
+
+    def testSplitChunkKey(self):
+        for bucketCount in (4, 8192, 1 << 30):
+            maxCount = maxSubBucketCount(bucketCount)
+            for chunkKey in (0, bucketCount - 1):
+                for subBucket in (0, maxCount - 1):
+                    splitChunkKey = makeSearchIndexSplitChunkKey(chunkKey, subBucket,
+                                                                 bucketCount)
+                    self.assertLess(splitChunkKey, 0)
+                    self.assertGreaterEqual(splitChunkKey, -(1 << 31))
+                    self.assertEqual(chunkKey, searchIndexSplitChunkKeyBucket(
+                        splitChunkKey, bucketCount))
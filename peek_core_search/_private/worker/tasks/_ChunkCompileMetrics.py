@@ -0,0 +1,94 @@
+from collections import defaultdict
+from typing import Dict, Iterable, List
+
+
+class ChunkCompileMetrics:
+    """ Chunk Compile Metrics
+
+    Collect the metrics of each chunk that a compiler task compiles, they are
+    returned to the server with the compiled chunk keys.
+
+    The DB reads are streamed and the DB writes are batched, so their times are
+    shared between the chunks, by rows read and by encoded bytes.
+
+    """
+
+    def __init__(self):
+        self._rowsRead: Dict[int, int] = defaultdict(int)
+        self._encodeSeconds: Dict[int, float] = defaultdict(float)
+        self._encodedBytes: Dict[int, int] = defaultdict(int)
+        self._dbReadSeconds: Dict[int, float] = defaultdict(float)
+        self._dbWriteSeconds: Dict[int, float] = defaultdict(float)
+        self._hashMatched = set()
+        self._chunkKeys = set()
+
+    def addRead(self, rowCountByChunkKey: Dict[int, int], seconds: float) -> None:
+        """ Add Read
+
+        :param rowCountByChunkKey: The rows read for each chunk
+        :param seconds: The time taken to read all the rows
+        """
+        for chunkKey, rowCount in rowCountByChunkKey.items():
+            self._rowsRead[chunkKey] += rowCount
+
+        self.addReadSeconds(rowCountByChunkKey, seconds)
+
+    def addReadSeconds(self, rowCountByChunkKey: Dict[int, int],
+                       seconds: float) -> None:
+        """ Add Read Seconds
+
+        The same as addRead, for queries that aggregate the rows in the database,
+        the rows aren't counted as read.
+
+        """
+        totalRows = sum(rowCountByChunkKey.values())
+        for chunkKey, rowCount in rowCountByChunkKey.items():
+            self._chunkKeys.add(chunkKey)
+            if totalRows:
+                self._dbReadSeconds[chunkKey] += seconds * rowCount / totalRows
+
+    def addEncode(self, chunkKey: int, seconds: float, encodedBytes: int) -> None:
+        self._chunkKeys.add(chunkKey)
+        self._encodeSeconds[chunkKey] += seconds
+        self._encodedBytes[chunkKey] = encodedBytes
+
+    def setHashMatched(self, chunkKey: int) -> None:
+        self._chunkKeys.add(chunkKey)
+        self._hashMatched.add(chunkKey)
+
+    def addWrite(self, chunkKeys: Iterable[int], seconds: float) -> None:
+        """ Add Write
+
+        :param chunkKeys: The chunks that were written or deleted
+        :param seconds: The time taken to write all the chunks
+        """
+        chunkKeys = list(chunkKeys)
+        if not chunkKeys:
+            return
+
+        totalBytes = sum([self._encodedBytes.get(k, 0) for k in chunkKeys])
+        for chunkKey in chunkKeys:
+            self._chunkKeys.add(chunkKey)
+            if totalBytes:
+                share = self._encodedBytes.get(chunkKey, 0) / totalBytes
+            else:
+                share = 1 / len(chunkKeys)
+            self._dbWriteSeconds[chunkKey] += seconds * share
+
+    def toList(self) -> List[List]:
+        """ To List
+
+        :return: A list of [chunkKey, rowsRead, encodeSeconds, encodedBytes,
+            hashMatched, dbReadSeconds, dbWriteSeconds] for each chunk.
+            hashMatched is True when the chunk was unchanged and wasn't written.
+        """
+        return [
+            [chunkKey,
+             self._rowsRead.get(chunkKey, 0),
+             round(self._encodeSeconds.get(chunkKey, 0.0), 6),
+             self._encodedBytes.get(chunkKey, 0),
+             chunkKey in self._hashMatched,
+             round(self._dbReadSeconds.get(chunkKey, 0.0), 6),
+             round(self._dbWriteSeconds.get(chunkKey, 0.0), 6)]
+            for chunkKey in sorted(self._chunkKeys)
+        ]
@@ -0,0 +1,121 @@
+from typing import Callable, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy import select, func, and_, literal
+from sqlalchemy.sql import ColumnElement
+
+from peek_core_search._private.storage.SearchChunkFormatTuple import \
+    SearchChunkFormatTuple
+from peek_core_search._private.storage.Setting import Setting, SettingProperty, \
+    KEYWORD_CHUNK_MAX_BYTES
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    rekeySourceChunkKeys
+
+
+class ChunkRekey(NamedTuple):
+    """ Chunk Re-key
+
+    The bucket counts of a re-key, the rows are stored keyed with fromBucketCount
+    and are compiled into chunks keyed with toBucketCount.
+
+    """
+    fromBucketCount: int
+    toBucketCount: int
+
+
+def loadBucketCounts(conn, lockForImport: bool = False) -> Tuple[int, int]:
+    """ Load Bucket Counts
+
+    :param conn: The SQLAlchemy connection, with a transaction started
+    :param lockForImport: Share lock the format row until the transaction ends,
+        a re-key switch waits for the importers holding it, so rows are never keyed
+        with a count that has been switched out.
+    :return: A tuple of (the index bucket count, the object bucket count)
+    """
+    formatTable = SearchChunkFormatTuple.__table__
+
+    sql = select([formatTable.c.indexBucketCount, formatTable.c.objectBucketCount])
+    if lockForImport:
+        sql = sql.with_for_update(read=True)
+
+    row = conn.execute(sql).fetchone()
+    return row.indexBucketCount, row.objectBucketCount
+
+
+def loadKeywordChunkMaxBytes(conn) -> int:
+    """ Load Keyword Chunk Max Bytes
+
+    :param conn: The SQLAlchemy connection
+    :return: The KEYWORD_CHUNK_MAX_BYTES global setting, zero if splitting is
+        disabled
+    """
+    settingTable = Setting.__table__
+    propertyTable = SettingProperty.__table__
+
+    row = conn.execute(select(
+        columns=[propertyTable.c.int_value],
+        from_obj=[propertyTable.join(settingTable,
+                                     settingTable.c.id == propertyTable.c.settingId)],
+        whereclause=and_(settingTable.c.name == "Global",
+                         propertyTable.c.key == KEYWORD_CHUNK_MAX_BYTES.name)
+    )).fetchone()
+
+    # The server adds the setting when it starts
+    if row is None or row.int_value is None:
+        return KEYWORD_CHUNK_MAX_BYTES.defaultValue
+
+    return max(row.int_value, 0)
+
+
+def searchIndexChunkKeyExpr(keywordColumn, bucketCount: int) -> ColumnElement:
+    """ Search Index Chunk Key SQL Expression
+
+    :return: The SQL equivalent of makeSearchIndexChunkKey
+    """
+    return func.core_search.search_index_chunk_key(keywordColumn, bucketCount)
+
+
+def searchIndexSplitChunkKeyBucketExpr(chunkKeyColumn,
+                                       bucketCount: int) -> ColumnElement:
+    """ Search Index Split Chunk Key Bucket SQL Expression
+
+    :return: The SQL equivalent of searchIndexSplitChunkKeyBucket, only valid for the
+        negative chunk keys
+    """
+    return (literal(-1) - chunkKeyColumn).op('&')(bucketCount - 1)
+
+
+def searchObjectChunkKeyExpr(idColumn, bucketCount: int) -> ColumnElement:
+    """ Search Object Chunk Key SQL Expression
+
+    :return: The SQL equivalent of makeSearchObjectChunkKey
+    """
+    return idColumn.op('&')(bucketCount - 1)
+
+
+def selectChunkKeys(chunkKeyColumn, makeChunkKeyExpr: Callable[[int], ColumnElement],
+                    chunkKeys: List[int], rekey: Optional[ChunkRekey] = None
+                    ) -> Tuple[ColumnElement, ColumnElement]:
+    """ Select Chunk Keys
+
+    Select the rows of chunks, by their stored chunk key, or by the chunk key they
+    will have after a re-key.
+
+    A re-keyed chunk key is computed in SQL, the rows are still found through the
+    chunkKey index, from the stored chunks that can hold them.
+
+    :param chunkKeyColumn: The chunkKey column of the SearchIndex or SearchObject
+    :param makeChunkKeyExpr: Returns the chunk key SQL expression for a bucket count
+    :param chunkKeys: The chunk keys to select
+    :param rekey: The bucket counts to re-key with, None for the stored chunk keys
+    :return: A tuple of (the chunk key column to select and order by,
+        the where clause)
+    """
+    if not rekey or rekey.fromBucketCount == rekey.toBucketCount:
+        return chunkKeyColumn, chunkKeyColumn.in_(chunkKeys)
+
+    chunkKeyExpr = makeChunkKeyExpr(rekey.toBucketCount)
+    sourceChunkKeys = rekeySourceChunkKeys(chunkKeys, rekey.fromBucketCount,
+                                           rekey.toBucketCount)
+
+    return (chunkKeyExpr.label('chunkKey'),
+            and_(chunkKeyColumn.in_(sourceChunkKeys), chunkKeyExpr.in_(chunkKeys)))
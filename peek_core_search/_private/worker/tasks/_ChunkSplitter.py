@@ -0,0 +1,148 @@
+import logging
+from collections import defaultdict
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import and_
+from sqlalchemy.sql import ColumnElement
+
+from peek_core_search._private.worker.tasks.ChunkEnvelope import wrapChunk, \
+    CHUNK_CODEC_NONE
+from peek_core_search._private.worker.tasks.SearchIndexChunkCodec import \
+    encodeSearchIndexSplitChunk
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    makeSearchIndexSubBucket, makeSearchIndexSplitChunkKey, \
+    searchIndexSplitChunkKeyBucket, maxSubBucketCount
+from peek_core_search._private.worker.tasks._ChunkFormat import ChunkRekey, \
+    loadBucketCounts, loadKeywordChunkMaxBytes, searchIndexSplitChunkKeyBucketExpr
+
+logger = logging.getLogger(__name__)
+
+ObjIdsByPropByKw = Dict[str, Dict[str, List[int]]]
+
+
+class SearchIndexChunkSplitter:
+    """ Search Index Chunk Splitter
+
+    A few chunk keys hold far more keywords than the rest, a chunk that encodes
+    larger than the keyword chunk byte budget is split by keyword into sub bucket
+    chunks.
+
+    The chunk is then stored as a split chunk, that only holds the number of sub
+    buckets, the clients look up a keywords sub bucket chunk from that.
+
+    The split is decided each time the chunk is compiled, from the size it encodes
+    to, so a chunk that shrinks back under the budget is stored whole again.
+
+    """
+
+    def __init__(self, bucketCount: int, maxChunkBytes: int):
+        """
+        :param bucketCount: The index bucket count the chunks are keyed with
+        :param maxChunkBytes: The byte budget of an encoded chunk, zero to never
+            split chunks
+        """
+        self._bucketCount = bucketCount
+        self._maxChunkBytes = maxChunkBytes
+
+    @classmethod
+    def load(cls, conn, rekey: Optional[ChunkRekey] = None,
+             lockForImport: bool = False) -> 'SearchIndexChunkSplitter':
+        """ Load
+
+        :param rekey: Split the chunks keyed with the new bucket count of a re-key
+        :param lockForImport: See loadBucketCounts
+        """
+        if rekey:
+            bucketCount = rekey.toBucketCount
+        else:
+            bucketCount = loadBucketCounts(conn, lockForImport=lockForImport)[0]
+
+        return cls(bucketCount, loadKeywordChunkMaxBytes(conn))
+
+    def chunkKeyOf(self, chunkKey: int) -> int:
+        """ Chunk Key Of
+
+        :return: The chunk key of the split chunk a sub bucket chunk belongs to, or
+            the chunk key if it's not a sub bucket chunk
+        """
+        if chunkKey >= 0:
+            return chunkKey
+        return searchIndexSplitChunkKeyBucket(chunkKey, self._bucketCount)
+
+    def subBucketChunkKeysWhere(self, chunkKeyColumn,
+                                chunkKeys: Iterable[int]) -> ColumnElement:
+        """ Sub Bucket Chunk Keys Where
+
+        :return: A where clause for the sub bucket chunks of the chunk keys
+        """
+        return and_(chunkKeyColumn < 0,
+                    searchIndexSplitChunkKeyBucketExpr(chunkKeyColumn, self._bucketCount)
+                    .in_(list(chunkKeys)))
+
+    def isOversized(self, encodedData: bytes) -> bool:
+        return bool(self._maxChunkBytes) and len(encodedData) > self._maxChunkBytes
+
+    def encodeChunk(self, chunkKey: int, objIdsByPropByKw: ObjIdsByPropByKw,
+                    encode: Callable[[ObjIdsByPropByKw], bytes]
+                    ) -> List[Tuple[int, bytes]]:
+        """ Encode Chunk
+
+        :param chunkKey: The chunk key of the chunk
+        :param objIdsByPropByKw: The keywords of the chunk
+        :param encode: Encodes the keywords of a chunk
+        :return: A list of (chunkKey, encodedData), the chunk, or the split chunk
+            then its sub bucket chunks
+        """
+        encodedData = encode(objIdsByPropByKw)
+
+        if not self.isOversized(encodedData) or len(objIdsByPropByKw) < 2:
+            return [(chunkKey, encodedData)]
+
+        maxCount = maxSubBucketCount(self._bucketCount)
+
+        # Start with enough sub buckets for an even split, then double them until
+        # every sub bucket fits, or only holds one keyword.
+        subBucketCount = 2
+        while (subBucketCount < maxCount
+               and subBucketCount * self._maxChunkBytes < len(encodedData)):
+            subBucketCount *= 2
+
+        while True:
+            objIdsByPropByKwBySubBucket = defaultdict(dict)
+            for keyword, objIdsByProp in objIdsByPropByKw.items():
+                subBucket = makeSearchIndexSubBucket(keyword, subBucketCount)
+                objIdsByPropByKwBySubBucket[subBucket][keyword] = objIdsByProp
+
+            encodedDataBySubBucket = {
+                subBucket: encode(subObjIdsByPropByKw)
+                for subBucket, subObjIdsByPropByKw
+                in objIdsByPropByKwBySubBucket.items()
+            }
+
+            oversizedSubBuckets = [
+                subBucket for subBucket, subEncodedData
+                in encodedDataBySubBucket.items()
+                if len(subEncodedData) > self._maxChunkBytes
+                   and len(objIdsByPropByKwBySubBucket[subBucket]) > 1
+            ]
+
+            if not oversizedSubBuckets or subBucketCount >= maxCount:
+                break
+
+            subBucketCount *= 2
+
+        if oversizedSubBuckets:
+            logger.warning("Chunk %s is still over the %s byte budget when split"
+                           " into %s sub buckets",
+                           chunkKey, self._maxChunkBytes, subBucketCount)
+
+        encodedChunks = [(chunkKey, wrapChunk(encodeSearchIndexSplitChunk(subBucketCount),
+                                              CHUNK_CODEC_NONE))]
+
+        for subBucket, subEncodedData in sorted(encodedDataBySubBucket.items()):
+            encodedChunks.append((
+                makeSearchIndexSplitChunkKey(chunkKey, subBucket, self._bucketCount),
+                subEncodedData
+            ))
+
+        return encodedChunks
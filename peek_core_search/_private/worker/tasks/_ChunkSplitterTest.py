@@ -0,0 +1,56 @@
+import json
+
+from twisted.trial import unittest
+
+from peek_core_search._private.worker.tasks.ChunkEnvelope import unwrapChunk
+from peek_core_search._private.worker.tasks.SearchIndexChunkCodec import \
+    searchIndexSplitChunkSubBucketCount
+from peek_core_search._private.worker.tasks._CalcChunkKey import \
+    makeSearchIndexSubBucket, makeSearchIndexSplitChunkKey
+from peek_core_search._private.worker.tasks._ChunkSplitter import \
+    SearchIndexChunkSplitter
+
+
+def _encode(objIdsByPropByKw) -> bytes:
+    return json.dumps(objIdsByPropByKw, sort_keys=True).encode()
+
+
+class SearchIndexChunkSplitterTest(unittest.TestCase):
+    CHUNK = {'kw%03d' % i: {'name': list(range(10))} for i in range(200)}
+
+    def testUnderBudget(self):
+        splitter = SearchIndexChunkSplitter(8192, 1024 * 1024)
+        self.assertEqual([(7, _encode(self.CHUNK))],
+                         splitter.encodeChunk(7, self.CHUNK, _encode))
+
+    def testSplitDisabled(self):
+        splitter = SearchIndexChunkSplitter(8192, 0)
+        self.assertEqual(1, len(splitter.encodeChunk(7, self.CHUNK, _encode)))
+
+    def testSplit(self):
+        splitter = SearchIndexChunkSplitter(8192, 1024)
+        encodedChunks = splitter.encodeChunk(7, self.CHUNK, _encode)
+
+        chunkKey, splitData = encodedChunks[0]
+        self.assertEqual(7, chunkKey)
+        subBucketCount = searchIndexSplitChunkSubBucketCount(unwrapChunk(splitData))
+        self.assertGreaterEqual(subBucketCount, 8)
+
+        keywords = set()
+        for chunkKey, encodedData in encodedChunks[1:]:
+            self.assertLessEqual(len(encodedData), 1024)
+            self.assertEqual(7, splitter.chunkKeyOf(chunkKey))
+
+            for keyword in json.loads(encodedData):
+                subBucket = makeSearchIndexSubBucket(keyword, subBucketCount)
+                self.assertEqual(chunkKey,
+                                 makeSearchIndexSplitChunkKey(7, subBucket, 8192))
+                keywords.add(keyword)
+
+        self.assertEqual(set(self.CHUNK), keywords)
+
+    def testOneKeywordIsNotSplit(self):
+        splitter = SearchIndexChunkSplitter(8192, 16)
+        chunk = {'kw': {'name': list(range(100))}}
+        self.assertEqual([(7, _encode(chunk))],
+                         splitter.encodeChunk(7, chunk, _encode))
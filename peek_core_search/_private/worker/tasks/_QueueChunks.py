@@ -0,0 +1,103 @@
+import logging
+from typing import Iterable, List
+
+from sqlalchemy import Table, text, tuple_, func, select, true
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Select
+
+logger = logging.getLogger(__name__)
+
+#: The priority of chunks queued by bulk work, imports, removes and rebuilds
+QUEUE_PRIORITY_BULK = 0
+
+#: The priority of chunks queued by interactive imports, these are compiled first
+QUEUE_PRIORITY_INTERACTIVE = 1
+
+
+def queueChunkKeys(conn, queueTable: Table, chunkKeys: Iterable[int],
+                   priority: int = QUEUE_PRIORITY_BULK) -> None:
+    """ Queue Chunk Keys
+
+    Insert the chunk keys into a compiler queue, the queue only has one row for each
+    chunk key. If a chunk is already queued, its generation is incremented instead,
+    and it keeps the higher of the two priorities.
+
+    The queue rows stay locked until the transaction ends, call this as close to the
+    commit as possible. The chunk keys are sorted, so two transactions always lock
+    the same rows in the same order.
+
+    :param conn: The SQLAlchemy connection, with a transaction started
+    :param queueTable: SearchIndexCompilerQueue or SearchObjectCompilerQueue
+    :param chunkKeys: The chunk keys to queue
+    :param priority: QUEUE_PRIORITY_BULK or QUEUE_PRIORITY_INTERACTIVE
+    """
+    chunkKeys = sorted(set(chunkKeys))
+    if not chunkKeys:
+        return
+
+    conn.execute(
+        _upsert(postgresql.insert(queueTable)
+                .values([dict(chunkKey=chunkKey, priority=priority)
+                         for chunkKey in chunkKeys]),
+                queueTable)
+    )
+
+
+def queueChunkKeysFromSelect(conn, queueTable: Table, chunkKeysSelect: Select,
+                             rebuild: bool = False) -> None:
+    """ Queue Chunk Keys From Select
+
+    The same as queueChunkKeys, for chunk keys selected in the database. The chunks
+    are queued with QUEUE_PRIORITY_BULK.
+
+    :param chunkKeysSelect: A select or union of one chunkKey column, it must not
+        return the same chunk key twice.
+    :param rebuild: Rebuild the chunks instead of patching them, for
+        SearchIndexCompilerQueue only. The flag stays set until they are compiled.
+    """
+    columnNames = ['chunkKey']
+
+    if rebuild:
+        chunkKeys = chunkKeysSelect.alias('chunkKeys')
+        chunkKeysSelect = select(columns=[chunkKeys.c.chunkKey, true()])
+        columnNames.append('rebuild')
+
+    conn.execute(
+        _upsert(postgresql.insert(queueTable)
+                .from_select(columnNames, chunkKeysSelect.order_by(text('1'))),
+                queueTable)
+    )
+
+
+def deleteCompiledQueueItems(conn, queueTable: Table, queueItems: List) -> None:
+    """ Delete Compiled Queue Items
+
+    Delete the queue rows that were compiled. Rows that were queued again while
+    they were compiled have a new generation, they are left in the queue to be
+    compiled again.
+
+    :param queueItems: The SearchIndexCompilerQueue or SearchObjectCompilerQueue
+        tuples that were compiled
+    """
+    if not queueItems:
+        return
+
+    result = conn.execute(queueTable.delete(
+        tuple_(queueTable.c.id, queueTable.c.generation)
+            .in_([(item.id, item.generation) for item in queueItems])
+    ))
+
+    if result.rowcount != len(queueItems):
+        logger.debug("%s %s chunks were queued again while they were compiled",
+                     len(queueItems) - result.rowcount, queueTable.name)
+
+
+def _upsert(stmt, queueTable: Table):
+    set_ = dict(generation=queueTable.c.generation + 1,
+                priority=func.greatest(queueTable.c.priority, stmt.excluded.priority))
+
+    if 'rebuild' in queueTable.c:
+        set_['rebuild'] = queueTable.c.rebuild | stmt.excluded.rebuild
+
+    return stmt.on_conflict_do_update(index_elements=[queueTable.c.chunkKey],
+                                      set_=set_)
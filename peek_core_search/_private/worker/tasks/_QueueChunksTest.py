@@ -0,0 +1,44 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from twisted.trial import unittest
+
+from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexCompilerQueue import \
+    SearchIndexCompilerQueue
+from peek_core_search._private.storage.SearchObjectCompilerQueue import \
+    SearchObjectCompilerQueue
+from peek_core_search._private.worker.tasks._QueueChunks import \
+    queueChunkKeysFromSelect, queueChunkKeys
+
+
+class _Conn:
+    def __init__(self):
+        self.sql = []
+
+    def execute(self, stmt):
+        self.sql.append(str(stmt.compile(dialect=postgresql.dialect())))
+
+
+class QueueChunksTest(unittest.TestCase):
+    def _queueFromSelect(self, queueTable, **kwargs):
+        indexTable = SearchIndex.__table__
+        conn = _Conn()
+        queueChunkKeysFromSelect(conn, queueTable,
+                                 select(columns=[indexTable.c.chunkKey]), **kwargs)
+        return conn.sql[0]
+
+    def testQueueRebuild(self):
+        sql = self._queueFromSelect(SearchIndexCompilerQueue.__table__, rebuild=True)
+        self.assertIn('("chunkKey", rebuild) SELECT "chunkKeys"."chunkKey", true', sql)
+
+        # A chunk queued to be rebuilt stays queued to be rebuilt
+        self.assertIn('rebuild = (core_search."SearchIndexCompilerQueue".rebuild'
+                      ' OR excluded.rebuild)', sql)
+
+    def testQueueWithoutRebuild(self):
+        sql = self._queueFromSelect(SearchIndexCompilerQueue.__table__)
+        self.assertIn('("chunkKey") SELECT', sql)
+
+        conn = _Conn()
+        queueChunkKeys(conn, SearchObjectCompilerQueue.__table__, [1, 2])
+        self.assertNotIn('rebuild', conn.sql[0])
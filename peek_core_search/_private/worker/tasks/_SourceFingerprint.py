@@ -0,0 +1,119 @@
+from typing import Dict, Iterable, List
+
+from sqlalchemy import Table, bindparam, select, text, literal
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Select
+
+#: Increment this when the chunk encoding changes, every chunk is then re-encoded
+# the next time it's compiled, even if its source rows haven't changed.
+SOURCE_FINGERPRINT_VERSION = 2
+
+
+def makeSourceFingerprint(sourceVersion: int) -> str:
+    """ Make Source Fingerprint
+
+    :param sourceVersion: The version of a chunks source rows, from
+        SearchIndexChunkVersion or SearchObjectChunkVersion
+    :return: The fingerprint to store in the sourceFingerprint column
+    """
+    return '%s:%s' % (SOURCE_FINGERPRINT_VERSION, sourceVersion)
+
+
+def bumpSourceVersions(conn, versionTable: Table, chunkKeys: Iterable[int]) -> None:
+    """ Bump Source Versions
+
+    Increment the source versions of the chunks, call this in the transaction that
+    changes their source rows, so the compiler doesn't skip them.
+
+    The version rows stay locked until the transaction ends. The chunk keys are
+    sorted, so two transactions always lock the same rows in the same order.
+
+    :param conn: The SQLAlchemy connection, with a transaction started
+    :param versionTable: SearchIndexChunkVersion or SearchObjectChunkVersion
+    :param chunkKeys: The chunk keys of the changed chunks
+    """
+    chunkKeys = sorted(set(chunkKeys))
+    if not chunkKeys:
+        return
+
+    conn.execute(
+        _upsert(postgresql.insert(versionTable)
+                .values([dict(chunkKey=chunkKey, version=1)
+                         for chunkKey in chunkKeys]),
+                versionTable)
+    )
+
+
+def bumpSourceVersionsFromSelect(conn, versionTable: Table,
+                                 chunkKeysSelect: Select) -> None:
+    """ Bump Source Versions From Select
+
+    The same as bumpSourceVersions, for chunk keys selected in the database.
+
+    :param chunkKeysSelect: A select of one chunkKey column, it must not return the
+        same chunk key twice.
+    """
+    chunkKeys = chunkKeysSelect.alias('chunkKeys')
+    conn.execute(
+        _upsert(postgresql.insert(versionTable)
+                .from_select(['chunkKey', 'version'],
+                             select(columns=[chunkKeys.c.chunkKey, literal(1)])
+                             .order_by(text('1'))),
+                versionTable)
+    )
+
+
+def loadSourceFingerprints(conn, versionTable: Table,
+                           chunkKeys: List[int]) -> Dict[int, str]:
+    """ Load Source Fingerprints
+
+    Load the source version of each chunk, one primary key lookup per chunk.
+
+    Load these before the source rows are read, if the rows change after this, the
+    chunk is queued again and the fingerprint won't match.
+
+    :param versionTable: SearchIndexChunkVersion or SearchObjectChunkVersion
+    :return: The fingerprint of each chunk key, chunks that have never been bumped
+        are at version 0
+    """
+    if not chunkKeys:
+        return {}
+
+    versionByChunkKey = {chunkKey: 0 for chunkKey in chunkKeys}
+    versionByChunkKey.update(conn.execute(select(
+        columns=[versionTable.c.chunkKey, versionTable.c.version],
+        whereclause=versionTable.c.chunkKey.in_(chunkKeys)
+    )).fetchall())
+
+    return {chunkKey: makeSourceFingerprint(version)
+            for chunkKey, version in versionByChunkKey.items()}
+
+
+def updateSourceFingerprints(conn, compiledTable: Table,
+                             fingerprintByChunkKey: Dict[int, str]) -> None:
+    """ Update Source Fingerprints
+
+    Update only the fingerprints of chunks that were encoded to the same data, so
+    they are skipped next time, without rewriting their encoded data.
+
+    :param conn: The SQLAlchemy connection, with a transaction started
+    :param compiledTable: EncodedSearchIndexChunk or EncodedSearchObjectChunk
+    :param fingerprintByChunkKey: The new fingerprint of each chunk
+    """
+    if not fingerprintByChunkKey:
+        return
+
+    conn.execute(
+        compiledTable.update()
+            .where(compiledTable.c.chunkKey == bindparam('b_chunkKey'))
+            .values(sourceFingerprint=bindparam('b_sourceFingerprint')),
+        [dict(b_chunkKey=chunkKey, b_sourceFingerprint=fingerprint)
+         for chunkKey, fingerprint in sorted(fingerprintByChunkKey.items())]
+    )
+
+
+def _upsert(stmt, versionTable: Table):
+    return stmt.on_conflict_do_update(
+        index_elements=[versionTable.c.chunkKey],
+        set_=dict(version=versionTable.c.version + 1)
+    )
@@ -0,0 +1,53 @@
+from sqlalchemy import select
+from sqlalchemy.dialects import postgresql
+from twisted.trial import unittest
+
+from peek_core_search._private.storage.SearchIndex import SearchIndex
+from peek_core_search._private.storage.SearchIndexChunkVersion import \
+    SearchIndexChunkVersion
+from peek_core_search._private.worker.tasks._SourceFingerprint import \
+    bumpSourceVersions, bumpSourceVersionsFromSelect, loadSourceFingerprints, \
+    makeSourceFingerprint
+
+
+class _Conn:
+    def __init__(self, rows=()):
+        self.sql = []
+        self.rows = list(rows)
+
+    def execute(self, stmt):
+        self.sql.append(str(stmt.compile(dialect=postgresql.dialect())))
+        return self
+
+    def fetchall(self):
+        return self.rows
+
+
+class SourceFingerprintTest(unittest.TestCase):
+    def testBumpSourceVersions(self):
+        versionTable = SearchIndexChunkVersion.__table__
+
+        conn = _Conn()
+        bumpSourceVersions(conn, versionTable, [])
+        self.assertEqual([], conn.sql)
+
+        bumpSourceVersions(conn, versionTable, [3, 1, 3])
+        indexTable = SearchIndex.__table__
+        bumpSourceVersionsFromSelect(conn, versionTable,
+                                     select(columns=[indexTable.c.chunkKey],
+                                            distinct=True))
+
+        for sql in conn.sql:
+            self.assertIn('ON CONFLICT ("chunkKey") DO UPDATE SET version ='
+                          ' (core_search."SearchIndexChunkVersion".version + ', sql)
+
+    def testLoadSourceFingerprints(self):
+        conn = _Conn(rows=[(1, 4)])
+        fingerprints = loadSourceFingerprints(
+            conn, SearchIndexChunkVersion.__table__, [1, 2]
+        )
+
+        # A chunk that has never been bumped is at version 0
+        self.assertEqual({1: makeSourceFingerprint(4), 2: makeSourceFingerprint(0)},
+                         fingerprints)
+        self.assertNotEqual(makeSourceFingerprint(4), makeSourceFingerprint(0))
@@ -0,0 +1,58 @@
+from typing import Dict, List
+
+from sqlalchemy import Table, text
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.sql import Select
+
+#: The number of encoded chunks the compilers upsert at a time, as they are encoded
+UPSERT_BATCH_SIZE = 50
+
+#: The columns an upsert replaces, the id of an existing chunk is kept
+_UPDATE_COLUMNS = ('encodedData', 'encodedHash', 'lastUpdate', 'sourceFingerprint')
+
+
+def upsertEncodedChunks(conn, compiledTable: Table, inserts: List[Dict]) -> None:
+    """ Upsert Encoded Chunks
+
+    Insert the encoded chunks, or update them in place if the chunk key already
+    exists. The row ids stay the same, and the old row versions are the only dead
+    tuples left for the vacuum.
+
+    The rows are written in chunk key order, so two transactions always lock
+    the same rows in the same order.
+
+    :param conn: The SQLAlchemy connection, with a transaction started
+    :param compiledTable: EncodedSearchIndexChunk or EncodedSearchObjectChunk
+    :param inserts: A list of dicts with chunkKey, encodedData, encodedHash,
+        lastUpdate and sourceFingerprint
+    """
+    if not inserts:
+        return
+
+    conn.execute(_upsert(postgresql.insert(compiledTable), compiledTable),
+                 sorted(inserts, key=lambda i: i['chunkKey']))
+
+
+def upsertEncodedChunksFromSelect(conn, compiledTable: Table,
+                                  chunksSelect: Select) -> None:
+    """ Upsert Encoded Chunks From Select
+
+    The same as upsertEncodedChunks, for chunks selected in the database.
+
+    :param chunksSelect: A select of the chunkKey, encodedData, encodedHash,
+        lastUpdate and sourceFingerprint columns, in that order. It must not return the same chunk key
+        twice.
+    """
+    columns = ['chunkKey'] + list(_UPDATE_COLUMNS)
+    conn.execute(
+        _upsert(postgresql.insert(compiledTable)
+                .from_select(columns, chunksSelect.order_by(text('1'))),
+                compiledTable)
+    )
+
+
+def _upsert(stmt, compiledTable: Table):
+    return stmt.on_conflict_do_update(
+        index_elements=[compiledTable.c.chunkKey],
+        set_={name: stmt.excluded[name] for name in _UPDATE_COLUMNS}
+    )
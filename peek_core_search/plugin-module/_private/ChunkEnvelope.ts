@@ -0,0 +1,73 @@
+import { inflateZlib } from "./ZlibInflate"
+
+/** Chunk Envelope
+ *
+ * The worker wraps the encoded chunks in an envelope that records which codec
+ * compressed them, see
+ * peek_core_search/_private/worker/tasks/ChunkEnvelope.py
+ *
+ * Data without the magic byte is passed through, this is how chunks compiled
+ * before the envelope are read.
+ */
+export const CHUNK_ENVELOPE_MAGIC = 0xCE
+
+export const CHUNK_CODEC_NONE = 0x00
+export const CHUNK_CODEC_ZLIB = 0x01
+
+// Not all of our TypeScript lib versions declare this yet
+declare const DecompressionStream: any
+
+export function isChunkEnvelope(encodedData: string): boolean {
+    return encodedData != null
+        && encodedData.length > 1
+        && encodedData.charCodeAt(0) == CHUNK_ENVELOPE_MAGIC
+}
+
+/** Unwrap Chunk Envelope
+ *
+ * @param encodedData: The chunk, in an envelope or not, as a binary string
+ * @returns The encoded chunk, as a binary string
+ */
+export async function unwrapChunkEnvelope(encodedData: string): Promise<string> {
+    if (!isChunkEnvelope(encodedData))
+        return encodedData
+    
+    const codec = encodedData.charCodeAt(1)
+    const body = encodedData.substr(2)
+    
+    if (codec == CHUNK_CODEC_NONE)
+        return body
+    
+    if (codec == CHUNK_CODEC_ZLIB)
+        return await inflateBinaryString(body)
+    
+    throw new Error(`Chunk codec ${codec} is not supported`)
+}
+
+async function inflateBinaryString(data: string): Promise<string> {
+    const bytes = new Uint8Array(data.length)
+    for (let i = 0; i < data.length; i++)
+        bytes[i] = data.charCodeAt(i) & 0xFF
+    
+    let inflated: Uint8Array
+    if (typeof DecompressionStream === "undefined") {
+        // Older webviews don't have DecompressionStream
+        inflated = inflateZlib(bytes)
+        
+    } else {
+        // "deflate" is the zlib format, which is what python zlib.compress writes
+        const stream = new Blob([bytes])
+            .stream()
+            .pipeThrough(new DecompressionStream("deflate"))
+        inflated = new Uint8Array(await new Response(stream).arrayBuffer())
+    }
+    
+    // Convert in blocks, so the arguments don't exceed the call stack
+    let out = ""
+    for (let i = 0; i < inflated.length; i += 0x8000) {
+        out += String.fromCharCode.apply(
+            null, <any>inflated.subarray(i, i + 0x8000)
+        )
+    }
+    return out
+}
@@ -0,0 +1,49 @@
+/** Chunk Reader
+ *
+ * This class reads the binary chunk formats produced by the worker, see
+ * peek_core_search/_private/worker/tasks/SearchIndexChunkCodec.py
+ *
+ * The encoded data is a binary string, one character per byte.
+ */
+export class ChunkReader {
+    private offset: number
+
+    constructor(private data: string, offset: number = 0) {
+        this.offset = offset
+    }
+
+    hasMore(): boolean {
+        return this.offset < this.data.length
+    }
+
+    readByte(): number {
+        return this.data.charCodeAt(this.offset++) & 0xFF
+    }
+
+    /** Read Varint
+     *
+     * Object IDs can exceed 32 bits, so don't use the bitwise operators to shift
+     */
+    readVarint(): number {
+        let value = 0
+        let multiplier = 1
+        let byte: number
+
+        do {
+            byte = this.readByte()
+            value += (byte & 0x7F) * multiplier
+            multiplier *= 128
+        } while (byte & 0x80)
+
+        return value
+    }
+
+    readString(): string {
+        const length = this.readVarint()
+        const raw = this.data.substr(this.offset, length)
+        this.offset += length
+
+        // Decode the UTF-8 bytes
+        return decodeURIComponent(escape(raw))
+    }
+}
@@ -0,0 +1,284 @@
+/** Zlib Inflate
+ *
+ * A small inflate for the zlib format, RFC 1950 and RFC 1951, which is what python
+ * zlib.compress writes.
+ *
+ * ChunkEnvelope.ts uses this on the webviews that don't have DecompressionStream.
+ */
+
+// The base lengths and extra bits of the length symbols 257 to 285
+const LENGTH_BASE = [
+    3, 4, 5, 6, 7, 8, 9, 10, 11, 13, 15, 17, 19, 23, 27, 31,
+    35, 43, 51, 59, 67, 83, 99, 115, 131, 163, 195, 227, 258
+]
+const LENGTH_EXTRA = [
+    0, 0, 0, 0, 0, 0, 0, 0, 1, 1, 1, 1, 2, 2, 2, 2,
+    3, 3, 3, 3, 4, 4, 4, 4, 5, 5, 5, 5, 0
+]
+
+// The base distances and extra bits of the distance symbols 0 to 29
+const DIST_BASE = [
+    1, 2, 3, 4, 5, 7, 9, 13, 17, 25, 33, 49, 65, 97, 129, 193,
+    257, 385, 513, 769, 1025, 1537, 2049, 3073, 4097, 6145, 8193, 12289,
+    16385, 24577
+]
+const DIST_EXTRA = [
+    0, 0, 0, 0, 1, 1, 2, 2, 3, 3, 4, 4, 5, 5, 6, 6,
+    7, 7, 8, 8, 9, 9, 10, 10, 11, 11, 12, 12, 13, 13
+]
+
+// The order the code length code lengths are stored in a dynamic block
+const CODE_LENGTH_ORDER = [
+    16, 17, 18, 0, 8, 7, 9, 6, 10, 5, 11, 4, 12, 3, 13, 2, 14, 1, 15
+]
+
+const MAX_BITS = 15
+
+/** Huffman
+ *
+ * A canonical huffman code, the number of codes of each length, and the symbols
+ * in code order.
+ */
+class Huffman {
+    readonly counts = new Uint16Array(MAX_BITS + 1)
+    readonly symbols: Uint16Array
+
+    constructor(lengths: Uint8Array, offset: number, count: number) {
+        this.symbols = new Uint16Array(count)
+
+        for (let i = 0; i < count; i++)
+            this.counts[lengths[offset + i]]++
+        this.counts[0] = 0
+
+        const offsets = new Uint16Array(MAX_BITS + 1)
+        for (let len = 1; len < MAX_BITS; len++)
+            offsets[len + 1] = offsets[len] + this.counts[len]
+
+        for (let i = 0; i < count; i++) {
+            const len = lengths[offset + i]
+            if (len != 0)
+                this.symbols[offsets[len]++] = i
+        }
+    }
+}
+
+let fixedCodes: Huffman[] | null = null
+
+function loadFixedCodes(): Huffman[] {
+    if (fixedCodes != null)
+        return fixedCodes
+
+    const lengths = new Uint8Array(288 + 30)
+    lengths.fill(8, 0, 144)
+    lengths.fill(9, 144, 256)
+    lengths.fill(7, 256, 280)
+    lengths.fill(8, 280, 288)
+    lengths.fill(5, 288, 288 + 30)
+
+    fixedCodes = [new Huffman(lengths, 0, 288), new Huffman(lengths, 288, 30)]
+    return fixedCodes
+}
+
+class Inflater {
+    private bitBuffer = 0
+    private bitCount = 0
+    private output: Uint8Array
+    private outputLength = 0
+
+    constructor(private data: Uint8Array, private offset: number) {
+        this.output = new Uint8Array(Math.max(data.length * 4, 1024))
+    }
+
+    inflate(): Uint8Array {
+        let isFinal = false
+        while (!isFinal) {
+            isFinal = this.readBits(1) == 1
+            const blockType = this.readBits(2)
+
+            if (blockType == 0) {
+                this.inflateStored()
+
+            } else if (blockType == 1) {
+                const [lengthCode, distCode] = loadFixedCodes()
+                this.inflateCodes(lengthCode, distCode)
+
+            } else if (blockType == 2) {
+                this.inflateDynamic()
+
+            } else {
+                throw new Error("Invalid deflate block type")
+            }
+        }
+
+        return this.output.subarray(0, this.outputLength)
+    }
+
+    private readBits(count: number): number {
+        while (this.bitCount < count) {
+            if (this.offset >= this.data.length)
+                throw new Error("Deflate data ended early")
+            this.bitBuffer |= this.data[this.offset++] << this.bitCount
+            this.bitCount += 8
+        }
+
+        const value = this.bitBuffer & ((1 << count) - 1)
+        this.bitBuffer >>>= count
+        this.bitCount -= count
+        return value
+    }
+
+    private readSymbol(huffman: Huffman): number {
+        let code = 0
+        let first = 0
+        let index = 0
+
+        for (let len = 1; len <= MAX_BITS; len++) {
+            code |= this.readBits(1)
+            const count = huffman.counts[len]
+            if (code - count < first)
+                return huffman.symbols[index + (code - first)]
+
+            index += count
+            first = (first + count) << 1
+            code <<= 1
+        }
+
+        throw new Error("Invalid deflate huffman code")
+    }
+
+    private reserve(count: number): void {
+        if (this.outputLength + count <= this.output.length)
+            return
+
+        let size = this.output.length * 2
+        while (size < this.outputLength + count)
+            size *= 2
+
+        const output = new Uint8Array(size)
+        output.set(this.output.subarray(0, this.outputLength))
+        this.output = output
+    }
+
+    private inflateStored(): void {
+        // The block starts on the next byte, readBits leaves less than a byte
+        this.bitBuffer = 0
+        this.bitCount = 0
+
+        if (this.offset + 4 > this.data.length)
+            throw new Error("Deflate data ended early")
+
+        const data = this.data
+        const len = data[this.offset] | (data[this.offset + 1] << 8)
+        const nlen = data[this.offset + 2] | (data[this.offset + 3] << 8)
+        if (len != (~nlen & 0xFFFF))
+            throw new Error("Invalid deflate stored block length")
+        this.offset += 4
+
+        if (this.offset + len > data.length)
+            throw new Error("Deflate data ended early")
+
+        this.reserve(len)
+        this.output.set(data.subarray(this.offset, this.offset + len),
+            this.outputLength)
+        this.outputLength += len
+        this.offset += len
+    }
+
+    private inflateDynamic(): void {
+        const lengthCount = this.readBits(5) + 257
+        const distCount = this.readBits(5) + 1
+        const codeLengthCount = this.readBits(4) + 4
+
+        const lengths = new Uint8Array(lengthCount + distCount)
+
+        const codeLengths = new Uint8Array(CODE_LENGTH_ORDER.length)
+        for (let i = 0; i < codeLengthCount; i++)
+            codeLengths[CODE_LENGTH_ORDER[i]] = this.readBits(3)
+        const codeLengthCode = new Huffman(codeLengths, 0, codeLengths.length)
+
+        let index = 0
+        while (index < lengths.length) {
+            const symbol = this.readSymbol(codeLengthCode)
+            if (symbol < 16) {
+                lengths[index++] = symbol
+                continue
+            }
+
+            let len = 0
+            let repeat: number
+            if (symbol == 16) {
+                if (index == 0)
+                    throw new Error("Invalid deflate code length repeat")
+                len = lengths[index - 1]
+                repeat = 3 + this.readBits(2)
+
+            } else if (symbol == 17) {
+                repeat = 3 + this.readBits(3)
+
+            } else {
+                repeat = 11 + this.readBits(7)
+            }
+
+            if (index + repeat > lengths.length)
+                throw new Error("Invalid deflate code length repeat")
+            lengths.fill(len, index, index + repeat)
+            index += repeat
+        }
+
+        this.inflateCodes(new Huffman(lengths, 0, lengthCount),
+            new Huffman(lengths, lengthCount, distCount))
+    }
+
+    private inflateCodes(lengthCode: Huffman, distCode: Huffman): void {
+        while (true) {
+            let symbol = this.readSymbol(lengthCode)
+
+            if (symbol < 256) {
+                this.reserve(1)
+                this.output[this.outputLength++] = symbol
+                continue
+            }
+
+            if (symbol == 256)
+                return
+
+            symbol -= 257
+            if (symbol >= LENGTH_BASE.length)
+                throw new Error("Invalid deflate length symbol")
+            const len = LENGTH_BASE[symbol] + this.readBits(LENGTH_EXTRA[symbol])
+
+            const distSymbol = this.readSymbol(distCode)
+            if (distSymbol >= DIST_BASE.length)
+                throw new Error("Invalid deflate distance symbol")
+            const dist = DIST_BASE[distSymbol] + this.readBits(DIST_EXTRA[distSymbol])
+            if (dist > this.outputLength)
+                throw new Error("Invalid deflate distance")
+
+            // The copy can overlap the bytes it writes, copy one byte at a time
+            this.reserve(len)
+            const output = this.output
+            for (let i = 0; i < len; i++) {
+                output[this.outputLength] = output[this.outputLength - dist]
+                this.outputLength++
+            }
+        }
+    }
+}
+
+/** Inflate Zlib
+ *
+ * @param data: The zlib compressed data
+ * @returns The inflated data
+ */
+export function inflateZlib(data: Uint8Array): Uint8Array {
+    if (data.length < 2
+        || (data[0] & 0x0F) != 8
+        || ((data[0] << 8) | data[1]) % 31 != 0)
+        throw new Error("The data is not zlib compressed")
+
+    // Python zlib.compress never sets a preset dictionary
+    if (data[1] & 0x20)
+        throw new Error("Zlib preset dictionaries are not supported")
+
+    return new Inflater(data, 2).inflate()
+}
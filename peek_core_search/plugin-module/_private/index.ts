@@ -4,5 +4,6 @@ export * from "./search-index-loader"
 export {SearchPropertyTuple} from "./tuples/SearchPropertyTuple";
 export {SettingPropertyTuple} from "./tuples/admin/SettingPropertyTuple";
 export {AdminStatusTuple} from "./tuples/admin/AdminStatusTuple";
+export {RebuildSearchChunksTupleAction} from "./tuples/admin/RebuildSearchChunksTupleAction";
 export {OfflineConfigTuple} from "./tuples/OfflineConfigTuple";
 export {SearchTupleService} from "./SearchTupleService";
@@ -22,6 +22,12 @@ import { OfflineConfigTuple } from "../tuples/OfflineConfigTuple"
 import { SearchTupleService } from "../SearchTupleService"
 import { PrivateSearchIndexLoaderStatusTuple } from "./PrivateSearchIndexLoaderStatusTuple"
 import { splitFullKeywords, splitPartialKeywords } from "../KeywordSplitter"
+import { unwrapChunkEnvelope } from "../ChunkEnvelope"
+import {
+    decodeSearchIndexChunk,
+    isBinarySearchIndexChunk,
+    searchIndexSplitChunkSubBucketCount
+} from "./SearchIndexChunkDecoder"
 
 // ----------------------------------------------------------------------------
 
@@ -65,7 +71,10 @@ class UpdateDateTupleSelector extends TupleSelector {
 // ----------------------------------------------------------------------------
 /** hash method
  */
-let INDEX_BUCKET_COUNT = 8192
+// The bucket count is sent with the IndexUpdateDateTuple, the server can re-key
+// the chunks with another count
+const DEFAULT_INDEX_BUCKET_COUNT = 8192
+let INDEX_BUCKET_COUNT = DEFAULT_INDEX_BUCKET_COUNT
 
 function keywordChunk(keyword: string): number {
     /** keyword
@@ -95,6 +104,42 @@ function keywordChunk(keyword: string): number {
     return bucket
 }
 
+function keywordSubBucket(keyword: string, subBucketCount: number): number {
+    /** keyword
+     
+     This method creates an int from 0 to subBucketCount, representing the sub
+     bucket for this keyword in a split chunk.
+     
+     This MUST MATCH makeSearchIndexSubBucket in _CalcChunkKey.py
+     
+     @param keyword: The keyword to get the sub bucket for
+     @param subBucketCount: The number of sub buckets the chunk is split into
+     
+     @return: The sub bucket where you'll find the keyword
+     
+     */
+    let bucket = 0x811C9DC5
+    
+    for (let i = 0; i < keyword.length; i++) {
+        bucket = Math.imul(bucket ^ keyword.charCodeAt(i), 0x01000193)
+    }
+    
+    bucket ^= bucket >>> 16
+    bucket = Math.imul(bucket, 0x85EBCA6B)
+    bucket ^= bucket >>> 13
+    
+    return bucket & (subBucketCount - 1)
+}
+
+function keywordSplitChunk(chunkKey: number, subBucket: number): number {
+    /** The sub bucket chunks of a split chunk have negative chunk keys
+     
+     This MUST MATCH makeSearchIndexSplitChunkKey in _CalcChunkKey.py
+     
+     */
+    return -1 - (subBucket * INDEX_BUCKET_COUNT + chunkKey)
+}
+
 // ----------------------------------------------------------------------------
 /** SearchIndex Cache
  *
@@ -214,6 +259,7 @@ export class PrivateSearchIndexLoaderService extends NgLifeCycleEvents {
                 let tuples: SearchIndexUpdateDateTuple[] = tuplesAny
                 if (tuples.length != 0) {
                     this.index = tuples[0]
+                    INDEX_BUCKET_COUNT = this.index.bucketCount || DEFAULT_INDEX_BUCKET_COUNT
                     
                     if (this.index.initialLoadComplete) {
                         this._hasLoaded = true
@@ -270,6 +316,16 @@ export class PrivateSearchIndexLoaderService extends NgLifeCycleEvents {
             .pollForTuples(new UpdateDateTupleSelector())
             .then((tuplesAny: any) => {
                 let serverIndex: SearchIndexUpdateDateTuple = tuplesAny[0]
+                
+                // The server has re-keyed the chunks, load them all again
+                if (serverIndex.bucketCount != null
+                    && serverIndex.bucketCount != INDEX_BUCKET_COUNT) {
+                    this.index = new SearchIndexUpdateDateTuple()
+                    this.index.bucketCount = serverIndex.bucketCount
+                    INDEX_BUCKET_COUNT = serverIndex.bucketCount
+                    this._hasLoaded = false
+                }
+                
                 let keys = Object.keys(serverIndex.updateDateByChunkKey)
                 let keysNeedingUpdate: string[] = []
                 
@@ -537,12 +593,24 @@ export class PrivateSearchIndexLoaderService extends NgLifeCycleEvents {
         
         const objectIdsByToken: { [token: string]: number[] } = {}
         
-        const vortexMsg = await this.storage
+        let vortexMsg = await this.storage
             .loadTuplesEncoded(new SearchIndexChunkTupleSelector(chunkKey))
         
         if (vortexMsg == null)
             return {}
         
+        vortexMsg = await unwrapChunkEnvelope(vortexMsg)
+        
+        const subBucketCount = searchIndexSplitChunkSubBucketCount(vortexMsg)
+        if (subBucketCount != null)
+            return this.getObjectIdsForKeywordInSplitChunk(
+                propertyName, chunkKey, tokens, subBucketCount
+            )
+        
+        if (isBinarySearchIndexChunk(vortexMsg))
+            return decodeSearchIndexChunk(vortexMsg, tokens, propertyName)
+        
+        // Chunks compiled before the binary format are vortex payloads
         const payload = await Payload.fromEncodedPayload(vortexMsg)
         const chunkData = payload.tuples
         
@@ -573,4 +641,47 @@ export class PrivateSearchIndexLoaderService extends NgLifeCycleEvents {
         
     }
     
+    /** Get Object IDs for Keyword In Split Chunk
+     *
+     * Oversized chunks are split by the compiler, the keywords are in the
+     * sub bucket chunks.
+     *
+     */
+    private async getObjectIdsForKeywordInSplitChunk(
+        propertyName: string | null,
+        chunkKey: number,
+        tokens: string[],
+        subBucketCount: number
+    ): Promise<{ [token: string]: number[] }> {
+        const tokensBySplitChunkKey: { [chunkKey: number]: string[] } = {}
+        
+        for (let token of tokens) {
+            const splitChunkKey = keywordSplitChunk(
+                chunkKey, keywordSubBucket(token, subBucketCount)
+            )
+            if (tokensBySplitChunkKey[splitChunkKey] == null)
+                tokensBySplitChunkKey[splitChunkKey] = []
+            tokensBySplitChunkKey[splitChunkKey].push(token)
+        }
+        
+        const promises = []
+        for (let splitChunkKey of Object.keys(tokensBySplitChunkKey)) {
+            promises.push(
+                this.getObjectIdsForKeyword(
+                    propertyName,
+                    parseInt(splitChunkKey),
+                    tokensBySplitChunkKey[splitChunkKey]
+                )
+            )
+        }
+        
+        const allResults = await Promise.all(promises)
+        const mergedResults: { [token: string]: number[] } = {}
+        for (let results of allResults) {
+            Object.assign(mergedResults, results)
+        }
+        
+        return mergedResults
+    }
+    
 }
@@ -0,0 +1,83 @@
+import { ChunkReader } from "../ChunkReader"
+
+export const SEARCH_INDEX_CHUNK_FORMAT_V1 = 0x01
+export const SEARCH_INDEX_CHUNK_FORMAT_SPLIT = 0x02
+
+/** Is Binary Search Index Chunk
+ *
+ * Chunks compiled before the binary format are vortex encoded payloads,
+ * they start with an ascii character.
+ */
+export function isBinarySearchIndexChunk(encodedData: string): boolean {
+    return encodedData != null
+        && encodedData.length != 0
+        && encodedData.charCodeAt(0) == SEARCH_INDEX_CHUNK_FORMAT_V1
+}
+
+/** Search Index Split Chunk Sub Bucket Count
+ *
+ * Chunks over the byte budget are split into sub bucket chunks by the compiler.
+ *
+ * @returns The number of sub buckets if this is a split chunk, otherwise null
+ */
+export function searchIndexSplitChunkSubBucketCount(encodedData: string): number | null {
+    if (encodedData == null
+        || encodedData.length == 0
+        || encodedData.charCodeAt(0) != SEARCH_INDEX_CHUNK_FORMAT_SPLIT)
+        return null
+
+    return new ChunkReader(encodedData, 1).readVarint()
+}
+
+/** Decode Search Index Chunk
+ *
+ * This MUST MATCH the code that runs in the worker
+ * peek_core_search/_private/worker/tasks/SearchIndexChunkCodec.py
+ *
+ * @param encodedData: The binary chunk data
+ * @param tokens: The keywords to return the object IDs for
+ * @param propertyName: Optionally, only return matches for this property
+ * @returns The object IDs for each token
+ */
+export function decodeSearchIndexChunk(
+    encodedData: string,
+    tokens: string[],
+    propertyName: string | null
+): { [token: string]: number[] } {
+    const reader = new ChunkReader(encodedData, 1)
+
+    const objectIdsByToken: { [token: string]: number[] } = {}
+    for (let token of tokens)
+        objectIdsByToken[token] = []
+
+    const propertyNames: string[] = []
+    const propertyCount = reader.readVarint()
+    for (let i = 0; i < propertyCount; i++)
+        propertyNames.push(reader.readString())
+
+    const keywordCount = reader.readVarint()
+    for (let i = 0; i < keywordCount; i++) {
+        const keyword = reader.readString()
+        const objectIds = objectIdsByToken[keyword]
+
+        const postingCount = reader.readVarint()
+        for (let j = 0; j < postingCount; j++) {
+            const thisPropertyName = propertyNames[reader.readVarint()]
+            const idCount = reader.readVarint()
+
+            // If the property is set, then make sure it matches
+            const wanted = objectIds != null
+                && (propertyName == null || propertyName == thisPropertyName)
+
+            // The IDs must be read even when they are not wanted
+            let objectId = 0
+            for (let k = 0; k < idCount; k++) {
+                objectId += reader.readVarint()
+                if (wanted)
+                    objectIds.push(objectId)
+            }
+        }
+    }
+
+    return objectIdsByToken
+}
@@ -24,6 +24,12 @@ import { OfflineConfigTuple } from "../tuples/OfflineConfigTuple"
 import { SearchTupleService } from "../SearchTupleService"
 import { PrivateSearchObjectLoaderStatusTuple } from "./PrivateSearchObjectLoaderStatusTuple"
 import { SearchObjectTypeTuple } from "../../SearchObjectTypeTuple"
+import { unwrapChunkEnvelope } from "../ChunkEnvelope"
+import {
+    decodeSearchObjectChunk,
+    DecodedSearchObject,
+    isBinarySearchObjectChunk
+} from "./SearchObjectChunkDecoder"
 
 // ----------------------------------------------------------------------------
 
@@ -65,7 +71,10 @@ class UpdateDateTupleSelector extends TupleSelector {
 // ----------------------------------------------------------------------------
 /** hash method
  */
-let OBJECT_BUCKET_COUNT = 8192
+// The bucket count is sent with the ObjectUpdateDateTuple, the server can re-key
+// the chunks with another count
+const DEFAULT_OBJECT_BUCKET_COUNT = 8192
+let OBJECT_BUCKET_COUNT = DEFAULT_OBJECT_BUCKET_COUNT
 
 function objectIdChunk(objectId: number): number {
     /** Object ID Chunk
@@ -208,6 +217,7 @@ export class PrivateSearchObjectLoaderService extends NgLifeCycleEvents {
                 let tuples: SearchObjectUpdateDateTuple[] = tuplesAny
                 if (tuples.length != 0) {
                     this.index = tuples[0]
+                    OBJECT_BUCKET_COUNT = this.index.bucketCount || DEFAULT_OBJECT_BUCKET_COUNT
                     
                     if (this.index.initialLoadComplete) {
                         this._hasLoaded = true
@@ -264,6 +274,16 @@ export class PrivateSearchObjectLoaderService extends NgLifeCycleEvents {
             .pollForTuples(new UpdateDateTupleSelector())
             .then((tuplesAny: any) => {
                 let serverIndex: SearchObjectUpdateDateTuple = tuplesAny[0]
+                
+                // The server has re-keyed the chunks, load them all again
+                if (serverIndex.bucketCount != null
+                    && serverIndex.bucketCount != OBJECT_BUCKET_COUNT) {
+                    this.index = new SearchObjectUpdateDateTuple()
+                    this.index.bucketCount = serverIndex.bucketCount
+                    OBJECT_BUCKET_COUNT = serverIndex.bucketCount
+                    this._hasLoaded = false
+                }
+                
                 let keys = Object.keys(serverIndex.updateDateByChunkKey)
                 let keysNeedingUpdate: string[] = []
                 
@@ -475,69 +495,105 @@ export class PrivateSearchObjectLoaderService extends NgLifeCycleEvents {
         retPromise = this.storage.loadTuplesEncoded(new SearchObjectChunkTupleSelector(chunkKey))
             .then((vortexMsg: string) => {
                 if (vortexMsg == null) {
-                    return []
+                    return null
+                }
+                
+                return unwrapChunkEnvelope(vortexMsg)
+            })
+            .then((vortexMsg: string | null) => {
+                if (vortexMsg == null) {
+                    return {}
                 }
                 
+                if (isBinarySearchObjectChunk(vortexMsg))
+                    return decodeSearchObjectChunk(vortexMsg, objectIds)
+                
+                // Chunks compiled before the binary format are vortex payloads
                 return Payload.fromEncodedPayload(vortexMsg)
                     .then((payload: Payload) => JSON.parse(<any>payload.tuples))
-                    .then((chunkData: { [key: number]: string; }) => {
-                        
-                        let foundObjects: SearchResultObjectTuple[] = []
-                        
-                        for (let objectId of objectIds) {
-                            // Find the keyword, we're just iterating
-                            if (!chunkData.hasOwnProperty(objectId)) {
-                                console.log(
-                                    `WARNING: ObjectID ${objectId} is missing from index,`
-                                    + ` chunkKey ${chunkKey}`
-                                )
-                                continue
-                            }
-                            
-                            // Reconstruct the data
-                            let objectProps: {} = JSON.parse(chunkData[objectId])
-                            
-                            // Get out the object type
-                            let thisObjectTypeId = objectProps["_otid_"]
-                            delete objectProps["_otid_"]
-                            
-                            // If the property is set, then make sure it matches
-                            if (objectTypeId != null && objectTypeId != thisObjectTypeId)
-                                continue
-                            
-                            // Get out the routes
-                            let routes: string[][] = objectProps["_r_"]
-                            delete objectProps["_r_"]
-                            
-                            // Get the key
-                            let objectKey: string = objectProps["key"]
-                            
-                            // Create the new object
-                            let newObject = new SearchResultObjectTuple()
-                            foundObjects.push(newObject)
-                            
-                            newObject.id = objectId
-                            newObject.key = objectKey
-                            newObject.objectType = new SearchObjectTypeTuple()
-                            newObject.objectType.id = thisObjectTypeId
-                            newObject.properties = objectProps
-                            
-                            for (let route of routes) {
-                                let newRoute = new SearchResultObjectRouteTuple()
-                                newObject.routes.push(newRoute)
-                                
-                                newRoute.title = route[0]
-                                newRoute.path = route[1]
-                            }
-                        }
-                        
-                        return foundObjects
+                    .then((chunkData: { [key: number]: string; }) =>
+                        this.unpackLegacyChunk(chunkData, objectIds)
+                    )
+            })
+            .then((objectsById: { [id: number]: DecodedSearchObject }) => {
+                let foundObjects: SearchResultObjectTuple[] = []
+                
+                for (let objectId of objectIds) {
+                    // Find the object
+                    if (!objectsById.hasOwnProperty(objectId)) {
+                        console.log(
+                            `WARNING: ObjectID ${objectId} is missing from index,`
+                            + ` chunkKey ${chunkKey}`
+                        )
+                        continue
+                    }
+                    
+                    const obj = objectsById[objectId]
+                    
+                    // If the property is set, then make sure it matches
+                    if (objectTypeId != null && objectTypeId != obj.objectTypeId)
+                        continue
+                    
+                    // Create the new object
+                    let newObject = new SearchResultObjectTuple()
+                    foundObjects.push(newObject)
+                    
+                    newObject.id = objectId
+                    newObject.key = obj.properties["key"]
+                    newObject.objectType = new SearchObjectTypeTuple()
+                    newObject.objectType.id = obj.objectTypeId
+                    newObject.properties = obj.properties
+                    
+                    for (let route of obj.routes) {
+                        let newRoute = new SearchResultObjectRouteTuple()
+                        newObject.routes.push(newRoute)
                         
-                    })
+                        newRoute.title = route[0]
+                        newRoute.path = route[1]
+                    }
+                }
+                
+                return foundObjects
             })
         
         return retPromise
         
     }
     
+    /** Unpack Legacy Chunk
+     *
+     * Chunks compiled before the binary format store the packed JSON for each
+     * object, see SearchObjectChunkCodec.unpackSearchObjectJson
+     */
+    private unpackLegacyChunk(
+        chunkData: { [key: number]: string; },
+        objectIds: number[]
+    ): { [id: number]: DecodedSearchObject } {
+        const objectsById: { [id: number]: DecodedSearchObject } = {}
+        
+        for (let objectId of objectIds) {
+            if (!chunkData.hasOwnProperty(objectId))
+                continue
+            
+            // Reconstruct the data
+            let objectProps: {} = JSON.parse(chunkData[objectId])
+            
+            const objectTypeId = objectProps["_otid_"]
+            delete objectProps["_otid_"]
+            
+            const routes: string[][] = objectProps["_r_"]
+                .filter((route: string[]) => route[0] != null)
+            delete objectProps["_r_"]
+            
+            objectsById[objectId] = {
+                id: objectId,
+                objectTypeId: objectTypeId,
+                properties: objectProps,
+                routes: routes
+            }
+        }
+        
+        return objectsById
+    }
+    
 }
@@ -0,0 +1,79 @@
+import { ChunkReader } from "../ChunkReader"
+
+export const SEARCH_OBJECT_CHUNK_FORMAT_V1 = 0x01
+
+export interface DecodedSearchObject {
+    id: number
+    objectTypeId: number
+    properties: { [name: string]: string }
+    routes: string[][]
+}
+
+/** Is Binary Search Object Chunk
+ *
+ * Chunks compiled before the binary format are vortex encoded payloads,
+ * they start with an ascii character.
+ */
+export function isBinarySearchObjectChunk(encodedData: string): boolean {
+    return encodedData != null
+        && encodedData.length != 0
+        && encodedData.charCodeAt(0) == SEARCH_OBJECT_CHUNK_FORMAT_V1
+}
+
+/** Decode Search Object Chunk
+ *
+ * This MUST MATCH the code that runs in the worker
+ * peek_core_search/_private/worker/tasks/SearchObjectChunkCodec.py
+ *
+ * @param encodedData: The binary chunk data
+ * @param objectIds: The objects to return
+ * @returns The decoded objects by their ID
+ */
+export function decodeSearchObjectChunk(
+    encodedData: string,
+    objectIds: number[]
+): { [id: number]: DecodedSearchObject } {
+    const reader = new ChunkReader(encodedData, 1)
+
+    const wantedIds: { [id: number]: boolean } = {}
+    for (let objectId of objectIds)
+        wantedIds[objectId] = true
+
+    const objectsById: { [id: number]: DecodedSearchObject } = {}
+
+    const propertyNames: string[] = []
+    const propertyCount = reader.readVarint()
+    for (let i = 0; i < propertyCount; i++)
+        propertyNames.push(reader.readString())
+
+    const objectCount = reader.readVarint()
+    let objectId = 0
+    for (let i = 0; i < objectCount; i++) {
+        objectId += reader.readVarint()
+
+        // The object must be read even when it is not wanted
+        const obj: DecodedSearchObject = {
+            id: objectId,
+            objectTypeId: reader.readVarint(),
+            properties: {},
+            routes: []
+        }
+
+        const propCount = reader.readVarint()
+        for (let j = 0; j < propCount; j++) {
+            const propertyName = propertyNames[reader.readVarint()]
+            obj.properties[propertyName] = reader.readString()
+        }
+
+        const routeCount = reader.readVarint()
+        for (let j = 0; j < routeCount; j++) {
+            const title = reader.readString()
+            obj.routes.push([title, reader.readString()])
+        }
+
+        if (wantedIds[objectId] === true)
+            objectsById[objectId] = obj
+    }
+
+    return objectsById
+}
@@ -11,6 +11,8 @@ export class SearchObjectUpdateDateTuple extends Tuple {
 
     initialLoadComplete: boolean = false;
     updateDateByChunkKey: {} = {};
+    // The number of buckets the chunks are keyed with
+    bucketCount: number | null = null;
 
     constructor() {
         super(SearchObjectUpdateDateTuple.tupleName)
@@ -10,11 +10,57 @@ export class AdminStatusTuple extends Tuple {
     searchIndexCompilerQueueSize: number;
     searchIndexCompilerQueueProcessedTotal: number;
     searchIndexCompilerQueueLastError: string;
+    searchIndexCompilerItemsPerTask: number;
+    searchIndexCompilerBlocksMax: number;
+    searchIndexCompilerPollSeconds: number;
+    searchIndexCompilerTaskSeconds: number | null;
+    // [date, items per task, blocks max, poll seconds, task seconds,
+    //      fetch seconds, queue size]
+    searchIndexCompilerTuningHistory: any[][];
+    searchIndexCompilerChunksSkipped: number;
+    searchIndexCompilerEncodeSeconds: number;
+    searchIndexCompilerDbReadSeconds: number;
+    searchIndexCompilerDbWriteSeconds: number;
+    // [upper bound, count], the last upper bound is null
+    searchIndexCompilerChunkBytesHistogram: any[][];
+    searchIndexCompilerChunkRowsHistogram: any[][];
+    searchIndexCompilerChunkSecondsHistogram: any[][];
+    // [chunk key, encoded bytes, rows read, seconds]
+    searchIndexCompilerLargestChunks: any[][];
+    searchIndexCompilerSlowestChunks: any[][];
 
     searchObjectCompilerQueueStatus: boolean;
     searchObjectCompilerQueueSize: number;
     searchObjectCompilerQueueProcessedTotal: number;
     searchObjectCompilerQueueLastError: string;
+    searchObjectCompilerItemsPerTask: number;
+    searchObjectCompilerBlocksMax: number;
+    searchObjectCompilerPollSeconds: number;
+    searchObjectCompilerTaskSeconds: number | null;
+    // [date, items per task, blocks max, poll seconds, task seconds,
+    //      fetch seconds, queue size]
+    searchObjectCompilerTuningHistory: any[][];
+    searchObjectCompilerChunksSkipped: number;
+    searchObjectCompilerEncodeSeconds: number;
+    searchObjectCompilerDbReadSeconds: number;
+    searchObjectCompilerDbWriteSeconds: number;
+    // [upper bound, count], the last upper bound is null
+    searchObjectCompilerChunkBytesHistogram: any[][];
+    searchObjectCompilerChunkRowsHistogram: any[][];
+    searchObjectCompilerChunkSecondsHistogram: any[][];
+    // [chunk key, encoded bytes, rows read, seconds]
+    searchObjectCompilerLargestChunks: any[][];
+    searchObjectCompilerSlowestChunks: any[][];
+
+    searchChunkRebuildStatus: boolean;
+    searchChunkRebuildChunkKeysTotal: number;
+    searchChunkRebuildChunkKeysProcessed: number;
+    searchChunkRebuildChunksCompiled: number;
+    searchChunkRebuildChunksPerSecond: number;
+    searchChunkRebuildLastError: string;
+
+    searchIndexBucketCount: number;
+    searchObjectBucketCount: number;
 
     constructor() {
         super(AdminStatusTuple.tupleName)
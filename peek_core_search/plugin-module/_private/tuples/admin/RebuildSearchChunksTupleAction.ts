@@ -0,0 +1,16 @@
+import {addTupleType, TupleActionABC} from "@synerty/vortexjs";
+import {searchTuplePrefix} from "../../PluginNames";
+
+
+@addTupleType
+export class RebuildSearchChunksTupleAction extends TupleActionABC {
+    public static readonly tupleName = searchTuplePrefix + "RebuildSearchChunksTupleAction";
+
+    // Re-key the chunks with these bucket counts, null keeps the current count
+    indexBucketCount: number | null = null;
+    objectBucketCount: number | null = null;
+
+    constructor() {
+        super(RebuildSearchChunksTupleAction.tupleName)
+    }
+}
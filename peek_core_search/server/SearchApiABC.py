@@ -1,5 +1,5 @@
 from abc import ABCMeta, abstractmethod
-from typing import List
+from typing import Iterable, List, Union
 
 from twisted.internet.defer import Deferred
 
@@ -9,7 +9,8 @@ from peek_core_search.tuples.ImportSearchObjectTuple import ImportSearchObjectTu
 class SearchApiABC(metaclass=ABCMeta):
 
     @abstractmethod
-    def importSearchObjects(self, searchObjectsEncodedPayload: bytes) -> Deferred:
+    def importSearchObjects(self, searchObjectsEncodedPayload: bytes,
+                            interactive: bool = False) -> Deferred:
         """ Import Search Objects
 
         This method imports a group of objects into the search.
@@ -18,10 +19,42 @@ class SearchApiABC(metaclass=ABCMeta):
                 The format of the encodedPayload tuples is List[ImportSearchObjectTuple]
                 using Payload(tuples=tuples).toEncodedPayload()
 
+        :param interactive: Use this for edits a user is waiting for. The chunks
+                they change are compiled ahead of the chunks queued by other
+                imports, which still get a share of the compilers.
+
         :return: A deferred that fires when the objects are queued for indexing.
 
         """
 
+    @abstractmethod
+    def importSearchObjectsStream(self, searchObjectsEncodedPayloads: Iterable[
+        Union[bytes, Deferred]], bulkLoad: bool = False,
+                                  interactive: bool = False) -> Deferred:
+        """ Import Search Objects Stream
+
+        This method imports a large number of objects into the search, such as a
+        full sync of another system.
+
+        The payloads are read from the iterable as the workers are ready for them, so
+        a generator can create each payload as it's needed. The objects are
+        split into bounded batches for the workers.
+
+        :param searchObjectsEncodedPayloads: An iterable of encoded payloads, or
+                Deferreds that fire with them. Each is in the same format as the
+                importSearchObjects searchObjectsEncodedPayload.
+
+        :param bulkLoad: Use this for the first load of a large number of objects.
+                The index is built as the objects are imported, but the chunks the
+                clients load are compiled once, after the last object is imported.
+
+        :param interactive: The same as for importSearchObjects.
+
+        :return: A deferred that fires when all the objects are imported and
+                queued for indexing, or errbacks with the first batch that failed.
+
+        """
+
     @abstractmethod
     def removeSearchObjects(self, importGroupHashes: List[str]) -> Deferred:
         """ Remove Search Objects